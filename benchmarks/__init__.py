@@ -0,0 +1,8 @@
+"""Performance benchmarks of pypelines, runnable offline with `python -m benchmarks`.
+
+The benchmarks run on synthetic pipelines (see benchmarks.synthetic), over temporary sessions,
+and report their timings as JSON, to allow tracking regressions across releases.
+"""
+
+from .synthetic import make_synthetic_pipeline, make_sessions
+from .suite import run_benchmarks, BENCHMARKS
@@ -0,0 +1,54 @@
+"""Command line interface of the benchmarks. Run `python -m benchmarks --help` for the options."""
+
+from .suite import run_benchmarks, BENCHMARKS
+
+import argparse, json, sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Time pypelines operations on synthetic pipelines, and print the results as JSON.",
+    )
+    parser.add_argument(
+        "benchmarks", nargs="*", help=f"benchmarks to run, among {', '.join(BENCHMARKS)} (all by default)"
+    )
+    parser.add_argument("--pipes", type=int, default=10, help="number of pipes of the synthetic pipeline")
+    parser.add_argument("--steps-per-pipe", type=int, default=3, help="number of steps in each pipe")
+    parser.add_argument("--depth", type=int, default=4, help="number of layers of pipes in the requirement DAG")
+    parser.add_argument("--fan-in", type=int, default=2, help="maximum number of pipes required by each pipe")
+    parser.add_argument("--sessions", type=int, default=10, help="number of temporary sessions")
+    parser.add_argument("--files", type=int, default=5000, help="number of unrelated files for check_disk")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed repetitions of each benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic pipeline requirements")
+    parser.add_argument("--root", default=None, help="folder for the sessions (a temporary one by default)")
+    parser.add_argument("--output", "-o", default=None, help="file to write the JSON results to (stdout by default)")
+    arguments = parser.parse_args(argv)
+
+    unknown = [name for name in arguments.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks {', '.join(unknown)}. Available ones are {', '.join(BENCHMARKS)}")
+
+    results = run_benchmarks(
+        names=arguments.benchmarks or None,
+        root=arguments.root,
+        pipes=arguments.pipes,
+        steps_per_pipe=arguments.steps_per_pipe,
+        depth=arguments.depth,
+        fan_in=arguments.fan_in,
+        sessions_count=arguments.sessions,
+        files=arguments.files,
+        repeat=arguments.repeat,
+        seed=arguments.seed,
+    )
+
+    if arguments.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+from pypelines import Pipeline, __version__
+from pypelines.disk import clear_directory_snapshots
+from pypelines.steps import BaseStep
+
+from .synthetic import make_synthetic_pipeline, make_sessions
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import logging, os, platform, statistics, sys, time
+
+import pandas as pd
+
+from typing import Any, Callable, Dict, Iterable, List
+
+BENCHMARKS: Dict[str, Callable[["BenchmarkContext"], Dict[str, Any]]] = {}
+
+
+def benchmark(name: str):
+    """Register the decorated function in BENCHMARKS, under name."""
+
+    def register(function: Callable[["BenchmarkContext"], Dict[str, Any]]):
+        BENCHMARKS[name] = function
+        return function
+
+    return register
+
+
+@dataclass
+class BenchmarkContext:
+    """The parameters of a benchmark run, and the synthetic pipeline and sessions the benchmarks use."""
+
+    root: Path
+    pipes: int = 10
+    steps_per_pipe: int = 3
+    depth: int = 4
+    fan_in: int = 2
+    sessions_count: int = 10
+    files: int = 5000
+    repeat: int = 5
+    seed: int = 0
+
+    runs: int = field(default=0, init=False)
+
+    def make_pipeline(self) -> Pipeline:
+        """Build a new synthetic pipeline with the parameters of the context, with an unique name."""
+        self.runs += 1
+        return make_synthetic_pipeline(
+            name=f"benchmark_{self.runs}",
+            pipes=self.pipes,
+            steps_per_pipe=self.steps_per_pipe,
+            depth=self.depth,
+            fan_in=self.fan_in,
+            seed=self.seed,
+        )
+
+    def make_sessions(self, name: str) -> pd.DataFrame:
+        """Create sessions_count new sessions, in a folder name inside the root folder."""
+        return make_sessions(self.root / name, self.sessions_count)
+
+    def parameters(self) -> Dict[str, Any]:
+        return {
+            "pipes": self.pipes,
+            "steps_per_pipe": self.steps_per_pipe,
+            "depth": self.depth,
+            "fan_in": self.fan_in,
+            "sessions": self.sessions_count,
+            "files": self.files,
+            "repeat": self.repeat,
+            "seed": self.seed,
+        }
+
+
+def summarize(durations: List[float], operations: int = 1) -> Dict[str, Any]:
+    """Return the statistics of a list of durations, in seconds.
+
+    Args:
+        durations (list): The durations of each repetition.
+        operations (int, optional): The number of operations timed in each repetition,
+            to compute the time per operation. Defaults to 1.
+
+    Returns:
+        dict: The minimum, median, mean and maximum durations, the duration per operation (from the minimum),
+            the number of repetitions and of operations per repetition.
+    """
+    return {
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "mean": statistics.mean(durations),
+        "max": max(durations),
+        "per_operation": min(durations) / max(operations, 1),
+        "repeat": len(durations),
+        "operations": operations,
+    }
+
+
+def measure(function: Callable[[], Any], repeat: int, setup: Callable[[], Any] | None = None) -> List[float]:
+    """Time repeat calls of function, calling setup (untimed) before each of them."""
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def get_final_steps(pipeline: Pipeline) -> List[BaseStep]:
+    """Return the steps of the pipeline that no other step requires."""
+    pipeline.resolve()
+    required = {requirement for step in pipeline.steps_index.values() for requirement in step.requires}
+    return [step for step in pipeline.steps_index.values() if step not in required]
+
+
+def generate_all(steps: Iterable[BaseStep], sessions: pd.DataFrame) -> None:
+    for step in steps:
+        for _, session in sessions.iterrows():
+            step.generate(session, check_requirements=True)
+
+
+@benchmark("resolve")
+def bench_resolve(context: BenchmarkContext) -> Dict[str, Any]:
+    pipeline = context.make_pipeline()
+
+    def unresolve():
+        pipeline.resolved = False
+
+    durations = measure(pipeline.resolve, context.repeat, setup=unresolve)
+    return summarize(durations)
+
+
+@benchmark("get_requirement_stack")
+def bench_get_requirement_stack(context: BenchmarkContext) -> Dict[str, Any]:
+    pipeline = context.make_pipeline()
+    pipeline.resolve()
+    steps = list(pipeline.steps_index.values())
+
+    def get_stacks():
+        for step in steps:
+            pipeline.get_requirement_stack(step)
+
+    return summarize(measure(get_stacks, context.repeat), len(steps))
+
+
+@benchmark("get_level")
+def bench_get_level(context: BenchmarkContext) -> Dict[str, Any]:
+    pipeline = context.make_pipeline()
+    pipeline.resolve()
+    steps = list(pipeline.steps_index.values())
+
+    def get_levels():
+        for step in steps:
+            step.get_level()
+            step.get_level(selfish=True)
+
+    return summarize(measure(get_levels, context.repeat), len(steps))
+
+
+@benchmark("generate_cold")
+def bench_generate_cold(context: BenchmarkContext) -> Dict[str, Any]:
+    pipeline = context.make_pipeline()
+    final_steps = get_final_steps(pipeline)
+
+    # each repetition generates on new sessions, with no file yet on disk
+    sessions_per_run = [context.make_sessions(f"generate_cold_{run}") for run in range(context.repeat)]
+    runs = iter(sessions_per_run)
+
+    def generate():
+        generate_all(final_steps, next(runs))
+
+    return summarize(measure(generate, context.repeat), len(final_steps) * context.sessions_count)
+
+
+@benchmark("generate_warm")
+def bench_generate_warm(context: BenchmarkContext) -> Dict[str, Any]:
+    pipeline = context.make_pipeline()
+    final_steps = get_final_steps(pipeline)
+    sessions = context.make_sessions("generate_warm")
+    generate_all(final_steps, sessions)
+
+    def generate():
+        generate_all(final_steps, sessions)
+
+    return summarize(measure(generate, context.repeat), len(final_steps) * context.sessions_count)
+
+
+@benchmark("multisession_load")
+def bench_multisession_load(context: BenchmarkContext) -> Dict[str, Any]:
+    pipeline = context.make_pipeline()
+    final_steps = get_final_steps(pipeline)
+    sessions = context.make_sessions("multisession_load")
+    generate_all(final_steps, sessions)
+
+    def load():
+        for step in final_steps:
+            step.load(sessions)
+
+    return summarize(measure(load, context.repeat), len(final_steps) * context.sessions_count)
+
+
+@benchmark("check_disk")
+def bench_check_disk(context: BenchmarkContext) -> Dict[str, Any]:
+    pipeline = context.make_pipeline()
+    pipeline.resolve()
+    steps = list(pipeline.steps_index.values())
+    session = context.make_sessions("check_disk").iloc[0]
+    generate_all(steps[:1], session.to_frame().T)
+
+    # unrelated files, named like outputs of other pipes, in the same folder as the outputs
+    folder = Path(session.path) / "preprocessing_saves"
+    folder.mkdir(parents=True, exist_ok=True)
+    for index in range(context.files):
+        (folder / f"{session.alias}.noise_{index}.step.1.pickle").touch()
+    # directories modified less than a few seconds ago are never served from snapshots, to avoid missing files
+    # written during the same clock tick. Their modification time is set in the past, as for settled sessions.
+    past = time.time() - 3600
+    os.utime(folder, (past, past))
+
+    def check_disk():
+        for step in steps:
+            step.get_disk_object(session).check_disk()
+
+    cold = measure(check_disk, context.repeat, setup=clear_directory_snapshots)
+    warm = measure(check_disk, context.repeat)
+    return {"cold": summarize(cold, len(steps)), "warm": summarize(warm, len(steps))}
+
+
+def run_benchmarks(
+    names: Iterable[str] | None = None,
+    root: str | Path | None = None,
+    **parameters,
+) -> Dict[str, Any]:
+    """Run the benchmarks, and return their results.
+
+    Args:
+        names (Iterable[str], optional): The names of the benchmarks to run (keys of BENCHMARKS).
+            Defaults to None, meaning all of them.
+        root (str | Path, optional): The folder in wich the sessions are created. Defaults to None,
+            meaning a temporary folder, deleted after the run.
+        **parameters: The parameters of the BenchmarkContext (pipes, steps_per_pipe, depth, fan_in,
+            sessions_count, files, repeat, seed).
+
+    Raises:
+        KeyError: If a name is not one of the registered benchmarks.
+
+    Returns:
+        dict: The parameters of the run, informations about the environment, and the results of each benchmark.
+    """
+    names = list(BENCHMARKS) if names is None else list(names)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise KeyError(f"Unknown benchmarks {unknown}. Available ones are {list(BENCHMARKS)}")
+
+    results = {}
+    # pipelines logs would otherwise be a large part of what is measured
+    logging.disable(logging.WARNING)
+    try:
+        with TemporaryDirectory(prefix="pypelines_benchmarks_") as temporary_root:
+            context = BenchmarkContext(root=Path(root if root is not None else temporary_root), **parameters)
+            for name in names:
+                results[name] = BENCHMARKS[name](context)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return {
+        "parameters": context.parameters(),
+        "environment": {
+            "pypelines": __version__,
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+        },
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
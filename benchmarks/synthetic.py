@@ -0,0 +1,94 @@
+from pypelines import Pipeline, stepmethod
+from pypelines.pickle_backend import PicklePipe
+from pypelines.sessions import Session
+
+import random
+import pandas as pd
+
+from pathlib import Path
+from typing import List
+
+
+def make_worker(payload_size: int):
+    """Return a step worker producing a small deterministic payload of payload_size integers."""
+
+    def worker(self, session, extra=""):
+        return {"step": self.relative_name, "session": session.alias, "values": list(range(payload_size))}
+
+    return worker
+
+
+def make_synthetic_pipeline(
+    name: str = "synthetic",
+    pipes: int = 10,
+    steps_per_pipe: int = 3,
+    depth: int = 4,
+    fan_in: int = 2,
+    payload_size: int = 100,
+    seed: int = 0,
+) -> Pipeline:
+    """Build a pipeline of configurable shape, made of PicklePipes whose steps return small payloads.
+
+    Pipes are spread over depth layers. The first step of each pipe requires the last step of fan_in pipes
+    (at most) picked at random in the previous layers, the first layer having no requirement.
+    Steps of a pipe require the previous step of the same pipe.
+    The fan-out of a pipe is thus the number of pipes of later layers that picked it.
+
+    Args:
+        name (str, optional): The name of the pipeline. Defaults to "synthetic".
+        pipes (int, optional): The number of pipes. Defaults to 10.
+        steps_per_pipe (int, optional): The number of steps in each pipe. Defaults to 3.
+        depth (int, optional): The number of layers of pipes of the requirement DAG. Defaults to 4.
+        fan_in (int, optional): The maximum number of pipes required by each pipe. Defaults to 2.
+        payload_size (int, optional): The length of the list returned by each step. Defaults to 100.
+        seed (int, optional): The seed of the random picking of requirements. Defaults to 0.
+
+    Returns:
+        Pipeline: The synthetic pipeline.
+    """
+    randomizer = random.Random(seed)
+    pipeline = Pipeline(name)
+
+    depth = max(1, min(depth, pipes))
+    layers: List[List[str]] = [[] for _ in range(depth)]
+    for index in range(pipes):
+        layers[index * depth // pipes].append(f"pipe_{index}")
+
+    previous_pipes: List[str] = []
+    for layer in layers:
+        for pipe_name in layer:
+            attributes = {}
+            requires = [
+                f"{required_pipe}.step_{steps_per_pipe - 1}"
+                for required_pipe in randomizer.sample(previous_pipes, min(fan_in, len(previous_pipes)))
+            ]
+            for step_index in range(steps_per_pipe):
+                if step_index > 0:
+                    requires = [f"{pipe_name}.step_{step_index - 1}"]
+                worker = make_worker(payload_size)
+                worker.__name__ = f"step_{step_index}"
+                attributes[worker.__name__] = stepmethod(requires=requires, version="1")(worker)
+            pipeline.register_pipe(type(pipe_name, (PicklePipe,), attributes))
+        previous_pipes.extend(layer)
+
+    return pipeline
+
+
+def make_sessions(root: str | Path, count: int = 10) -> pd.DataFrame:
+    """Create count sessions, with their folders inside root.
+
+    Args:
+        root (str | Path): The folder in wich the sessions folders are created.
+        count (int, optional): The number of sessions. Defaults to 10.
+
+    Returns:
+        pd.DataFrame: The sessions, with an u_alias column, indexed by their alias.
+    """
+    sessions = []
+    for number in range(count):
+        session = Session(subject="synthetic", date="2024-01-01", number=number, auto_path=True, path=root)
+        Path(session.path).mkdir(parents=True, exist_ok=True)
+        session["u_alias"] = session.alias
+        sessions.append(session)
+    sessions = pd.DataFrame(sessions)
+    return sessions.set_index(sessions["u_alias"], drop=False)
@@ -1,6 +1,22 @@
 from functools import wraps
 from logging import getLogger
-import json, re, os
+from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+import json, re, os, time
+
+from typing import Dict, List, Tuple, Any
+
+# parsed arguments files, by path, with the (mtime, size) of the file when it was parsed,
+# and the last time this (mtime, size) was checked against the file. Missing files are cached as None.
+_ARGUMENTS_FILES_CACHE: Dict[str, Tuple["Tuple[int, int] | None", Any, float]] = {}
+
+# delay, in seconds, during which a cached arguments file is used without checking it's (mtime, size) again.
+# 0 by default : the file is checked on every read, so edits are always seen. Can be raised to save stat calls
+# on slow file systems, if arguments files are not edited while pipelines run.
+REVALIDATION_DELAY = 0.0
+
+# number of sessions up to which preload_arguments reads the files inline, as starting threads would cost more
+PRELOAD_INLINE_MAX = 4
 
 
 def read_json_file(json_file: str):
@@ -24,6 +40,96 @@ def read_json_file(json_file: str):
     return json.loads(json_no_comments)
 
 
+def read_json_file_cached(json_file: str, revalidate_after: float | None = None):
+    """Loads a Json file like read_json_file, but keeps the parsed content in a process-wide cache.
+    The file is parsed again only if it's (mtime, size) changed.
+    That (mtime, size) is checked on every call, unless a revalidation delay is set.
+    The absence of a file is cached the same way.
+
+    Args:
+        json_file (str): file_path
+        revalidate_after (float, optional): Delay in seconds during which the cached content is used without
+            checking the file again. Defaults to None, meaning the REVALIDATION_DELAY module value (0, by default).
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist.
+
+    Returns:
+        dict: The python dictionnary corresponding to the json file's data. It is shared with the cache,
+            and must not be modified.
+    """
+    revalidate_after = REVALIDATION_DELAY if revalidate_after is None else revalidate_after
+    now = time.monotonic()
+
+    cached = _ARGUMENTS_FILES_CACHE.get(json_file)
+    if cached is not None and revalidate_after > 0 and now - cached[2] < revalidate_after:
+        file_key, data = cached[0], cached[1]
+    else:
+        try:
+            stat = os.stat(json_file)
+            file_key = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            file_key = None
+
+        if cached is not None and cached[0] == file_key:
+            data = cached[1]
+        else:
+            data = read_json_file(json_file) if file_key is not None else None
+        _ARGUMENTS_FILES_CACHE[json_file] = (file_key, data, now)
+
+    if file_key is None:
+        raise FileNotFoundError(f"No such file : {json_file}")
+    return data
+
+
+def clear_arguments_cache():
+    """Forget all the arguments files parsed and cached by read_json_file_cached."""
+    _ARGUMENTS_FILES_CACHE.clear()
+
+
+def get_session_arguments_path(session, pipeline, file_suffix="_arguments.json") -> str:
+    """Return the path of the arguments file of a pipeline, for a session.
+
+    Args:
+        session: The session object containing the path information.
+        pipeline: The pipeline object for which the arguments file path is needed.
+        file_suffix: The suffix to be appended to the arguments file name (default is "_arguments.json").
+
+    Returns:
+        str: The path of the arguments file.
+    """
+    return os.path.join(session.path, pipeline.pipeline_name + file_suffix)
+
+
+def preload_arguments(sessions, pipeline, file_suffix="_arguments.json", max_workers=16) -> int:
+    """Reads the arguments files of a pipeline for all the sessions of a DataFrame,
+    and puts them in the arguments files cache, so that the generation of each session doesn't need to.
+    They are read in parallel if there are more than PRELOAD_INLINE_MAX sessions, and one after another otherwise.
+
+    Args:
+        sessions (pandas.DataFrame): The sessions to read the arguments files of.
+        pipeline: The pipeline for which the arguments files are read.
+        file_suffix: The suffix to be appended to the arguments file name (default is "_arguments.json").
+        max_workers (int, optional): The number of threads reading files at the same time. Defaults to 16.
+
+    Returns:
+        int: The number of sessions for wich an arguments file was found.
+    """
+
+    def preload(path: str) -> bool:
+        try:
+            read_json_file_cached(path, revalidate_after=0)
+            return True
+        except FileNotFoundError:
+            return False
+
+    paths = [get_session_arguments_path(session, pipeline, file_suffix) for _, session in sessions.iterrows()]
+    if len(paths) <= PRELOAD_INLINE_MAX:
+        return sum(map(preload, paths))
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as pool:
+        return sum(pool.map(preload, paths))
+
+
 def read_session_arguments_file(session, step, file_suffix="_arguments.json"):
     """Reads the arguments file for a specific session and step.
 
@@ -38,12 +144,30 @@ def read_session_arguments_file(session, step, file_suffix="_arguments.json"):
     Raises:
         FileNotFoundError: If the arguments file for the specified session and step is not found.
     """
-    file_name = step.pipeline.pipeline_name + file_suffix
+    return deepcopy(read_session_arguments_file_cached(session, step, file_suffix))
+
+
+def read_session_arguments_file_cached(session, step, file_suffix="_arguments.json"):
+    """Reads the arguments file for a specific session and step, from the arguments files cache if up to date.
+
+    Args:
+        session: The session object containing the path information.
+        step: The step object for which the arguments file needs to be read.
+        file_suffix: The suffix to be appended to the arguments file name (default is "_arguments.json").
+
+    Returns:
+        The contents of the arguments file as a dictionary. It is shared with the cache, and must not be modified.
+
+    Raises:
+        FileNotFoundError: If the arguments file for the specified session and step is not found.
+    """
+    path = get_session_arguments_path(session, step.pipeline, file_suffix)
     try:
-        path = os.path.join(session.path, file_name)
-        return read_json_file(path)
+        return read_json_file_cached(path)
     except FileNotFoundError:
-        raise FileNotFoundError(f"Could not open the config file {file_name} for the session {session.alias}")
+        raise FileNotFoundError(
+            f"Could not open the config file {os.path.basename(path)} for the session {session.alias}"
+        )
 
 
 def autoload_arguments(wrapped_function, step):
@@ -115,7 +239,7 @@ def get_step_arguments(session, step):
     local_log = getLogger("autoload_arguments")
 
     try:
-        config_args = read_session_arguments_file(session, step)["functions"][step.relative_name]
+        config_args = read_session_arguments_file_cached(session, step)["functions"][step.relative_name]
     except FileNotFoundError as e:
         local_log.debug(f"{type(e).__name__} : {e}. Skipping autoload_arguments")
         return {}
@@ -126,4 +250,5 @@ def get_step_arguments(session, step):
         )
         return {}
 
-    return config_args
+    # the cached arguments are copied, as they get updated with the arguments of the call
+    return deepcopy(config_args)
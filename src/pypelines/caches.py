@@ -0,0 +1,222 @@
+from collections import OrderedDict
+from threading import RLock
+from logging import getLogger
+import sys
+
+import numpy as np
+import pandas as pd
+
+from typing import Any, Dict, Hashable, Tuple
+
+
+def estimate_size(obj: Any) -> int:
+    """Estimate the memory size of an object, in bytes, including the objects it contains.
+
+    DataFrames, Series, Indexes and numpy arrays are measured directly from their buffers.
+    Containers (dict, list, tuple, set) and objects attributes are walked, counting each object only once.
+
+    Args:
+        obj (Any): The object to measure.
+
+    Returns:
+        int: The estimated size of the object, in bytes.
+    """
+    size = 0
+    seen = set()
+    to_measure = [obj]
+
+    while to_measure:
+        item = to_measure.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+
+        if isinstance(item, pd.DataFrame):
+            size += int(item.memory_usage(deep=True, index=True).sum())
+        elif isinstance(item, (pd.Series, pd.Index)):
+            size += int(item.memory_usage(deep=True))
+        elif isinstance(item, np.ndarray):
+            size += sys.getsizeof(item) if item.base is None else item.nbytes + sys.getsizeof(item)
+        elif isinstance(item, dict):
+            size += sys.getsizeof(item)
+            to_measure.extend(item.keys())
+            to_measure.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            size += sys.getsizeof(item)
+            to_measure.extend(item)
+        elif isinstance(item, (str, bytes, bytearray, int, float, complex, bool)) or item is None:
+            size += sys.getsizeof(item)
+        else:
+            size += sys.getsizeof(item)
+            attributes = getattr(item, "__dict__", None)
+            if attributes is not None:
+                to_measure.append(attributes)
+
+    return size
+
+
+class BaseCacheStore:
+    """A store that keeps data in memory, for CachedDiskObject.
+    Values are identified by a key, and can belong to a group (the pipe name for CachedDiskObject)."""
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value stored for the key, or default if there is none."""
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any, group: str | None = None) -> None:
+        """Store a value for the key, replacing any previous value."""
+        raise NotImplementedError
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove the value stored for the key, and return it, or default if there is none."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Remove all stored values."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """Return usage statistics of the store."""
+        return {}
+
+
+class DictCacheStore(BaseCacheStore):
+    """An unbounded cache store, keeping every value until it is cleared."""
+
+    def __init__(self):
+        self.storage: Dict[Hashable, Any] = {}
+
+    def get(self, key, default=None):
+        return self.storage.get(key, default)
+
+    def set(self, key, value, group=None):
+        self.storage[key] = value
+
+    def pop(self, key, default=None):
+        return self.storage.pop(key, default)
+
+    def clear(self):
+        self.storage.clear()
+
+    def stats(self):
+        return {"entries": len(self.storage)}
+
+
+class LRUCacheStore(BaseCacheStore):
+    """A cache store bounded by a memory budget, in bytes, evicting the least recently used values first.
+
+    The size of each value is estimated with estimate_size when it is stored.
+    Groups can additionally be given their own budget (quota), so that a single pipe cannot use all the budget.
+    Values bigger than the budget that applies to them are not stored at all.
+    Hits, misses and evictions are counted, and available with the stats method.
+    """
+
+    def __init__(self, max_bytes: int | None = 2 * 1024**3, quotas: Dict[str, int] | None = None):
+        """Initialize the cache store.
+
+        Args:
+            max_bytes (int | None, optional): The total memory budget of the store, in bytes.
+                None means unbounded. Defaults to 2 GiB.
+            quotas (dict, optional): Memory budgets of some groups (pipe names), in bytes. Defaults to None.
+        """
+        self.max_bytes = max_bytes
+        self.quotas: Dict[str, int] = dict(quotas) if quotas else {}
+
+        self.entries: "OrderedDict[Hashable, Tuple[Any, int, str | None]]" = OrderedDict()
+        self.total_bytes = 0
+        self.group_bytes: Dict[str | None, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.lock = RLock()
+
+    def set_quota(self, group: str, max_bytes: int | None) -> None:
+        """Set the memory budget of a group (pipe name), in bytes. None removes the quota of the group.
+
+        Args:
+            group (str): The group to set a quota for.
+            max_bytes (int | None): The budget of the group, in bytes.
+        """
+        with self.lock:
+            if max_bytes is None:
+                self.quotas.pop(group, None)
+            else:
+                self.quotas[group] = max_bytes
+                self.evict(group)
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, group=None):
+        size = estimate_size(value)
+        with self.lock:
+            self.pop(key)
+
+            limits = [limit for limit in (self.max_bytes, self.quotas.get(group)) if limit is not None]
+            if limits and size > min(limits):
+                getLogger("cache_store").debug(
+                    f"Not caching {key}, as it's size ({size} bytes) exceeds the cache budget ({min(limits)} bytes)"
+                )
+                self.evictions += 1
+                return
+
+            self.entries[key] = (value, size, group)
+            self.total_bytes += size
+            self.group_bytes[group] = self.group_bytes.get(group, 0) + size
+            self.evict(group)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return default
+            value, size, group = entry
+            self.total_bytes -= size
+            self.group_bytes[group] -= size
+            return value
+
+    def evict(self, group: str | None = None) -> None:
+        """Evict the least recently used values, until the group and the whole store are within their budgets.
+
+        Args:
+            group (str, optional): The group to check the quota of. Defaults to None.
+        """
+        with self.lock:
+            quota = self.quotas.get(group) if group is not None else None
+            if quota is not None and self.group_bytes.get(group, 0) > quota:
+                for key in [key for key, entry in self.entries.items() if entry[2] == group]:
+                    if self.group_bytes[group] <= quota:
+                        break
+                    self.pop(key)
+                    self.evictions += 1
+
+            if self.max_bytes is not None:
+                while self.total_bytes > self.max_bytes and self.entries:
+                    self.pop(next(iter(self.entries)))
+                    self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+            self.group_bytes.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,249 @@
+import os, sqlite3, threading, time
+import pandas as pd
+
+from typing import Any, Dict, Iterable, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .pipelines import Pipeline
+    from .disk import BaseDiskObject
+
+CATALOG_COLUMNS = [
+    "path",
+    "pipeline",
+    "pipe",
+    "step",
+    "session",
+    "session_path",
+    "extra",
+    "version",
+    "size",
+    "mtime",
+    "recorded_at",
+]
+
+
+class OutputCatalog:
+    """A local SQLite database recording the outputs saved on disk by the pipelines, one row per output file,
+    so that knowing which sessions have an output doesn't require to scan the folders of all the sessions.
+
+    The disk objects record their outputs in the catalog of their pipeline when saving them (see Pipeline.set_catalog).
+    Outputs saved by other means (or removed) are taken into account by running reconcile, which rebuilds the rows
+    of some sessions from what is found on disk.
+    """
+
+    def __init__(self, path: str, timeout: float = 30):
+        """Open the catalog database, creating it if it doesn't exist.
+
+        Args:
+            path (str): The path of the SQLite database file.
+            timeout (float, optional): Seconds to wait for other processes to release the database
+                when writing at the same time. Defaults to 30.
+        """
+        self.path = os.path.abspath(path)
+        self.timeout = timeout
+        # sqlite connections cannot be shared between threads, nor used after a fork
+        self.connections = threading.local()
+
+        connection = self.connect()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS outputs ("
+                "path TEXT PRIMARY KEY, pipeline TEXT NOT NULL, pipe TEXT NOT NULL, step TEXT NOT NULL, "
+                "session TEXT, session_path TEXT NOT NULL, extra TEXT NOT NULL, version TEXT, "
+                "size INTEGER, mtime REAL, recorded_at REAL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS outputs_by_pipe ON outputs (pipeline, pipe, session_path, extra)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS outputs_by_step ON outputs (pipeline, pipe, step, version)")
+
+    def connect(self) -> sqlite3.Connection:
+        """Return the connection to the database of the current thread (and process), opening it if needed."""
+        connection = getattr(self.connections, "connection", None)
+        if connection is None or self.connections.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            # readers don't block writers (and the other way around), which allows concurrent workers
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.connections.connection = connection
+            self.connections.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def make_row(disk_object: "BaseDiskObject", path: str, saved: bool = True) -> Dict[str, Any]:
+        """Return the catalog row describing the output of a disk object at path.
+
+        Args:
+            disk_object (BaseDiskObject): The disk object of the output.
+            path (str): The path of the output.
+            saved (bool, optional): If True, the output has just been saved by the disk object, and belongs to it's
+                step, at the current version. Otherwise, the step and version are the ones found on disk by
+                check_disk. Defaults to True.
+
+        Returns:
+            dict: The catalog row.
+        """
+        stat = os.stat(path)
+        if saved:
+            step = disk_object.step.step_name
+            version = getattr(disk_object, "version", None) or None
+        else:
+            disk_step = disk_object.disk_step
+            step = (
+                disk_step if isinstance(disk_step, str) else getattr(disk_step, "step_name", disk_object.step.step_name)
+            )
+            version = disk_object.disk_version or None
+        return {
+            "path": os.path.abspath(path),
+            "pipeline": disk_object.step.pipeline_name,
+            "pipe": disk_object.step.pipe_name,
+            "step": step,
+            "session": getattr(disk_object.session, "alias", None),
+            "session_path": os.path.abspath(str(disk_object.session.path)),
+            "extra": disk_object.extra or "",
+            "version": version,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "recorded_at": time.time(),
+        }
+
+    def record(self, disk_object: "BaseDiskObject", path: str, replace_pipe: bool = True) -> None:
+        """Record the output of a disk object, saved at path.
+
+        Args:
+            disk_object (BaseDiskObject): The disk object that saved the output.
+            path (str): The path of the saved output.
+            replace_pipe (bool, optional): If True, the other outputs recorded for the same pipe, session and extra
+                are removed from the catalog, as they are replaced on disk by this one. Defaults to True.
+        """
+        row = self.make_row(disk_object, path)
+        connection = self.connect()
+        with connection:
+            if replace_pipe:
+                connection.execute(
+                    "DELETE FROM outputs WHERE pipeline = ? AND pipe = ? AND session_path = ? AND extra = ?",
+                    (row["pipeline"], row["pipe"], row["session_path"], row["extra"]),
+                )
+            connection.execute(
+                f"INSERT OR REPLACE INTO outputs ({', '.join(CATALOG_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(CATALOG_COLUMNS))})",
+                [row[column] for column in CATALOG_COLUMNS],
+            )
+
+    def reconcile(self, pipeline: "Pipeline", sessions: pd.DataFrame, extras: Iterable[str] | None = None) -> int:
+        """Rebuild the rows of the catalog for some sessions of a pipeline, from the outputs found on disk.
+
+        For each pipe, the outputs are searched for the extras given, the default extra of the pipe highest step,
+        and the extras recorded in the outputs index of the pipe (for backends having one).
+
+        Args:
+            pipeline (Pipeline): The pipeline to rebuild the rows of.
+            sessions (pd.DataFrame): The sessions to rebuild the rows of.
+            extras (Iterable[str], optional): Additional extras to search outputs for. Defaults to None.
+
+        Returns:
+            int: The number of outputs found on disk, and recorded.
+        """
+        pipeline.resolve()
+        rows = []
+        session_paths = []
+        for _, session in sessions.iterrows():
+            session_paths.append(os.path.abspath(str(session.path)))
+            for pipe in pipeline.pipes.values():
+                step = pipe.ordered_steps("highest")[0]
+                searched_extras = set(extras or [])
+                try:
+                    searched_extras.add(step.get_default_extra())
+                except ValueError:
+                    pass
+                index_disk_object = step.get_disk_object(session, next(iter(searched_extras), ""))
+                if hasattr(index_disk_object, "get_outputs_index_path"):
+                    from .pickle_backend import read_outputs_index
+
+                    index = read_outputs_index(index_disk_object.get_outputs_index_path())
+                    searched_extras.update(index.get("outputs", {}).keys())
+
+                for extra in searched_extras:
+                    disk_object = step.get_disk_object(session, extra)
+                    path = getattr(disk_object, "current_disk_file", None)
+                    if disk_object.is_loadable() and path is not None and os.path.exists(path):
+                        rows.append(self.make_row(disk_object, path, saved=False))
+
+        connection = self.connect()
+        with connection:
+            connection.execute("CREATE TEMP TABLE IF NOT EXISTS reconciled_sessions (session_path TEXT PRIMARY KEY)")
+            connection.execute("DELETE FROM reconciled_sessions")
+            connection.executemany(
+                "INSERT OR IGNORE INTO reconciled_sessions VALUES (?)", [(path,) for path in session_paths]
+            )
+            connection.execute(
+                "DELETE FROM outputs WHERE pipeline = ? "
+                "AND session_path IN (SELECT session_path FROM reconciled_sessions)",
+                (pipeline.pipeline_name,),
+            )
+            connection.executemany(
+                f"INSERT OR REPLACE INTO outputs ({', '.join(CATALOG_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(CATALOG_COLUMNS))})",
+                [[row[column] for column in CATALOG_COLUMNS] for row in rows],
+            )
+        return len(rows)
+
+    def query(
+        self,
+        pipeline: str | None = None,
+        pipe: str | None = None,
+        step: str | None = None,
+        version: str | None = None,
+        extra: str | None = None,
+        sessions: pd.DataFrame | None = None,
+    ) -> pd.DataFrame:
+        """Return the outputs recorded in the catalog, as a DataFrame with one row per output.
+        All given criteria must be met.
+
+        Args:
+            pipeline (str, optional): The name of the pipeline of the outputs. Defaults to None.
+            pipe (str, optional): The name of the pipe of the outputs. Defaults to None.
+            step (str, optional): The name of the step of the outputs. Defaults to None.
+            version (str, optional): The pipe version of the outputs. Defaults to None.
+            extra (str, optional): The extra of the outputs. Defaults to None.
+            sessions (pd.DataFrame, optional): Sessions the outputs must belong to (matched by path).
+                Defaults to None.
+
+        Returns:
+            pd.DataFrame: The outputs, with the columns path, pipeline, pipe, step, session, session_path, extra,
+                version, size, mtime and recorded_at.
+        """
+        conditions: List[str] = []
+        parameters: List[Any] = []
+        for column, value in (("pipeline", pipeline), ("pipe", pipe), ("step", step), ("version", version)):
+            if value is not None:
+                conditions.append(f"outputs.{column} = ?")
+                parameters.append(value)
+        if extra is not None:
+            conditions.append("outputs.extra = ?")
+            parameters.append(extra)
+
+        connection = self.connect()
+        join = ""
+        if sessions is not None:
+            # sessions are matched with a join on a temporary table, as they can exceed the number of sql variables
+            with connection:
+                connection.execute("CREATE TEMP TABLE IF NOT EXISTS queried_sessions (session_path TEXT PRIMARY KEY)")
+                connection.execute("DELETE FROM queried_sessions")
+                connection.executemany(
+                    "INSERT OR IGNORE INTO queried_sessions VALUES (?)",
+                    [(os.path.abspath(str(path)),) for path in sessions["path"]],
+                )
+            join = " JOIN queried_sessions ON outputs.session_path = queried_sessions.session_path"
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT {', '.join('outputs.' + column for column in CATALOG_COLUMNS)} FROM outputs{join}{where}"
+        return pd.read_sql_query(sql, connection, params=parameters)
+
+    def close(self) -> None:
+        """Close the connection of the current thread to the database."""
+        connection = getattr(self.connections, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.connections.connection = None
@@ -1,4 +1,4 @@
-from .tasks import BaseTaskBackend, BaseStepTaskManager
+from .tasks import BaseTaskBackend, BaseStepTaskManager, TaskBatch
 from .pipelines import Pipeline
 from .loggs import FileFormatter
 from pathlib import Path
@@ -9,17 +9,41 @@ from logging import getLogger
 from platform import node
 from pandas import Series
 import platform
-from threading import Thread
+from threading import Lock, Thread
+from concurrent.futures import ThreadPoolExecutor
+import os
 
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, Dict, List
 
 if TYPE_CHECKING:
     from celery import Celery
+    from one.api import ONE
     from .steps import BaseStep
 
 
 APPLICATIONS_STORE = {}
 
+_ONE_CONNECTORS: Dict[int, "ONE"] = {}  # remote ONE connectors, by process id
+_ONE_CONNECTORS_LOCK = Lock()
+
+
+def get_one_connector() -> "ONE":
+    """Return the remote ONE connector of the current process, creating it on first use.
+    It is shared by all the task records, instead of connecting to alyx again for each request.
+    Each process gets a connector of it's own, as the connections of a parent are not usable by forked processes.
+
+    Returns:
+        ONE: The connector.
+    """
+    pid = os.getpid()
+    with _ONE_CONNECTORS_LOCK:
+        connector = _ONE_CONNECTORS.get(pid)
+        if connector is None:
+            from one import ONE
+
+            connector = _ONE_CONNECTORS[pid] = ONE(mode="remote", data_access_mode="remote")
+    return connector
+
 
 class CeleryAlyxTaskManager(BaseStepTaskManager):
 
@@ -38,19 +62,23 @@ class CeleryAlyxTaskManager(BaseStepTaskManager):
             # self.backend.app.task(CeleryRunner, name=self.step.complete_name)
             self.backend.app.register_task(self.get_runner())
 
-    def start(self, session, extra=None, **kwargs):
+    def start(self, session, extra=None, fan_out=False, **kwargs):
         """Starts a task on a celery cluster.
 
         Args:
             session: The session to use for the task.
             extra: Extra information to pass to the task (default is None).
+            fan_out (bool, optional): If True, the requirements to generate are planned before submission, and each
+                of them is ran by a task of it's own, independent requirements running at the same time on different
+                workers. Otherwise, the whole requirement tree is ran by a single task. Defaults to False.
             **kwargs: Additional keyword arguments to pass to the task.
 
         Raises:
             NotImplementedError: If the pipeline does not have a working celery backend.
 
         Returns:
-            The created CeleryTaskRecord.
+            The created CeleryTaskRecord. With fan_out, the records of the requirements tasks are in it's
+            subtasks attribute.
         """
 
         if not self.backend:
@@ -58,8 +86,33 @@ class CeleryAlyxTaskManager(BaseStepTaskManager):
                 "Cannot start a task on a celery cluster as this pipeline " "doesn't have a working celery backend"
             )
 
+        if fan_out:
+            return CeleryTaskRecord.create_fan_out(self, session, extra, **kwargs)
         return CeleryTaskRecord.create(self, session, extra, **kwargs)
 
+    def start_batch(self, sessions, extras=None, extra=None, **kwargs) -> TaskBatch:
+        """Starts a task on a celery cluster for each session of a DataFrame, creating the task records in alyx
+        with concurrent requests, and publishing all the tasks at once.
+
+        Args:
+            sessions (DataFrame): The sessions to start tasks for.
+            extras (list, optional): The extra of each session. Defaults to None.
+            extra (optional): The extra of all the sessions. Cannot be used with extras. Defaults to None.
+            **kwargs: Additional keyword arguments to pass to the tasks.
+
+        Raises:
+            NotImplementedError: If the pipeline does not have a working celery backend.
+
+        Returns:
+            TaskBatch: The handle on the created tasks.
+        """
+        if not self.backend:
+            raise NotImplementedError(
+                "Cannot start a task on a celery cluster as this pipeline " "doesn't have a working celery backend"
+            )
+
+        return CeleryTaskRecord.create_batch(self, sessions, extras=extras, extra=extra, **kwargs)
+
     def get_runner(superself):  # type: ignore
         """Return a CeleryRunner task for executing a step in a pipeline.
 
@@ -71,6 +124,8 @@ class CeleryAlyxTaskManager(BaseStepTaskManager):
 
         Raises:
             Any exceptions that occur during the execution of the task.
+            RuntimeError: If the step failed, once the failure is recorded in alyx, so that celery marks the task
+                as failed and stops the chain it is part of, if any (see CeleryTaskRecord.create_fan_out).
         """
         from celery import Task
 
@@ -112,11 +167,17 @@ class CeleryAlyxTaskManager(BaseStepTaskManager):
 
                 task.partial_update()
 
+                if task["status"] in ("Failed", "Uncatched_Fail"):
+                    # raising marks the celery task as failed, and prevents the next tasks of a chain from running
+                    raise RuntimeError(f"The task {task_id} ({self.name}) ended with the status {task['status']}")
+
         return CeleryRunner
 
 
 class CeleryTaskRecord(dict):
     session: Series
+    # the records of the tasks of the requirements, for tasks started with fan_out
+    subtasks: List["CeleryTaskRecord"] = []
 
     # a class to make dictionnary keys accessible with attribute syntax
     def __init__(self, task_id, task_infos_dict={}, response_handle=None, session=None):
@@ -131,9 +192,7 @@ class CeleryTaskRecord(dict):
         """
 
         if not task_infos_dict:
-            from one import ONE
-
-            connector = ONE(mode="remote", data_access_mode="remote")
+            connector = get_one_connector()
             task_infos_dict = connector.alyx.rest("tasks", "read", id=task_id)
 
         super().__init__(task_infos_dict)
@@ -165,6 +224,38 @@ class CeleryTaskRecord(dict):
 
         self["status"] = status
 
+    def refresh(self):
+        """Update the record with it's current content in the alyx database, and return it."""
+        connector = get_one_connector()
+        self.update(connector.alyx.rest("tasks", "read", id=self.task_id))
+        return self
+
+    @staticmethod
+    def refresh_many(records: List["CeleryTaskRecord"]) -> None:
+        """Update records with their current content in the alyx database, with a single tasks list query per step :
+        the tasks of the step modified since the oldest of the records was created (alyx updates the datetime of a
+        task each time it changes). The records that query doesn't return are read one by one.
+
+        Args:
+            records (list): The records to update.
+        """
+        connector = get_one_connector()
+        records_by_name: Dict[str, List[CeleryTaskRecord]] = {}
+        for record in records:
+            records_by_name.setdefault(record["name"], []).append(record)
+
+        for name, named_records in records_by_name.items():
+            dates = [record.get("datetime") for record in named_records]
+            found = {}
+            if all(dates):
+                tasks = connector.alyx.rest("tasks", "list", name=name, django=f"datetime__gte,{min(dates)}")
+                found = {task["id"]: task for task in tasks}
+            for record in named_records:
+                if record.task_id in found:
+                    record.update(found[record.task_id])
+                else:
+                    record.refresh()
+
     def partial_update(self):
         """Partially updates a task using the ONE API.
 
@@ -174,9 +265,7 @@ class CeleryTaskRecord(dict):
         Returns:
             None
         """
-        from one import ONE
-
-        connector = ONE(mode="remote", data_access_mode="remote")
+        connector = get_one_connector()
         connector.alyx.rest("tasks", "partial_update", **self.export())
 
     def get_session(self):
@@ -186,9 +275,7 @@ class CeleryTaskRecord(dict):
             The session object.
         """
         if self.session is None:
-            from one import ONE
-
-            connector = ONE(mode="remote", data_access_mode="remote")
+            connector = get_one_connector()
             session = connector.search(id=self["session"], no_cache=True, details=True)
             self.session = session  # type: ignore
 
@@ -304,9 +391,7 @@ class CeleryTaskRecord(dict):
         Returns:
             CeleryTaskRecord: A CeleryTaskRecord object representing the created task.
         """
-        from one import ONE
-
-        connector = ONE(mode="remote", data_access_mode="remote")
+        connector = get_one_connector()
 
         data = {
             "session": session.name,
@@ -325,6 +410,134 @@ class CeleryTaskRecord(dict):
             task_dict["id"], task_infos_dict=task_dict, response_handle=response_handle, session=session
         )
 
+    @staticmethod
+    def create_batch(
+        task_manager: CeleryAlyxTaskManager, sessions, extras=None, extra=None, max_workers: int = 16, **kwargs
+    ) -> TaskBatch:
+        """Creates a task for each session of a DataFrame, with concurrent requests to alyx, and publishes them
+        all through a single connection to the broker.
+
+        Args:
+            task_manager (CeleryAlyxTaskManager): The CeleryAlyxTaskManager instance to use.
+            sessions (DataFrame): The sessions to create tasks for.
+            extras (list, optional): The extra of each session. Defaults to None.
+            extra (optional): The extra of all the sessions. Cannot be used with extras. Defaults to None.
+            max_workers (int, optional): The number of requests made to alyx at the same time. Defaults to 16.
+            **kwargs: Additional keyword arguments to pass to the tasks.
+
+        Returns:
+            TaskBatch: The handle on the created tasks.
+        """
+        connector = get_one_connector()
+        app = task_manager.backend.app
+        extras = task_manager.step.multisession.get_extras(sessions, extras=extras, extra=extra)
+        sessions_list = [session for _, session in sessions.iterrows()]
+
+        def create_task(session) -> dict:
+            data = {
+                "session": session.name,
+                "name": task_manager.step.complete_name,
+                "arguments": kwargs,
+                "status": "Waiting",
+                "executable": str(app.main),
+            }
+            return connector.alyx.rest("tasks", "create", data=data)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            task_dicts = list(pool.map(create_task, sessions_list))
+
+        worker = app.tasks[task_manager.step.complete_name]
+        with app.producer_or_acquire() as producer:
+            response_handles = [
+                worker.apply_async((task_dict["id"],), {"extra": extra}, producer=producer)
+                for task_dict, extra in zip(task_dicts, extras)
+            ]
+
+        return TaskBatch(
+            [
+                CeleryTaskRecord(task_dict["id"], task_infos_dict=task_dict, response_handle=handle, session=session)
+                for task_dict, handle, session in zip(task_dicts, response_handles, sessions_list)
+            ],
+            max_workers=max_workers,
+        )
+
+    @staticmethod
+    def create_fan_out(
+        task_manager: CeleryAlyxTaskManager, session, extra=None, max_workers: int = 16, **kwargs
+    ) -> "CeleryTaskRecord":
+        """Creates the tasks generating a step and the requirements it needs for a session, one task per step,
+        with concurrent requests to alyx, and submits them as a celery canvas : a chain of groups, each group holding
+        the tasks that only depend on the ones of the previous groups. Steps already up to date on disk are left out,
+        according to the plan of the generation (see BaseStep.plan).
+        If a task fails, the chain stops : the tasks of the next groups don't run, and stay "Waiting" in alyx.
+
+        Args:
+            task_manager (CeleryAlyxTaskManager): The CeleryAlyxTaskManager instance of the step to generate.
+            session: The session to associate with the tasks.
+            extra (optional): Any extra information to include in the task of the step.
+            max_workers (int, optional): The number of requests made to alyx at the same time. Defaults to 16.
+            **kwargs: Additional keyword arguments to pass to the task of the step.
+
+        Returns:
+            CeleryTaskRecord: The record of the task of the step, with the records of the tasks of the requirements
+                in it's subtasks attribute. If nothing has to be computed, the step task is created as with create.
+                If only requirements have to be computed, the record of the last one is returned instead.
+        """
+        from celery import chain, group
+
+        step = task_manager.step
+        management_arguments = CeleryTaskRecord(None, task_infos_dict={"arguments": kwargs}).management_arguments
+        # save_output is not an argument of the plan : planned outputs are always saved
+        plan_arguments = ("skip", "refresh", "refresh_requirements", "check_requirements")
+        plan = step.plan(session, extra=extra, **{key: management_arguments[key] for key in plan_arguments})
+        waves = plan.get_waves()
+        if not waves:
+            return CeleryTaskRecord.create(task_manager, session, extra, **kwargs)
+
+        connector = get_one_connector()
+        app = task_manager.backend.app
+
+        def create_task(entry) -> dict:
+            # planned steps are computed without checking the disk nor the requirements again
+            arguments = kwargs.copy() if entry.requested else {}
+            arguments.update(refresh=True, check_requirements=False, refresh_requirements=False)
+            data = {
+                "session": session.name,
+                "name": entry.step.complete_name,
+                "arguments": arguments,
+                "status": "Waiting",
+                "executable": str(app.main),
+            }
+            return connector.alyx.rest("tasks", "create", data=data)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            task_dicts = iter(list(pool.map(create_task, [entry for wave in waves for entry in wave])))
+
+        records = []
+        main_record = None
+        signatures = []
+        for wave in waves:
+            wave_signatures = []
+            for entry in wave:
+                task_dict = next(task_dicts)
+                record = CeleryTaskRecord(task_dict["id"], task_infos_dict=task_dict, session=session)
+                if entry.requested:
+                    main_record = record
+                else:
+                    records.append(record)
+                wave_signatures.append(app.tasks[entry.step.complete_name].si(task_dict["id"], extra=entry.extra))
+            signatures.append(group(wave_signatures) if len(wave_signatures) > 1 else wave_signatures[0])
+
+        response_handle = chain(*signatures).apply_async()
+
+        # if the step itself is up to date and only some requirements have to be computed, the last one stands for it
+        if main_record is None:
+            main_record = records.pop(-1)
+        for record in records + [main_record]:
+            record.response = response_handle
+        main_record.subtasks = records
+        return main_record
+
     @staticmethod
     def create_from_task_name(app: "Celery", task_name: str, pipeline_name: str, session, extra=None, **kwargs):
         """Create a new task from the given task name and pipeline name.
@@ -340,9 +553,7 @@ class CeleryTaskRecord(dict):
         Returns:
             CeleryTaskRecord: A record of the created Celery task.
         """
-        from one import ONE
-
-        connector = ONE(mode="remote", data_access_mode="remote")
+        connector = get_one_connector()
 
         data = {
             "session": session.name if isinstance(session, Series) else session,
@@ -463,7 +674,7 @@ class LogTask:
         Returns:
             self: The current instance of the context manager.
         """
-        self.path.mkdir(exist_ok=True)
+        self.path.mkdir(parents=True, exist_ok=True)
         self.logger = getLogger()
         self.set_handler()
         return self
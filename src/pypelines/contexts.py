@@ -0,0 +1,207 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from copy import deepcopy
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .steps import BaseStep
+
+_RUN_CONTEXT: ContextVar["RunContext | None"] = ContextVar("pypelines_run_context", default=None)
+
+_MISSING = object()
+
+
+def copy_result(result: Any) -> Any:
+    """Return a copy of a step result, so that the worker receiving it cannot alter the stored one.
+
+    Args:
+        result (Any): The step result.
+
+    Returns:
+        Any: A copy of the result. pandas and numpy objects are copied with their own copy method, others deep copied.
+    """
+    if isinstance(result, (pd.DataFrame, pd.Series, pd.Index, np.ndarray)):
+        return result.copy()
+    return deepcopy(result)
+
+
+class RunContext:
+    """Holds the outputs of the steps generated during a top-level generate call (the step and all the
+    requirements it triggered), so that the steps using them can get them without reading them from the disk.
+
+    Outputs are kept by pipe, session and extra, and a new output of a pipe replaces the outputs of the other steps
+    of that pipe if the disk backend only keeps one file per pipe (step_traceback attribute not "multi"),
+    to mirror what is found on the disk.
+
+    If write behind is enabled, the saves of the outputs are performed by background threads, while the next steps
+    compute. Accessing the disk objects of a pipe, session and extra waits for the saves pending for them,
+    and all saves are waited for when the top-level generate call returns.
+    """
+
+    write_behind_workers = 4
+
+    def __init__(self):
+        self.results: Dict[Tuple[str, Hashable, str], Dict[str, Any]] = {}
+        self.lock = Lock()
+
+        self.save_pool: ThreadPoolExecutor | None = None
+        self.pending_saves: Dict[Tuple[str, Hashable, str], List[Future]] = {}
+
+    @staticmethod
+    def get_keys(step: "BaseStep", session, extra: str) -> Tuple[Tuple[str, Hashable, str], str]:
+        session_key = getattr(session, "path", None) or session.name
+        return (f"{step.pipeline_name}.{step.pipe_name}", str(session_key), extra), step.complete_name
+
+    def store(self, step: "BaseStep", session, extra: str, result: Any) -> None:
+        """Keep the output of a step, for a session and extra.
+
+        Args:
+            step (BaseStep): The step that generated the output.
+            session: The session the output was generated for.
+            extra (str): The extra the output was generated for.
+            result (Any): The output.
+        """
+        pipe_key, step_key = self.get_keys(step, session, extra)
+        with self.lock:
+            if step.disk_class.step_traceback == "multi":
+                self.results.setdefault(pipe_key, {})[step_key] = result
+            else:
+                self.results[pipe_key] = {step_key: result}
+
+    def get(self, step: "BaseStep", session, extra: str, default: Any = None, copy: bool = True) -> Any:
+        """Return a copy of the output of a step for a session and extra, or default if it was not generated
+        during this run. With copy=False, the stored output itself is returned, and must not be modified."""
+        pipe_key, step_key = self.get_keys(step, session, extra)
+        with self.lock:
+            result = self.results.get(pipe_key, {}).get(step_key, _MISSING)
+        if result is _MISSING or not copy:
+            return default if result is _MISSING else result
+        try:
+            return copy_result(result)
+        except Exception:
+            # results that cannot be copied are read from the disk instead
+            return default
+
+    def contains(self, step: "BaseStep", session, extra: str) -> bool:
+        pipe_key, step_key = self.get_keys(step, session, extra)
+        with self.lock:
+            return step_key in self.results.get(pipe_key, {})
+
+    def clear(self) -> None:
+        with self.lock:
+            self.results.clear()
+
+    @property
+    def write_behind(self) -> bool:
+        """True if the saves are performed by background threads."""
+        return self.save_pool is not None
+
+    def enable_write_behind(self) -> None:
+        """Make the following saves performed by background threads."""
+        with self.lock:
+            if self.save_pool is None:
+                self.save_pool = ThreadPoolExecutor(
+                    max_workers=self.write_behind_workers, thread_name_prefix="pypelines_save"
+                )
+
+    def submit_save(self, step: "BaseStep", session, extra: str, save: Callable[[Any], None], data: Any) -> Future:
+        """Have a background thread save the output of a step, once the saves pending for the same pipe,
+        session and extra are done.
+
+        Args:
+            step (BaseStep): The step the output belongs to.
+            session: The session the output belongs to.
+            extra (str): The extra the output belongs to.
+            save (Callable): The save method of the disk object of the output.
+            data (Any): The output to save.
+
+        Returns:
+            Future: The future of the save.
+        """
+        pipe_key, _ = self.get_keys(step, session, extra)
+        self.wait_for_saves(step, session, extra)
+        # the save runs in the current context, for the disk objects to be able to use the run context
+        context = copy_context()
+        with self.lock:
+            future = self.save_pool.submit(context.run, save, data)
+            self.pending_saves.setdefault(pipe_key, []).append(future)
+        return future
+
+    def wait_for_saves(self, step: "BaseStep", session, extra: str) -> None:
+        """Wait for the saves pending for the pipe of a step, for a session and extra.
+
+        Raises:
+            Exception: The exception raised by a failed save.
+        """
+        pipe_key, _ = self.get_keys(step, session, extra)
+        with self.lock:
+            futures = list(self.pending_saves.get(pipe_key, []))
+        for future in futures:
+            future.result()
+        with self.lock:
+            # successful saves are forgotten, failed ones are kept for flush to raise their error too
+            remaining = [
+                future
+                for future in self.pending_saves.get(pipe_key, [])
+                if not future.done() or future.exception() is not None
+            ]
+            if remaining:
+                self.pending_saves[pipe_key] = remaining
+            else:
+                self.pending_saves.pop(pipe_key, None)
+
+    def flush(self) -> None:
+        """Wait for all pending saves.
+
+        Raises:
+            Exception: The exception raised by the first failed save, once all saves are done.
+        """
+        with self.lock:
+            futures = [future for futures in self.pending_saves.values() for future in futures]
+            self.pending_saves.clear()
+        wait(futures)
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        """Wait for all pending saves, without raising their errors, and stop the background threads."""
+        if self.save_pool is not None:
+            self.save_pool.shutdown(wait=True)
+            self.save_pool = None
+        self.pending_saves.clear()
+
+
+def get_run_context() -> "RunContext | None":
+    """Return the run context of the generate call currently running, or None outside of generate calls."""
+    return _RUN_CONTEXT.get()
+
+
+@contextmanager
+def run_context() -> Iterator[RunContext]:
+    """Make a run context available while inside the with block. If one is already available (nested generate
+    calls, when generating requirements), it is used, otherwise a new one is created, and released at the end of
+    the block.
+
+    Yields:
+        RunContext: The current run context.
+    """
+    context = _RUN_CONTEXT.get()
+    if context is not None:
+        yield context
+        return
+
+    context = RunContext()
+    token = _RUN_CONTEXT.set(context)
+    try:
+        yield context
+        context.flush()
+    finally:
+        context.close()
+        _RUN_CONTEXT.reset(token)
+        context.clear()
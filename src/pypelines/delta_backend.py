@@ -0,0 +1,283 @@
+from .pipes import BasePipe
+from .steps import BaseStep
+from .pickle_backend import PickleDiskObject
+from .disk import invalidate_directory_snapshot, atomic_write
+from .contexts import get_run_context
+
+import pickle, json, os, time, logging, uuid
+import numpy as np
+import pandas as pd
+
+from typing import Any, Dict, List, Tuple
+
+
+def values_equal(first: Any, second: Any) -> bool:
+    """Return True if two values are known to be equal. Values that cannot be compared are considered different.
+
+    Args:
+        first (Any): The first value.
+        second (Any): The second value.
+
+    Returns:
+        bool: True if the values are equal.
+    """
+    if first is second:
+        return True
+    if isinstance(first, (pd.DataFrame, pd.Series, pd.Index)):
+        return type(first) is type(second) and first.equals(second)
+    if isinstance(first, np.ndarray) or isinstance(second, np.ndarray):
+        return (
+            isinstance(first, np.ndarray)
+            and isinstance(second, np.ndarray)
+            and first.dtype == second.dtype
+            and np.array_equal(first, second)
+        )
+    try:
+        return bool(first == second)
+    except Exception:
+        return False
+
+
+class DeltaDiskObject(PickleDiskObject):
+    """Saves only what each step of a pipe adds to the output of the previous step of that pipe :
+    the new columns of a DataFrame, or the new keys of a dictionnary. Outputs are assembled back when loading.
+
+    The file found on disk for a pipe (named like PickleDiskObject files, with a .delta extension) is a json manifest,
+    listing the parts that make up the output of the highest step saved, from the lowest to the highest step :
+    either a full snapshot, or a delta to apply over the previous part.
+    Parts are pickle files named like the manifest, with a unique id and a .part extension instead : each save writes
+    new parts, so that the parts listed by other manifests are never overwritten.
+
+    A full snapshot is saved instead of a delta when the output of the previous step is not found with the
+    current pipe version, or when the new output modifies (or removes) some of the previous columns,
+    rows or keys, instead of only adding new ones. Other outputs are always saved as full snapshots.
+    """
+
+    extension = "delta"
+    part_extension = "part"
+    manifest_format = 1
+
+    manifest: Dict[str, Any] | None = None
+
+    def make_part_path(self, step_name: str) -> str:
+        """Return a new, unique, path for a part file holding the contribution of a step of the pipe."""
+        extra = self.parse_extra(self.extra, regexp=False)
+        version_string = "." + self.version if self.version else ""
+        filename = (
+            f"{self.file_prefix}.{self.step.pipe_name}.{step_name}{version_string}{extra}"
+            f".{uuid.uuid4().hex}.{self.part_extension}"
+        )
+        return os.path.join(os.path.dirname(self.get_full_path()), filename)
+
+    def read_manifest(self) -> Dict[str, Any]:
+        """Return the manifest of the file found on disk, reading it on the first call.
+
+        Raises:
+            IOError: If no file was found on disk or 'check_disk()' was not run.
+        """
+        if self.manifest is None:
+            if self.current_disk_file is None:
+                raise IOError(
+                    "Could not find a file to load. Either no file was found on disk, "
+                    "or you forgot to run 'check_disk()'"
+                )
+            with open(self.current_disk_file, "r") as file:
+                self.manifest = json.load(file)
+        return self.manifest
+
+    def get_step_level(self, step_name: str) -> int:
+        return self.step.pipe.steps[step_name].get_level(selfish=True)
+
+    def get_base_entries(self) -> List[Dict[str, Any]]:
+        """Return the manifest entries found on disk that the output of the current step can be saved as a delta of :
+        the ones of the steps lower than the current step, if saved with the current pipe version."""
+        if self.current_disk_file is None or self.disk_version != (self.version if self.version else None):
+            return []
+        try:
+            entries = self.read_manifest()["entries"]
+        except (OSError, ValueError, KeyError):
+            return []
+        level = self.step.get_level(selfish=True)
+        base_entries = []
+        for entry in entries:
+            if entry["step"] not in self.step.pipe.steps or self.get_step_level(entry["step"]) >= level:
+                break
+            base_entries.append(entry)
+        return base_entries
+
+    def get_base_data(self, base_entries: List[Dict[str, Any]]) -> Any:
+        """Return the output of the highest step of base_entries, from the outputs generated in the current
+        generate call if available, or assembled from the disk otherwise."""
+        context = get_run_context()
+        if context is not None:
+            base_step = self.step.pipe.steps[base_entries[-1]["step"]]
+            data = context.get(base_step, self.session, self.extra, copy=False)
+            if data is not None:
+                return data
+        return self.assemble(base_entries)
+
+    @staticmethod
+    def get_delta(base: Any, data: Any) -> Tuple[str, Any] | None:
+        """Return the type and content of the delta that turns base into data, or None if data is not
+        base with only new columns or keys added after the existing ones."""
+        if isinstance(base, pd.DataFrame) and isinstance(data, pd.DataFrame):
+            base_columns = list(base.columns)
+            if (
+                not data.columns.is_unique
+                or list(data.columns[: len(base_columns)]) != base_columns
+                or not data.index.equals(base.index)
+                or data.index.names != base.index.names
+            ):
+                return None
+            if not all(values_equal(base[column], data[column]) for column in base_columns):
+                return None
+            return "dataframe", data[data.columns[len(base_columns) :]]
+
+        if isinstance(base, dict) and isinstance(data, dict):
+            base_keys = list(base.keys())
+            if list(data.keys())[: len(base_keys)] != base_keys:
+                return None
+            if not all(values_equal(base[key], data[key]) for key in base_keys):
+                return None
+            return "dict", {key: value for key, value in data.items() if key not in base}
+
+        return None
+
+    def save(self, data):
+        """Save the output of the step as a delta over the output of the previous step of the pipe when possible,
+        as a full snapshot otherwise, then write the manifest.
+
+        Args:
+            data: Data to be saved to disk.
+
+        Returns:
+            None
+        """
+        logger = logging.getLogger("DeltaDiskObject.save")
+
+        # the disk is checked again, as the requirements of the step may have been saved since this object's creation
+        self.current_disk_file = self.manifest = self.disk_step = self.disk_version = None
+        self.check_disk()
+
+        previous_manifest_path = self.current_disk_file
+        previous_entries = []
+        if previous_manifest_path is not None:
+            try:
+                previous_entries = self.read_manifest()["entries"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+        base_entries = self.get_base_entries()
+        delta = None
+        if base_entries:
+            try:
+                delta = self.get_delta(self.get_base_data(base_entries), data)
+            except (OSError, pickle.UnpicklingError, KeyError) as e:
+                logger.debug(f"Could not read the previous step output, saving a full snapshot : {e}")
+
+        start = time.perf_counter()
+        part_path = self.make_part_path(self.step.step_name)
+        if delta is None:
+            logger.debug(f"Saving a full snapshot to path : {part_path}")
+            entries = [{"step": self.step.step_name, "file": os.path.basename(part_path), "kind": "full"}]
+            content = data
+        else:
+            logger.debug(f"Saving a {delta[0]} delta to path : {part_path}")
+            entries = base_entries + [
+                {"step": self.step.step_name, "file": os.path.basename(part_path), "kind": delta[0]}
+            ]
+            content = delta[1]
+
+        with atomic_write(part_path) as f:
+            if isinstance(content, pd.DataFrame):
+                content.to_pickle(f)
+            else:
+                pickle.dump(content, f)
+
+        # the manifest is written once the parts it lists are all on disk
+        new_full_path = self.get_full_path()
+        self.manifest = {"format": self.manifest_format, "version": self.version, "entries": entries}
+        with atomic_write(new_full_path, "w") as file:
+            json.dump(self.manifest, file, indent=2)
+        write_duration = time.perf_counter() - start
+
+        if self.remove and previous_manifest_path is not None:
+            # the previous manifest, and the parts it listed that are not part of the new one are removed,
+            # now that the new manifest is in place. When outputs are not removed, other manifests of the pipe
+            # may still list these parts, so they are kept.
+            kept_files = {entry["file"] for entry in entries}
+            obsolete_files = [previous_manifest_path] if previous_manifest_path != new_full_path else []
+            folder = os.path.dirname(new_full_path)
+            obsolete_files.extend(
+                os.path.join(folder, entry["file"]) for entry in previous_entries if entry["file"] not in kept_files
+            )
+            for obsolete_file in obsolete_files:
+                logger.debug(f"Removing old file from path : {obsolete_file}")
+                try:
+                    os.remove(obsolete_file)
+                except FileNotFoundError:
+                    logger.error(f"The file {obsolete_file} that should have been removed don't exist anymore")
+
+        self.current_disk_file = new_full_path
+        self.disk_step = self.step.step_name
+        self.disk_version = self.version if self.version else None
+        self.record_output(new_full_path, write_duration)
+        invalidate_directory_snapshot(os.path.dirname(new_full_path))
+
+    def get_output_size(self, file_path: str) -> int:
+        """Return the size, in bytes, of the manifest at file_path and of the parts it lists."""
+        folder = os.path.dirname(file_path)
+        with open(file_path, "r") as file:
+            entries = json.load(file)["entries"]
+        parts_size = sum(os.path.getsize(os.path.join(folder, entry["file"])) for entry in entries)
+        return os.path.getsize(file_path) + parts_size
+
+    def assemble(self, entries: List[Dict[str, Any]]) -> Any:
+        """Read the parts listed in entries, and apply them in order.
+
+        Args:
+            entries (list): Manifest entries, starting with a full snapshot.
+
+        Returns:
+            Any: The assembled output.
+        """
+        folder = os.path.dirname(self.current_disk_file)
+        start = max(index for index, entry in enumerate(entries) if entry["kind"] == "full")
+
+        data = None
+        for entry in entries[start:]:
+            with open(os.path.join(folder, entry["file"]), "rb") as f:
+                part = pickle.load(f)
+            if entry["kind"] == "full":
+                data = part
+            elif entry["kind"] == "dataframe":
+                data = pd.concat([data, part], axis=1)
+            elif entry["kind"] == "dict":
+                data = {**data, **part}
+            else:
+                raise ValueError(f"Unknown part kind {entry['kind']} in {self.current_disk_file}")
+        return data
+
+    def load(self):
+        """Load the output of the step, assembling the parts listed in the manifest found on disk,
+        up to the current step if it is part of them, or up to the highest step otherwise.
+
+        Raises:
+            IOError: If no file was found on disk or 'check_disk()' was not run.
+
+        Returns:
+            The loaded data.
+        """
+        logger = logging.getLogger("DeltaDiskObject.load")
+        logger.debug(f"Current disk file status : {self.current_disk_file=}")
+
+        entries = self.read_manifest()["entries"]
+        steps = [entry["step"] for entry in entries]
+        if self.step.step_name in steps:
+            entries = entries[: steps.index(self.step.step_name) + 1]
+        return self.assemble(entries)
+
+
+class DeltaPipe(BasePipe):
+    step_class = BaseStep
+    disk_class = DeltaDiskObject
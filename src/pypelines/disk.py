@@ -1,11 +1,14 @@
-import os, re
+import os, re, time, uuid
 from .sessions import Session
-import pickle
+from .caches import BaseCacheStore, LRUCacheStore
+import pickle, natsort
 
-from typing import Callable, Type, Iterable, Literal, Protocol, TYPE_CHECKING, List, cast
+from typing import Callable, Type, Iterable, Literal, Protocol, TYPE_CHECKING, List, Dict, cast
 
 from abc import ABCMeta, abstractmethod
 from functools import wraps
+from contextlib import contextmanager
+from logging import getLogger
 
 if TYPE_CHECKING:
     from .steps import BaseStep
@@ -23,6 +26,10 @@ class BaseDiskObject(metaclass=ABCMeta):
     disk_version = None
     disk_step = None
 
+    # if True, the outputs saved during a generate call are also kept in memory until it returns,
+    # for the steps requiring them to get them without reading them from the disk
+    in_run_handoff = False
+
     step: "BaseStep"
     session: Session
     extra: str
@@ -129,6 +136,30 @@ class BaseDiskObject(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    def get_lock_path(self) -> str | None:
+        """Return the path of the lock file held while the output is generated and saved, so that concurrent
+        generations of the same output (from other processes or nodes) wait for it instead of computing it again.
+
+        Returns:
+            str | None: The path of the lock file, or None if the outputs of this disk object are not locked.
+        """
+        return None
+
+    def record_in_catalog(self, path: str) -> None:
+        """Record the output just saved at path in the catalog of the pipeline, if it has one.
+        Errors are logged and not raised, as the catalog can be rebuilt from the disk with it's reconcile method.
+
+        Args:
+            path (str): The path of the saved output.
+        """
+        catalog = self.step.pipeline.catalog
+        if catalog is None:
+            return
+        try:
+            catalog.record(self, path, replace_pipe=getattr(self, "remove", True))
+        except Exception as e:
+            getLogger("disk.record_in_catalog").warning(f"Could not record {path} in the catalog {catalog.path} : {e}")
+
     def disk_step_instance(self) -> "BaseStep | None":
         """Returns an instance of the step that corresponds to the file on disk."""
         from .steps import BaseStep
@@ -260,10 +291,19 @@ class NullDiskObject(BaseDiskObject):
         raise NotImplementedError
 
 
-_CACHE_STORAGE = {}  # this cache variable is cross instances
+_CACHE_STORAGE = LRUCacheStore()  # this cache variable is cross instances
 
 
 class CachedDiskObject(BaseDiskObject):
+    """A disk object that keeps data in memory, in a cache store shared by all instances.
+
+    The default store is bounded by a memory budget, and evicts the least recently used data first.
+    It can be configured (budget, per pipe quotas) through the cache_store attribute, or replaced by another
+    BaseCacheStore in a subclass.
+    """
+
+    cache_store: BaseCacheStore = _CACHE_STORAGE
+
     def __init__(self, session: Session, step: "BaseStep", extra="") -> None:
         """Initialize the BaseStepLoader.
 
@@ -278,24 +318,27 @@ class CachedDiskObject(BaseDiskObject):
         self.session = session
         self.step = step
         self.extra = extra
-        self.storage = _CACHE_STORAGE
+        self.storage = self.cache_store
         self.loadable = self.check_disk()
 
+    def get_cache_key(self):
+        """Return the key identifying the data of the current step, session, and extra in the cache store."""
+        return (self.step.complete_name, self.session.name, f"extra#{self.extra}")
+
     def get_cached_storage(self):
         """Return cached storage for the current step, session, and extra data.
 
         Returns:
             dict: A dictionary containing the cached storage for the current step, session, and extra data.
         """
-        step_dedicated_storage = self.storage.setdefault(self.step.complete_name, {}).setdefault(self.session.name, {})
-        dedicated_key = f"extra#{self.extra}"
-        if dedicated_key not in step_dedicated_storage.keys():
+        stored_dict = self.storage.get(self.get_cache_key())
+        if stored_dict is None:
             return self.wrap_up_data(None)
-        return step_dedicated_storage[dedicated_key]
+        return stored_dict
 
     def load(self):
-        """Load the content from the cached storage."""
-        return self.get_cached_storage()["content"]
+        """Load the content found in the cached storage when checking it."""
+        return self.cached_storage["content"]
 
     def wrap_up_data(self, data):
         stored_dict = {
@@ -306,7 +349,7 @@ class CachedDiskObject(BaseDiskObject):
         return stored_dict
 
     def save(self, data):
-        """Save the data into the storage dictionary.
+        """Save the data into the cache store.
 
         Args:
             data: The data to be saved.
@@ -314,15 +357,16 @@ class CachedDiskObject(BaseDiskObject):
         Returns:
             dict: A dictionary containing the version, content, and step name of the saved data.
         """
-        step_dedicated_storage = self.storage.setdefault(self.step.complete_name, {}).setdefault(self.session.name, {})
-        dedicated_key = f"extra#{self.extra}"
         stored_dict = self.wrap_up_data(data)
-        step_dedicated_storage[dedicated_key] = stored_dict
+        self.storage.set(self.get_cache_key(), stored_dict, group=self.step.pipe_name)
+        self.cached_storage = stored_dict
         return stored_dict
 
     def check_disk(self):
         """Check the disk status and return True if the disk content is not None, otherwise return False."""
         stored_cache = self.get_cached_storage()
+        # a reference is kept, so that the data can be loaded even if evicted from the cache store in the meantime
+        self.cached_storage = stored_cache
         self.disk_version = stored_cache["version"]
         self.disk_step = stored_cache["step"]
 
@@ -358,8 +402,7 @@ class CachedDiskObject(BaseDiskObject):
 
     def clear_cache(self):
         """Clears the cache by removing all items stored in the cache."""
-        for pipe in list(self.storage.keys()):
-            self.storage.pop(pipe)
+        self.storage.clear()
 
 
 class FlaggedDiskObject(BaseDiskObject):
@@ -414,12 +457,14 @@ class FlaggedDiskObject(BaseDiskObject):
         if self.step_supports_flagging():
             flagpath = self.get_flag_path(self.step)
             with open(flagpath, "w"):
-                return
+                pass
+            invalidate_directory_snapshot(os.path.dirname(flagpath))
 
     def check_disk(self):
+        files = get_directory_files(os.path.join(self.session.path, os.path.sep.join(self.collection)))
         for flagged_step in self.get_flaggable_steps():
             if flagged_step >= self.step:
-                if os.path.isfile(self.get_flag_path(flagged_step)):
+                if self.get_file_name(flagged_step) in files:
                     self.disk_step = flagged_step
                     self.disk_version = flagged_step.version
                     return True
@@ -474,7 +519,7 @@ class CachedFlaggedDiskObject(CachedDiskObject, FlaggedDiskObject):
     def load(self):
         # If cache is available, load from cache
         if self.cache_found:
-            return self.get_cached_storage()["content"]
+            return CachedDiskObject.load(self)
 
         # If flag is found, return flag info (or None, or raise, as desired)
         return FlaggedDiskObject.load(self)
@@ -504,3 +549,128 @@ class CachedFlaggedDiskObject(CachedDiskObject, FlaggedDiskObject):
         if self.loadable:
             return f"Flag found with step name {self.disk_step.step_name}"
         return f"Cache nor Flag found for step {self.step.step_name}"
+
+
+_DIRECTORY_SNAPSHOTS: "Dict[str, DirectorySnapshot]" = {}  # this cache variable is cross instances
+
+
+class DirectorySnapshot:
+    """The sorted names of the files of a directory, as they were when the directory was scanned.
+
+    A snapshot is trusted as long as the modification time of the directory did not change since it was taken.
+    As some file systems (network ones especially) have a coarse modification time resolution,
+    a snapshot taken less than racy_delay seconds after the last modification of the directory is not trusted,
+    because another modification could have happened in the same time resolution step, without changing it.
+    """
+
+    racy_delay = 2  # seconds
+
+    def __init__(self, path: str, mtime_ns: int, scan_time_ns: int, files: List[str]):
+        """Initialize the snapshot of a directory.
+
+        Args:
+            path (str): The path of the directory.
+            mtime_ns (int): The modification time of the directory when it was scanned, in nanoseconds.
+            scan_time_ns (int): The time the directory was scanned at, in nanoseconds.
+            files (list): The sorted names of the files of the directory.
+        """
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.scan_time_ns = scan_time_ns
+        self.files = files
+
+    def is_valid(self, mtime_ns: int) -> bool:
+        """Check if the snapshot can be trusted, given the current modification time of the directory.
+
+        Args:
+            mtime_ns (int): The current modification time of the directory, in nanoseconds.
+
+        Returns:
+            bool: True if the snapshot still represents the content of the directory, False otherwise.
+        """
+        return mtime_ns == self.mtime_ns and self.scan_time_ns - mtime_ns > self.racy_delay * 1_000_000_000
+
+
+def get_directory_files(path: str, create: bool = False) -> List[str]:
+    """Return the sorted names of the files (not folders) directly inside a directory.
+
+    The content of the directory is served from a per-process snapshot if the directory modification time
+    didn't change since it was scanned, so that checking the existence of files costs a single stat call.
+    Otherwise, the directory is scanned again, with a single os.scandir call.
+
+    Args:
+        path (str): The path of the directory.
+        create (bool, optional): If True, the directory is created if it doesn't exist. Defaults to False.
+
+    Returns:
+        list: The naturally sorted names of the files inside the directory. Empty if it doesn't exist.
+            This list must not be modified, as it is shared with the other callers.
+    """
+    path = os.path.normpath(path)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        _DIRECTORY_SNAPSHOTS.pop(path, None)
+        if not create:
+            return []
+        os.makedirs(path, exist_ok=True)
+        mtime_ns = os.stat(path).st_mtime_ns
+
+    snapshot = _DIRECTORY_SNAPSHOTS.get(path)
+    if snapshot is not None and snapshot.is_valid(mtime_ns):
+        return snapshot.files
+
+    scan_time_ns = time.time_ns()
+    with os.scandir(path) as entries:
+        files = natsort.natsorted(entry.name for entry in entries if entry.is_file())
+
+    _DIRECTORY_SNAPSHOTS[path] = DirectorySnapshot(path, mtime_ns, scan_time_ns, files)
+    return files
+
+
+def invalidate_directory_snapshot(path: str) -> None:
+    """Forget the snapshot of a directory, so that it gets scanned again the next time it is needed.
+    Must be called after writing or removing files in a directory, because the modification time of
+    the directory is not enough to detect changes made just after it was scanned.
+
+    Args:
+        path (str): The path of the directory.
+    """
+    _DIRECTORY_SNAPSHOTS.pop(os.path.normpath(path), None)
+
+
+def clear_directory_snapshots() -> None:
+    """Forget the snapshots of all directories."""
+    _DIRECTORY_SNAPSHOTS.clear()
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "wb"):
+    """Open a temporary file, in the same folder as path, to write to, and move it to path once written
+    (and flushed to the disk), so that path is never seen partially written, even if the process gets killed.
+    The temporary file is removed if an error occurs while writing.
+
+    The temporary file is hidden, and doesn't end with the extension of path, so that it is not taken for an output
+    by check_disk methods matching file names.
+
+    Args:
+        path (str): The path of the file to write.
+        mode (str, optional): The mode to open the temporary file with. Defaults to "wb".
+
+    Yields:
+        file: The opened temporary file.
+    """
+    folder, file_name = os.path.split(path)
+    temporary_path = os.path.join(folder, f".{os.path.splitext(file_name)[0]}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temporary_path, mode) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        try:
+            os.remove(temporary_path)
+        except FileNotFoundError:
+            pass
+        raise
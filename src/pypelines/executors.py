@@ -0,0 +1,191 @@
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import Context, copy_context
+import multiprocessing
+from logging import getLogger
+
+from typing import Callable, Dict, Iterable, List, Literal, Tuple, TYPE_CHECKING
+
+from .pipelines import PIPELINES_STORE
+
+if TYPE_CHECKING:
+    from .steps import BaseStep
+
+ExecutorType = Literal["threads", "processes"] | Executor
+
+
+def get_executor(executor: "ExecutorType", max_workers: int | None = None) -> Tuple[Executor, bool]:
+    """Return a concurrent.futures executor corresponding to the executor argument.
+
+    Args:
+        executor (str | Executor): Either "threads", "processes", or an already instanciated Executor.
+        max_workers (int, optional): Maximum number of workers of the created executor.
+            Ignored if executor is an Executor instance. Defaults to None.
+
+    Raises:
+        ValueError: If executor is not one of the supported values.
+
+    Returns:
+        tuple: The executor, and a boolean that is True if the executor has been created here,
+            and thus must be shut down by the caller once done with it.
+    """
+    if isinstance(executor, Executor):
+        return executor, False
+    if executor == "threads":
+        return ThreadPoolExecutor(max_workers=max_workers), True
+    if executor == "processes":
+        # forking makes the pipelines registered in the parent available in the workers,
+        # without requiring them to be importable
+        if "fork" in multiprocessing.get_all_start_methods():
+            return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("fork")), True
+        return ProcessPoolExecutor(max_workers=max_workers), True
+    raise ValueError(f"executor must be 'threads', 'processes' or an Executor instance. Got {executor}")
+
+
+def is_process_based(executor: Executor) -> bool:
+    """Return True if the tasks submitted to the executor are ran in other processes."""
+    return isinstance(executor, ProcessPoolExecutor)
+
+
+def run_step_generate(pipeline_name: str, relative_name: str, session, args=(), kwargs=None, return_result=True):
+    """Run the generate method of a step, found by it's pipeline and relative names.
+    This is the function submitted to process based executors, as steps themselves cannot be pickled.
+
+    Args:
+        pipeline_name (str): The name of the pipeline the step belongs to.
+        relative_name (str): The relative name of the step, in the format pipe_name.step_name.
+        session: The session to generate the step for.
+        args (tuple, optional): Positional arguments for generate. Defaults to ().
+        kwargs (dict, optional): Keyword arguments for generate. Defaults to None.
+        return_result (bool, optional): If False, None is returned instead of the step result,
+            to avoid sending it back to the parent process. Defaults to True.
+
+    Raises:
+        KeyError: If the pipeline is not registered in the current process.
+
+    Returns:
+        The result of the step generation, or None if return_result is False.
+    """
+    try:
+        pipeline = PIPELINES_STORE[pipeline_name]
+    except KeyError as e:
+        raise KeyError(
+            f"The pipeline {pipeline_name} is not registered in this process. With the processes executor, "
+            "the pipeline must either be inherited from the parent process (fork start method), "
+            "or be created when importing the module defining it."
+        ) from e
+    pipeline.resolve()
+    # forked processes inherit the run context of the parent thread, with it's locks and threads.
+    # The generation runs in an empty context instead, and gets a run context of it's own.
+    result = Context().run(
+        pipeline.resolve_instance(relative_name).generate, session, *args, **(kwargs or {})
+    )
+    return result if return_result else None
+
+
+def submit_step_generate(
+    pool: Executor, step: "BaseStep", session, *args, return_result=True, **kwargs
+) -> "Future":
+    """Submit the generation of a step for a session to an executor.
+
+    Args:
+        pool (Executor): The executor to submit the generation to.
+        step (BaseStep): The step to generate.
+        session: The session to generate the step for.
+        *args: Positional arguments for generate.
+        return_result (bool, optional): If False, the future result is None instead of the step result.
+            Defaults to True.
+        **kwargs: Keyword arguments for generate.
+
+    Returns:
+        Future: The future of the step generation.
+    """
+    if is_process_based(pool):
+        return pool.submit(
+            run_step_generate, step.pipeline_name, step.relative_name, session, args, kwargs, return_result
+        )
+    # threads run in a copy of the current context, to share the run context of the generate call submitting them
+    context = copy_context()
+    if return_result:
+        return pool.submit(context.run, step.generate, session, *args, **kwargs)
+
+    def generate_without_result():
+        step.generate(session, *args, **kwargs)
+
+    return pool.submit(context.run, generate_without_result)
+
+
+def run_requirement_graph(
+    steps: "Iterable[BaseStep]",
+    submit: "Callable[[Executor, BaseStep], Future]",
+    executor: "ExecutorType" = "threads",
+    max_workers: int | None = None,
+) -> None:
+    """Run a set of steps with ready-queue semantics : a step is submitted as soon as all of it's requirements
+    that are part of the set have been ran, so that independent steps run at the same time.
+
+    Steps of the same pipe are still ran one after another, in the order they are supplied,
+    as they share their disk objects (and may remove each other's files when saving).
+
+    Args:
+        steps (Iterable[BaseStep]): The steps to run, ordered so that requirements come first
+            (as returned by the requirement_stack method).
+        submit (Callable): A function taking an executor and a step, that submits the step to the executor
+            and returns the corresponding future.
+        executor (str | Executor, optional): Either "threads", "processes",
+            or an already instanciated Executor. Defaults to "threads".
+        max_workers (int, optional): Maximum number of workers of the created executor. Defaults to None.
+
+    Raises:
+        Exception: The first exception raised by a step. No more steps are submitted after a failure,
+            but the steps already running are waited for.
+    """
+    logger = getLogger("executor")
+
+    steps = list(steps)
+    steps_set = set(steps)
+
+    waiting_for: Dict["BaseStep", set] = {}
+    last_step_of_pipe: Dict[str, "BaseStep"] = {}
+    for step in steps:
+        waiting_for[step] = {requirement for requirement in step.requires if requirement in steps_set}
+        previous_step = last_step_of_pipe.get(step.pipe_name)
+        if previous_step is not None:
+            waiting_for[step].add(previous_step)
+        last_step_of_pipe[step.pipe_name] = step
+
+    dependents: Dict["BaseStep", List["BaseStep"]] = {step: [] for step in steps}
+    for step, requirements in waiting_for.items():
+        for requirement in requirements:
+            dependents[requirement].append(step)
+
+    pool, owned = get_executor(executor, max_workers)
+    running: Dict["Future", "BaseStep"] = {}
+    error = None
+
+    def submit_ready_steps():
+        for step in [step for step, requirements in waiting_for.items() if not requirements]:
+            waiting_for.pop(step)
+            logger.debug(f"Submitting {step.relative_name}")
+            running[submit(pool, step)] = step
+
+    try:
+        submit_ready_steps()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                exception = future.exception()
+                if exception is not None:
+                    if error is None:
+                        error = exception
+                    continue
+                for dependent in dependents[step]:
+                    waiting_for[dependent].discard(step)
+            if error is None:
+                submit_ready_steps()
+    finally:
+        if owned:
+            pool.shutdown(wait=True)
+
+    if error is not None:
+        raise error
@@ -1,12 +1,49 @@
-import pandas as pd
+import pandas as pd, os
+from concurrent.futures import ThreadPoolExecutor
 from ..pipelines import Pipeline
 
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..steps import BaseStep
+    from ..disk import BaseDiskObject
+
 from .typing import SessionPipelineAccessorProto
 
 # This is only for type checkers, has no runtime effect
 pd.DataFrame.pypeline: SessionPipelineAccessorProto
 
 
+STATES = ["missing", "deprecated", "too_low", "matching"]
+
+
+def get_steps(pipeline: Pipeline, steps: "str | List[str]") -> List["BaseStep"]:
+    """Return the steps of a pipeline corresponding to a list of names (pipe_name.step_name, or pipe_name for all
+    the steps of the pipe), or all the steps of the pipeline if steps is "all"."""
+    if isinstance(steps, str) and steps == "all":
+        return [step for pipe in pipeline.pipes.values() for step in pipe.ordered_steps("lowest")]
+    if isinstance(steps, str):
+        steps = [steps]
+    selected_steps = []
+    for name in steps:
+        if "." in name:
+            selected_steps.append(pipeline.resolve_instance(name))
+        else:
+            selected_steps.extend(pipeline.pipes[name].ordered_steps("lowest"))
+    return selected_steps
+
+
+def get_state(disk_object: "BaseDiskObject") -> str:
+    """Return the state of the output of a disk object : missing, deprecated, too_low or matching."""
+    if not disk_object.is_loadable():
+        return "missing"
+    if disk_object.version_deprecated():
+        return "deprecated"
+    if disk_object.step_level_too_low():
+        return "too_low"
+    return "matching"
+
+
 def extend_pandas():
     if not hasattr(pd.DataFrame, "_pypelines_accessor_registered"):
 
@@ -19,7 +56,25 @@ def extend_pandas():
                 self.pipeline = pipeline
                 return self
 
-            def output_exists(self, pipe_step_name: str):
+            def output_exists(self, pipe_step_name: str, check_missing_on_disk: bool = False) -> pd.Series:
+                """Return whether an output of a step (or of the highest step of a pipe) is loadable, for each session.
+
+                If the pipeline has a catalog, it is queried once for all the sessions, and trusted : outputs saved
+                without the catalog (or before it was set) are reported as missing, and outputs removed without the
+                pipeline as existing, until the catalog is reconciled (see OutputCatalog.reconcile).
+                Otherwise, the folder of each session is checked.
+
+                Args:
+                    pipe_step_name (str): pipe_name.step_name, or pipe_name for the highest step of the pipe.
+                    check_missing_on_disk (bool, optional): If True, the sessions the catalog has no entry for are
+                        checked on the disk too. This scans the folder of each of them. Defaults to False.
+
+                Raises:
+                    ValueError: If pipe_step_name is neither a pipe_name.step_name nor a pipe_name.
+
+                Returns:
+                    pd.Series: True for the sessions with an output, with the sessions index, named pipe_name.step_name.
+                """
                 names = pipe_step_name.split(".")
                 if len(names) == 1:
                     pipe_name = names[0]
@@ -30,17 +85,64 @@ def extend_pandas():
                 else:
                     raise ValueError("pipe_step_name should be either a pipe_name.step_name or pipe_name")
                 complete_name = f"{pipe_name}.{step_name}"
-                return self._obj.apply(
-                    lambda session: self.pipeline.pipes[pipe_name]
-                    .steps[step_name]
-                    .get_disk_object(session)
-                    .is_loadable(),
-                    axis=1,
-                ).rename(complete_name)
+                step = self.pipeline.pipes[pipe_name].steps[step_name]
+
+                def on_disk(sessions: pd.DataFrame) -> pd.Series:
+                    if sessions.empty:
+                        return pd.Series(dtype=bool, index=sessions.index)
+                    return sessions.apply(lambda session: step.get_disk_object(session).is_loadable(), axis=1)
+
+                if self.pipeline.catalog is None:
+                    return on_disk(self._obj).rename(complete_name)
+
+                # a single query to the catalog, instead of checking the folder of each session
+                outputs = self.pipeline.catalog.query(
+                    pipeline=self.pipeline.pipeline_name,
+                    pipe=pipe_name,
+                    extra=step.get_default_extra(),
+                    sessions=self._obj,
+                )
+                found_paths = set(outputs["session_path"])
+                exists = self._obj["path"].map(lambda path: os.path.abspath(str(path)) in found_paths).astype(bool)
+                if check_missing_on_disk:
+                    exists[~exists] = on_disk(self._obj[~exists]).astype(bool)
+                return exists.rename(complete_name)
 
             def add_ouput(self, pipe_step_name: str):
                 return self._obj.assign(**{pipe_step_name: self.output_exists(pipe_step_name)})
 
             def where_output(self, pipe_step_name: str, exists: bool):
-                new_obj = SessionPipelineAccessor(self._obj)(self.pipeline).add_ouput(pipe_step_name)
-                return new_obj[new_obj[pipe_step_name] == exists]
+                return self._obj[self.output_exists(pipe_step_name) == exists]
+
+            def status(self, steps: str | List[str] = "all", max_workers: int | None = 16) -> pd.DataFrame:
+                """Return the state of the outputs of some steps, for each session, as a sessions x steps matrix.
+
+                States are "missing" (nothing loadable on disk), "deprecated" (found with an older version),
+                "too_low" (found, but for a step lower in the pipe than the one asked), or "matching".
+                Sessions are checked at the same time by a pool of threads, and the folder of each session is
+                scanned once for all steps, the disk objects reading it from the directory snapshots.
+
+                Args:
+                    steps (str | list, optional): "all" for all the steps of the pipeline, or a list of
+                        pipe_name.step_name or pipe_name (for all the steps of the pipe). Defaults to "all".
+                    max_workers (int | None, optional): The number of threads checking sessions at the same time.
+                        Defaults to 16.
+
+                Returns:
+                    pd.DataFrame: The states, with the sessions index, and one column per step (relative name).
+                """
+                self.pipeline.resolve()
+                selected_steps = get_steps(self.pipeline, steps)
+
+                def get_session_states(session) -> List[str]:
+                    return [get_state(step.get_disk_object(session)) for step in selected_steps]
+
+                sessions = [session for _, session in self._obj.iterrows()]
+                with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                    states = list(pool.map(get_session_states, sessions))
+
+                return pd.DataFrame(
+                    states,
+                    index=self._obj.index,
+                    columns=[step.relative_name for step in selected_steps],
+                ).astype(pd.CategoricalDtype(STATES))
@@ -1,8 +1,11 @@
-from typing import Protocol
+from typing import List, Protocol
 import pandas as pd
 from ..pipelines import Pipeline
 
 
 class SessionPipelineAccessorProto(Protocol):
     def __call__(self, pipeline: Pipeline) -> "SessionPipelineAccessorProto": ...
-    def output_exists(self, pipe_step_name: str) -> pd.Series: ...
+    def output_exists(self, pipe_step_name: str, check_missing_on_disk: bool = False) -> pd.Series: ...
+    def add_ouput(self, pipe_step_name: str) -> pd.DataFrame: ...
+    def where_output(self, pipe_step_name: str, exists: bool) -> pd.DataFrame: ...
+    def status(self, steps: str | List[str] = "all", max_workers: int | None = 16) -> pd.DataFrame: ...
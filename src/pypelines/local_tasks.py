@@ -0,0 +1,280 @@
+from .tasks import BaseTaskBackend, BaseStepTaskManager
+from .pipelines import Pipeline, PIPELINES_STORE
+from .celery_tasks import CeleryTaskRecord, LogTask
+from .executors import get_executor
+
+from concurrent.futures import Executor, Future, wait
+from contextvars import Context
+from datetime import datetime
+from threading import Lock
+from traceback import format_exc as format_traceback_exc
+from uuid import uuid4
+import time
+
+from typing import Dict, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .steps import BaseStep
+
+
+class LocalPoolTaskManager(BaseStepTaskManager):
+
+    backend: "LocalPoolTaskBackend"
+    step: "BaseStep"
+
+    def start(self, session, extra=None, **kwargs) -> "LocalTaskRecord":
+        """Starts a task generating the step for a session, in the process pool of the backend.
+
+        Args:
+            session: The session to use for the task.
+            extra: Extra information to pass to the task (default is None).
+            **kwargs: Arguments of the generation (worker arguments, or skip, refresh, check_requirements...).
+
+        Returns:
+            LocalTaskRecord: The record of the task, updated once the task is done.
+        """
+        return LocalTaskRecord.create(self, session, extra, **kwargs)
+
+
+class LocalTaskRecord(CeleryTaskRecord):
+    """The record of a task ran by a LocalPoolTaskBackend, with the same keys as the tasks records of alyx
+    used by CeleryTaskRecord (id, name, session, status, log, arguments), plus the extra, the submitted,
+    started and ended times, and the duration of the task in seconds.
+
+    The status is "Waiting" until the task runs, and then set from the content of it's log file like for celery
+    tasks ("Complete", "Warnings", "Errors" or "Failed"), or "Uncatched_Fail" if the task could not even log.
+    """
+
+    future: "Future | None" = None
+    # records are updated from their own future (or file), one by one
+    refresh_many = None
+
+    def __init__(self, task_infos_dict: dict, session=None, future: "Future | None" = None):
+        """Initialize the record.
+
+        Args:
+            task_infos_dict (dict): The content of the record.
+            session (optional): The session the task runs on. Defaults to None.
+            future (Future, optional): The future of the task, in the pool of the backend. Defaults to None.
+        """
+        super().__init__(task_infos_dict["id"], task_infos_dict, session=session)
+        self.future = future
+
+    def partial_update(self):
+        """Records are updated in place by the backend, and not stored anywhere else."""
+
+    def refresh(self) -> "LocalTaskRecord":
+        """Update the record with the result of the task if it is done, and return it."""
+        if self.done():
+            self.update_from_future(self.future)
+        return self
+
+    @property
+    def status(self) -> str:
+        """Return the status of the task."""
+        return self["status"]
+
+    def done(self) -> bool:
+        """Return True if the task is done, whether it succeeded or failed."""
+        return self.future is not None and self.future.done()
+
+    def wait(self, timeout: float | None = None) -> "LocalTaskRecord":
+        """Wait for the task to be done, and return the updated record.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait. Defaults to None (no limit).
+
+        Raises:
+            TimeoutError: If the task is not done after timeout seconds.
+
+        Returns:
+            LocalTaskRecord: The record.
+        """
+        if self.future is not None:
+            wait([self.future], timeout=timeout)
+            if not self.future.done():
+                raise TimeoutError(f"The task {self.task_id} ({self['name']}) was not done after {timeout} seconds")
+            # the callback of the future updating the record may not have ran yet when wait returns
+            self.update_from_future(self.future)
+        return self
+
+    def update_from_future(self, future: Future) -> None:
+        """Update the record with the result of the task, once it's future is done."""
+        exception = future.exception()
+        if exception is None:
+            self.update(future.result())
+        else:
+            # the worker process could not run the task at all (pool broken, pipeline not found...)
+            self["status"] = "Uncatched_Fail"
+            self["log"] = str(exception)
+            self["ended"] = datetime.now().isoformat()
+
+    @staticmethod
+    def create(task_manager: LocalPoolTaskManager, session, extra=None, **kwargs) -> "LocalTaskRecord":
+        """Creates a new task record for a step and session, and submits it to the pool of the backend.
+
+        Args:
+            task_manager (LocalPoolTaskManager): The task manager of the step.
+            session: The session to associate with the task.
+            extra (optional): Extra information to pass to the task. Defaults to None.
+            **kwargs: Arguments of the generation.
+
+        Returns:
+            LocalTaskRecord: The record of the submitted task.
+        """
+        record = LocalTaskRecord(
+            {
+                "id": uuid4().hex,
+                "name": task_manager.step.complete_name,
+                "session": session["path"],
+                "status": "Waiting",
+                "log": None,
+                "arguments": kwargs,
+                "extra": extra,
+                "submitted": datetime.now().isoformat(),
+            },
+            session=session,
+        )
+        return task_manager.backend.submit(record)
+
+
+def run_local_task(task_infos_dict: dict, session) -> dict:
+    """Run the generation of a task record in a worker process, logging it to a file in the logs folder
+    of the session, like the celery runners do.
+
+    Args:
+        task_infos_dict (dict): The content of the task record.
+        session: The session to generate the step for.
+
+    Returns:
+        dict: The updated content of the task record.
+    """
+    task = LocalTaskRecord(task_infos_dict, session=session)
+    task["started"] = datetime.now().isoformat()
+    start = time.perf_counter()
+
+    try:
+        pipeline = PIPELINES_STORE[task.pipeline_name]
+        pipeline.resolve()
+
+        with LogTask(task) as log_object:
+            logger = log_object.logger
+            task["log"] = str(log_object.fullpath)
+            task["status"] = "Started"
+
+            try:
+                step: "BaseStep" = pipeline.pipes[task.pipe_name].steps[task.step_name]
+                # the worker processes are forked : the generation runs in a new context, with a run context of it's own
+                Context().run(
+                    step.generate, session, extra=task["extra"], **task.arguments, **task.management_arguments
+                )
+                task.status_from_logs(log_object)
+            except Exception as e:
+                traceback_msg = format_traceback_exc()
+                logger.critical(f"Fatal Error : {e}")
+                logger.critical("Traceback :\n" + traceback_msg)
+                task["status"] = "Failed"
+
+    except Exception as e:
+        # if it fails outside of the nested try statement, we can't store logs files,
+        # and we mention the failure in the record directly.
+        task["status"] = "Uncatched_Fail"
+        task["log"] = str(e)
+
+    task["ended"] = datetime.now().isoformat()
+    task["duration"] = time.perf_counter() - start
+    return dict(task)
+
+
+class LocalPoolTaskBackend(BaseTaskBackend):
+    """A task backend running the tasks in a pool of processes of the current machine, without broker nor database.
+    The pool is kept alive between tasks, and the records of the tasks submitted are kept in the tasks attribute.
+
+    The pool is created when the first task is started, and it's processes are forked from the current one,
+    so the pipelines they run must be fully defined by then.
+    """
+
+    task_manager_class = LocalPoolTaskManager
+    success = True
+
+    def __init__(self, parent: Pipeline, max_workers: int | None = None, executor: "Executor | None" = None):
+        """Initialize the backend.
+
+        Args:
+            parent (Pipeline): The parent Pipeline object.
+            max_workers (int, optional): The number of worker processes. Defaults to None (number of CPUs).
+            executor (Executor, optional): An already instanciated executor to run the tasks in, instead of a
+                process pool created by the backend. Defaults to None.
+        """
+        super().__init__(parent)
+        self.max_workers = max_workers
+        self.pool = executor
+        self.tasks: Dict[str, LocalTaskRecord] = {}
+        self.lock = Lock()
+
+    def get_pool(self) -> Executor:
+        """Return the pool running the tasks, creating it if it doesn't exist yet."""
+        with self.lock:
+            if self.pool is None:
+                self.pool, _ = get_executor("processes", self.max_workers)
+            return self.pool
+
+    def submit(self, record: LocalTaskRecord) -> LocalTaskRecord:
+        """Submit a task record to the pool, and keep it in the tasks registry.
+
+        Args:
+            record (LocalTaskRecord): The record of the task.
+
+        Returns:
+            LocalTaskRecord: The record, that gets updated once the task is done.
+        """
+        with self.lock:
+            self.tasks[record.task_id] = record
+        record.future = self.get_pool().submit(run_local_task, dict(record), record.session)
+        record.future.add_done_callback(record.update_from_future)
+        return record
+
+    def get_tasks(self, status: str | None = None) -> List[LocalTaskRecord]:
+        """Return the records of the tasks submitted, optionally only the ones with a given status.
+
+        Args:
+            status (str, optional): The status of the tasks to return. Defaults to None (all tasks).
+
+        Returns:
+            list: The task records, in the order they were submitted.
+        """
+        with self.lock:
+            tasks = list(self.tasks.values())
+        return [task for task in tasks if status is None or task.status == status]
+
+    def wait(self, timeout: float | None = None) -> List[LocalTaskRecord]:
+        """Wait for all the tasks submitted to be done.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait. Defaults to None (no limit).
+
+        Returns:
+            list: The records of the tasks not done after timeout seconds.
+        """
+        tasks = self.get_tasks()
+        wait([task.future for task in tasks if task.future is not None], timeout=timeout)
+        for task in tasks:
+            if task.done():
+                task.wait()
+        return [task for task in tasks if not task.done()]
+
+    def shutdown(self, wait: bool = True, cancel_tasks: bool = False) -> None:
+        """Stop the pool of processes. A new one is created if tasks are started afterwards.
+
+        Args:
+            wait (bool, optional): Whether to wait for the running tasks to be done. Defaults to True.
+            cancel_tasks (bool, optional): Whether to cancel the tasks that did not start yet. Defaults to False.
+        """
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=cancel_tasks)
+
+
+class LocalPipeline(Pipeline):
+    runner_backend_class = LocalPoolTaskBackend
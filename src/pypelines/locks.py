@@ -0,0 +1,107 @@
+from concurrent.futures import Future
+from logging import getLogger
+import os, time
+
+try:
+    import fcntl
+except ImportError:  # not available on windows, where output locks are disabled
+    fcntl = None
+
+
+class OutputLock:
+    """An advisory lock, shared between processes (and threads), on a lock file next to an output,
+    held while the output is generated and saved, so that concurrent generations of the same output
+    run one after another instead of computing it several times.
+
+    It relies on fcntl.flock, and does nothing if fcntl is not available, or if the path is None.
+    Lock files are never removed, as removing them while another process waits on them would break the lock.
+    """
+
+    def __init__(self, path: str | None, timeout: float | None = None, poll_interval: float = 0.5):
+        """Initialize the lock. It is not acquired until acquire is called (or the lock used as a context manager).
+
+        Args:
+            path (str | None): The path of the lock file, or None to make a lock that does nothing.
+            timeout (float, optional): Maximum number of seconds to wait for the lock. Defaults to None (no limit).
+            poll_interval (float, optional): Number of seconds between two attempts to get the lock, if a timeout
+                is set. Defaults to 0.5.
+        """
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.file = None
+        self.deferred = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None and fcntl is not None
+
+    def acquire(self) -> bool:
+        """Acquire the lock, waiting for the process holding it to release it if any.
+
+        Raises:
+            TimeoutError: If the lock could not be acquired in timeout seconds.
+
+        Returns:
+            bool: True if the lock was held by someone else and we had to wait for it, False otherwise.
+        """
+        if not self.enabled:
+            return False
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, "a")
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return False
+        except BlockingIOError:
+            pass
+
+        getLogger("output_lock").debug(f"Waiting for the lock {self.path}")
+        try:
+            if self.timeout is None:
+                fcntl.flock(self.file, fcntl.LOCK_EX)
+                return True
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return True
+                except BlockingIOError:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Could not acquire the lock {self.path} in {self.timeout} seconds")
+                    time.sleep(self.poll_interval)
+        except BaseException:
+            self.file.close()
+            self.file = None
+            raise
+
+    def release(self, force: bool = False) -> None:
+        """Release the lock, if it is held.
+
+        Args:
+            force (bool, optional): Release it even if it's release was deferred with release_when_done.
+                Defaults to False.
+        """
+        if self.deferred and not force:
+            return
+        if self.file is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+
+    def release_when_done(self, future: Future) -> None:
+        """Keep the lock held until a future is done (ex: a save made in the background), instead of releasing it
+        when release is called.
+
+        Args:
+            future (Future): The future after wich the lock is released.
+        """
+        self.deferred = True
+        future.add_done_callback(lambda _: self.release(force=True))
+
+    def __enter__(self) -> "OutputLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.release()
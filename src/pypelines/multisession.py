@@ -1,13 +1,21 @@
 import pandas as pd
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from traceback import format_exception
+from logging import getLogger
 
-from typing import TYPE_CHECKING
+from .executors import get_executor, submit_step_generate
+from .arguments import preload_arguments
+
+from typing import TYPE_CHECKING, Dict
 
 if TYPE_CHECKING:
     from .steps import BaseStep
+    from .tasks import TaskBatch
 
 
 class BaseMultisessionAccessor:
     step: "BaseStep"
+    failures: pd.DataFrame
 
     def __init__(self, parent):
         """Initializes a new instance of the class.
@@ -19,18 +27,22 @@ class BaseMultisessionAccessor:
             step: The parent object.
             _packer: The multisession packer object from the parent's disk class.
             _unpacker: The multisession unpacker object from the parent's disk class.
+            failures: The sessions that failed during the last generation with iter_generate, or with workers.
         """
         self.step = parent
         self._packer = self.step.pipe.disk_class.multisession_packer
         self._unpacker = self.step.pipe.disk_class.multisession_unpacker
+        self.failures = pd.DataFrame(columns=["extra", "error", "traceback"])
 
-    def load(self, sessions, extras=None):
+    def load(self, sessions, extras=None, **load_kwargs):
         """Load sessions with optional extras and return packed result.
 
         Args:
             sessions (DataFrame): The sessions to load.
             extras (list or tuple, optional): Extra values to be used during loading. If not provided,
                 the same extra value will be used for all sessions.
+            **load_kwargs: Keyword arguments supported by the load method of the disk class of the step
+                (for example columns for ParquetDiskObject).
 
         Returns:
             dict: A dictionary containing the loaded sessions.
@@ -49,7 +61,7 @@ class BaseMultisessionAccessor:
             )
 
         for (index, session), extra in zip(sessions.iterrows(), extras):
-            session_result_dict[index] = self.step.load(session, extra=extra)
+            session_result_dict[index] = self.step.load(session, extra=extra, **load_kwargs)
 
         return self._packer(sessions, session_result_dict)
 
@@ -81,7 +93,7 @@ class BaseMultisessionAccessor:
 
         return None
 
-    def generate(self, sessions, *args, extras=None, extra=None, **kwargs):
+    def generate(self, sessions, *args, extras=None, extra=None, workers=None, **kwargs):
         """Generate session results based on provided extras for each session.
 
         Args:
@@ -90,6 +102,10 @@ class BaseMultisessionAccessor:
             extras (list or None): List of extra values to be used for each session.
                 If None, the same extra value will be used for all sessions.
             extra: Deprecated argument. Use extras instead.
+            workers (int or None): If None, sessions are generated one after another, and the first failure
+                raises. If an integer, sessions are generated in a pool of that many processes, and the
+                generation continues past failures of single sessions. These are then reported in
+                the failures attribute. Defaults to None.
             **kwargs: Additional keyword arguments to pass to the generation step.
 
         Returns:
@@ -97,6 +113,123 @@ class BaseMultisessionAccessor:
         """
         session_result_dict = {}
 
+        if workers is not None:
+            for session, result in self.iter_generate(
+                sessions, *args, extras=extras, extra=extra, workers=workers, **kwargs
+            ):
+                session_result_dict[session.name] = result
+
+            # results are packed in the order of the sessions, not in their order of completion
+            session_result_dict = {
+                index: session_result_dict[index] for index in sessions.index if index in session_result_dict
+            }
+            return self._packer(sessions.loc[list(session_result_dict.keys())], session_result_dict)
+
+        extras = self.get_extras(sessions, extras=extras, extra=extra)
+        preload_arguments(sessions, self.step.pipeline)
+
+        for (index, session), extra in zip(sessions.iterrows(), extras):
+            session_result_dict[index] = self.step.generate(session, *args, extra=extra, **kwargs)
+
+        return self._packer(sessions, session_result_dict)
+
+    def iter_generate(self, sessions, *args, extras=None, extra=None, workers=None, **kwargs):
+        """Generate the sessions and yield the results one by one, as soon as they are available,
+        so that all results don't need to be held in memory at the same time.
+
+        Generation continues past the failure of a single session. Failed sessions are not yielded,
+        and are reported in the failures attribute once the iteration is over.
+
+        Args:
+            sessions (pandas.DataFrame): The sessions data to generate results for.
+            *args: Additional positional arguments to pass to the generation step.
+            extras (list or None): List of extra values to be used for each session.
+                If None, the same extra value will be used for all sessions.
+            extra: Sets the same extra value for all sessions. Cannot be used with extras.
+            workers (int or None): If None, sessions are generated one after another in the current process,
+                and yielded in order. If an integer, sessions are generated in a pool of that many processes,
+                and yielded in their order of completion. Defaults to None.
+            **kwargs: Additional keyword arguments to pass to the generation step.
+
+        Yields:
+            tuple: The session (pandas.Series) and the result of it's generation.
+        """
+        logger = getLogger("multisession.generate")
+
+        extras = self.get_extras(sessions, extras=extras, extra=extra)
+        self.failures = pd.DataFrame(columns=["extra", "error", "traceback"])
+        # read all the sessions arguments files at once, the workers processes inherit them if forked
+        preload_arguments(sessions, self.step.pipeline)
+
+        def report_failure(session, extra, error):
+            logger.error(f"Generation of {self.step.relative_name} failed for the session {session.name} : {error}")
+            self.failures.loc[session.name] = [extra, repr(error), "".join(format_exception(error))]
+
+        sessions_and_extras = iter([(session, extra) for (_, session), extra in zip(sessions.iterrows(), extras)])
+
+        if workers is None:
+            for session, extra in sessions_and_extras:
+                try:
+                    result = self.step.generate(session, *args, extra=extra, **kwargs)
+                except Exception as e:
+                    report_failure(session, extra, e)
+                    continue
+                yield session, result
+
+        else:
+            pool, _ = get_executor("processes", max_workers=workers)
+            # only a limited number of sessions are submitted in advance,
+            # so that finished results don't pile up in memory if they are consumed slower than produced
+            max_pending = 2 * workers
+            pending: Dict[Future, tuple] = {}
+
+            def submit_next():
+                for session, extra in sessions_and_extras:
+                    future = submit_step_generate(pool, self.step, session, *args, extra=extra, **kwargs)
+                    pending[future] = (session, extra)
+                    return True
+                return False
+
+            try:
+                while len(pending) < max_pending and submit_next():
+                    pass
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        session, extra = pending.pop(future)
+                        submit_next()
+                        exception = future.exception()
+                        if exception is not None:
+                            report_failure(session, extra, exception)
+                            continue
+                        yield session, future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+                pool.shutdown(wait=True)
+
+        if len(self.failures):
+            logger.warning(
+                f"Generation of {self.step.relative_name} failed for {len(self.failures)} out of"
+                f" {len(sessions)} sessions. See the failures attribute of the multisession accessor for details."
+            )
+
+    def get_extras(self, sessions, extras=None, extra=None) -> list:
+        """Return a list of extra values, one per session, from the extras or extra arguments.
+
+        Args:
+            sessions (pandas.DataFrame): The sessions to get extra values for.
+            extras (list or None): List of extra values to be used for each session.
+                If None, the same extra value will be used for all sessions.
+            extra: Sets the same extra value for all sessions. Cannot be used with extras.
+
+        Raises:
+            ValueError: If both extra and extras are used, if extras is not a list, or if the number of extra
+                values supplied is different than the number of sessions.
+
+        Returns:
+            list: The extra values, one per session.
+        """
         if extra is not None:
             if extras is not None:
                 raise ValueError(
@@ -121,22 +254,22 @@ class BaseMultisessionAccessor:
                 "The number of extra values supplied is different than the number of sessions. Cannot map them."
             )
 
-        for (index, session), extra in zip(sessions.iterrows(), extras):
-            session_result_dict[index] = self.step.generate(session, *args, extra=extra, **kwargs)
+        return list(extras)
 
-        return self._packer(sessions, session_result_dict)
-
-    def start_tasks(self, sessions):
-        """Starts tasks for each session in the given sessions.
+    def start_tasks(self, sessions, extras=None, extra=None, **kwargs) -> "TaskBatch":
+        """Starts tasks for each session in the given sessions, submitted at once by the task backend.
 
         Args:
             sessions: A pandas DataFrame containing sessions.
+            extras (list or None): List of extra values to be used for each session. Defaults to None.
+            extra: Sets the same extra value for all sessions. Cannot be used with extras. Defaults to None.
+            **kwargs: Additional keyword arguments to pass to the tasks.
 
         Returns:
-            None
+            TaskBatch: A handle on the started tasks.
         """
-        for session in sessions.iterrows():
-            self.step.task.start(session)
+        assert_dataframe(sessions)
+        return self.step.task.start_batch(sessions, extras=extras, extra=extra, **kwargs)
 
 
 def assert_dataframe(sessions):
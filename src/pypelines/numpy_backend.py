@@ -0,0 +1,165 @@
+from .pipes import BasePipe
+from .steps import BaseStep
+from .pickle_backend import PickleDiskObject
+from .disk import invalidate_directory_snapshot, atomic_write
+
+import pickle, json, os, shutil, time, logging, uuid
+import numpy as np
+
+from typing import Any, Dict, Literal
+
+
+class NumpyDiskObject(PickleDiskObject):
+    """Saves numpy arrays, and dictionnaries of numpy arrays, as .npy files that are memory mapped when loaded,
+    so that the steps using only a slice of an array read only that slice from the disk.
+
+    The file found on disk for a pipe is a json sidecar, named like PickleDiskObject files with an .arrays extension,
+    describing the output. The arrays are saved in a folder next to it, named like it with a unique .<id>.d suffix
+    recorded in the sidecar : each save writes a new folder, so the arrays a sidecar refers to are never overwritten.
+    In dictionnaries, values that are not numeric arrays (or keys that are not strings) are pickled together
+    in that same folder. Outputs that are neither arrays nor dictionnaries are pickled entirely.
+    """
+
+    extension = "arrays"
+    sidecar_format = 1
+
+    @staticmethod
+    def get_arrays_folder(sidecar_path: str) -> "str | None":
+        """Return the folder holding the arrays of the output described by a sidecar file,
+        or None if the sidecar file doesn't exist."""
+        try:
+            with open(sidecar_path, "r") as file:
+                sidecar = json.load(file)
+        except FileNotFoundError:
+            return None
+        return os.path.join(os.path.dirname(sidecar_path), sidecar["folder"])
+
+    @staticmethod
+    def make_arrays_folder_name(sidecar_path: str) -> str:
+        """Return a new, unique, name for the folder holding the arrays of an output saved at sidecar_path."""
+        return f"{os.path.basename(sidecar_path)}.{uuid.uuid4().hex}.d"
+
+    @staticmethod
+    def is_mappable(value: Any) -> bool:
+        """Return True if the value is a numpy array that can be saved as .npy and memory mapped."""
+        return isinstance(value, np.ndarray) and not value.dtype.hasobject
+
+    def save(self, data):
+        """Save an array, or a dictionnary of arrays, as .npy files, and write the sidecar describing them.
+
+        Args:
+            data: The data to be saved to disk.
+
+        Returns:
+            None
+        """
+        logger = logging.getLogger("NumpyDiskObject.save")
+        new_full_path = self.get_full_path()
+        # the folder of the output being replaced, if any, is only removed once the new sidecar is in place,
+        # so that the sidecar on disk always refers to a complete folder
+        old_folder = self.get_arrays_folder(new_full_path)
+        folder_name = self.make_arrays_folder_name(new_full_path)
+        folder = os.path.join(os.path.dirname(new_full_path), folder_name)
+        logger.debug(f"Saving to path : {new_full_path}")
+
+        start = time.perf_counter()
+        os.makedirs(folder)
+
+        sidecar: Dict[str, Any] = {"format": self.sidecar_format, "version": self.version, "folder": folder_name}
+        if self.is_mappable(data):
+            with atomic_write(os.path.join(folder, "array.npy")) as f:
+                np.save(f, data)
+            sidecar.update(type="array", file="array.npy")
+
+        elif isinstance(data, dict) and all(isinstance(key, str) for key in data.keys()):
+            arrays, others = [], {}
+            for index, (key, value) in enumerate(data.items()):
+                if self.is_mappable(value):
+                    file_name = f"{index}.npy"
+                    with atomic_write(os.path.join(folder, file_name)) as f:
+                        np.save(f, value)
+                    arrays.append({"key": key, "file": file_name})
+                else:
+                    others[key] = value
+            if others:
+                with atomic_write(os.path.join(folder, "others.pickle")) as f:
+                    pickle.dump(others, f)
+            sidecar.update(
+                type="dict", keys=list(data.keys()), arrays=arrays, others="others.pickle" if others else None
+            )
+
+        else:
+            with atomic_write(os.path.join(folder, "object.pickle")) as f:
+                pickle.dump(data, f)
+            sidecar.update(type="object", file="object.pickle")
+
+        # the sidecar is written once the arrays it describes are all on disk
+        with atomic_write(new_full_path, "w") as file:
+            json.dump(sidecar, file, indent=2)
+        write_duration = time.perf_counter() - start
+        if old_folder is not None:
+            shutil.rmtree(old_folder, ignore_errors=True)
+
+        if self.current_disk_file is not None and self.current_disk_file != new_full_path and self.remove:
+            logger.debug(f"Removing old file from path : {self.current_disk_file}")
+            old_folder = self.get_arrays_folder(self.current_disk_file)
+            try:
+                os.remove(self.current_disk_file)
+            except FileNotFoundError:
+                logger.error(f"The file {self.current_disk_file} that should have been removed don't exist anymore")
+            if old_folder is not None:
+                shutil.rmtree(old_folder, ignore_errors=True)
+        self.current_disk_file = new_full_path
+        self.record_output(new_full_path, write_duration)
+        invalidate_directory_snapshot(os.path.dirname(new_full_path))
+
+    def get_output_size(self, file_path: str) -> int:
+        """Return the size, in bytes, of the output described by the sidecar at file_path, arrays included."""
+        folder = self.get_arrays_folder(file_path)
+        with os.scandir(folder) as entries:
+            return os.path.getsize(file_path) + sum(entry.stat().st_size for entry in entries if entry.is_file())
+
+    def load(self, mmap_mode: Literal["r", "r+", "c"] | None = "r"):
+        """Load the data from the current disk file, memory mapping the arrays.
+
+        Args:
+            mmap_mode (str | None, optional): The mode used to memory map the arrays (see numpy.load).
+                "r" maps them read only, "c" allows to modify them in memory without changing the files.
+                None reads them entirely in memory. Defaults to "r".
+
+        Raises:
+            IOError: If no file was found on disk or 'check_disk()' was not run.
+
+        Returns:
+            The loaded data.
+        """
+        logger = logging.getLogger("NumpyDiskObject.load")
+        logger.debug(f"Current disk file status : {self.current_disk_file=}")
+        if self.current_disk_file is None:
+            raise IOError(
+                "Could not find a file to load. Either no file was found on disk, or you forgot to run 'check_disk()'"
+            )
+
+        with open(self.current_disk_file, "r") as file:
+            sidecar = json.load(file)
+        folder = os.path.join(os.path.dirname(self.current_disk_file), sidecar["folder"])
+
+        if sidecar["type"] == "array":
+            return np.load(os.path.join(folder, sidecar["file"]), mmap_mode=mmap_mode)
+
+        if sidecar["type"] == "dict":
+            values = {}
+            for array in sidecar["arrays"]:
+                values[array["key"]] = np.load(os.path.join(folder, array["file"]), mmap_mode=mmap_mode)
+            if sidecar["others"] is not None:
+                with open(os.path.join(folder, sidecar["others"]), "rb") as f:
+                    values.update(pickle.load(f))
+            return {key: values[key] for key in sidecar["keys"]}
+
+        with open(os.path.join(folder, sidecar["file"]), "rb") as f:
+            return pickle.load(f)
+
+
+class NumpyPipe(BasePipe):
+    step_class = BaseStep
+    disk_class = NumpyDiskObject
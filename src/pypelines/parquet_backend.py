@@ -0,0 +1,96 @@
+from .pipes import BasePipe
+from .steps import BaseStep
+from .pickle_backend import PickleDiskObject
+from .disk import atomic_write
+
+import logging
+import pandas as pd
+
+from typing import List, Sequence, Tuple, Any
+
+
+class ParquetDiskObject(PickleDiskObject):
+    """Saves DataFrames in the columnar Apache Parquet format, with the same file naming scheme as PickleDiskObject
+    (prefix.pipe.step.version.extra.parquet), so that steps can be loaded partially : only the requested
+    columns, and the row groups that can satisfy the filters, are read from the disk.
+
+    Requires the pyarrow package (pip install processing-pypelines[parquet]).
+    Only pandas DataFrames can be saved with this backend. Their column names must be strings.
+    """
+
+    extension = "parquet"
+    # rows are written by chunks (row groups) of that many rows, allowing filters to skip some of them when loading
+    row_group_size: int | None = 100_000
+    compression: str | None = "snappy"
+
+    def write(self, file_path: str, data: pd.DataFrame) -> None:
+        """Write a DataFrame to file_path, in the parquet format.
+
+        Args:
+            file_path (str): The path of the file to write.
+            data (pd.DataFrame): The DataFrame to be saved.
+
+        Raises:
+            TypeError: If data is not a pandas DataFrame.
+        """
+        if not isinstance(data, pd.DataFrame):
+            raise TypeError(
+                f"The step {self.step.relative_name} returned a {type(data).__name__}. "
+                "Only pandas DataFrames can be saved with ParquetDiskObject."
+            )
+
+        # the index is always stored as columns (even range indexes), to be kept on partial loads
+        with atomic_write(file_path) as f:
+            data.to_parquet(
+                f,
+                engine="pyarrow",
+                index=True,
+                compression=self.compression,
+                row_group_size=self.row_group_size,
+            )
+
+    def load(
+        self,
+        columns: Sequence[str] | None = None,
+        filters: List[Tuple[str, str, Any]] | List[List[Tuple[str, str, Any]]] | None = None,
+    ) -> pd.DataFrame:
+        """Load the DataFrame from the current disk file, optionally only some of it's columns and rows.
+
+        Args:
+            columns (Sequence[str], optional): The columns to read. The index is always read.
+                Defaults to None, meaning all columns.
+            filters (list, optional): Rows to read, in the pyarrow DNF format, ex : [("trial#", "<", 10)]
+                or [[("side", "==", "left")], [("side", "==", "right")]]. Row groups that cannot contain matching rows
+                are not read from the disk. Defaults to None, meaning all rows.
+
+        Raises:
+            IOError: If no file was found on disk or 'check_disk()' was not run.
+
+        Returns:
+            pd.DataFrame: The loaded data.
+        """
+        logger = logging.getLogger("ParquetDiskObject.load")
+        logger.debug(f"Current disk file status : {self.current_disk_file=}")
+        if self.current_disk_file is None:
+            raise IOError(
+                "Could not find a file to load. Either no file was found on disk, or you forgot to run 'check_disk()'"
+            )
+
+        data = pd.read_parquet(
+            self.current_disk_file,
+            engine="pyarrow",
+            columns=list(columns) if columns is not None else None,
+            filters=filters,
+        )
+
+        # a partial load cannot be used to rewrite the file in the current format
+        if self.update_file_format and self.is_legacy_format and columns is None and filters is None:
+            self.save(data)
+            self.is_legacy_format = False
+
+        return data
+
+
+class ParquetPipe(BasePipe):
+    step_class = BaseStep
+    disk_class = ParquetDiskObject
@@ -1,13 +1,200 @@
 from .pipes import BasePipe
 from .steps import BaseStep
-from .disk import BaseDiskObject
+from .disk import BaseDiskObject, get_directory_files, invalidate_directory_snapshot, atomic_write
 
-import pickle, natsort, os, re, logging
+import pickle, natsort, os, re, json, mmap, struct, time, logging, uuid
 import pandas as pd
 
+from threading import Lock
+from typing import Any, BinaryIO, Dict, List, Tuple
+
 
 IGNORE_VERSIONS = False
 
+# files written by Pickle5DiskObject start with this magic, followed by the length of a json header (8 bytes, little
+# endian), the header itself (naming the serializer and the out-of-band buffers), then the protocol 5 pickle data.
+# Plain pickle files never start with it, as pickle streams start with the PROTO opcode (\x80) or an opcode letter.
+PICKLE5_MAGIC = b"PYPELINES-PICKLE5\n"
+# out-of-band buffers are aligned to that many bytes in the buffers sidecar file
+BUFFERS_ALIGNMENT = 64
+
+
+# parsed outputs indexes, by path, with the (mtime, size) of the file when it was parsed
+_OUTPUTS_INDEXES: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_OUTPUTS_INDEXES_LOCK = Lock()
+
+
+def read_outputs_index(index_path: str) -> Dict[str, Any]:
+    """Read an outputs index file, from memory if it's (mtime, size) didn't change since it was last read.
+
+    Args:
+        index_path (str): The path of the index file.
+
+    Returns:
+        dict: The content of the index, with an outputs key. Empty if the file doesn't exist or is unreadable.
+            It is shared with the cache, and must not be modified.
+    """
+    try:
+        stat = os.stat(index_path)
+    except FileNotFoundError:
+        return {"outputs": {}}
+    file_key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _OUTPUTS_INDEXES.get(index_path)
+    if cached is not None and cached[0] == file_key:
+        return cached[1]
+    try:
+        with open(index_path, "r") as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        return {"outputs": {}}
+    _OUTPUTS_INDEXES[index_path] = (file_key, index)
+    return index
+
+
+def update_outputs_index(index_path: str, key: str, record: Dict[str, Any]) -> None:
+    """Set the record of an output in an outputs index file.
+
+    Args:
+        index_path (str): The path of the index file.
+        key (str): The key of the output in the index (the extra).
+        record (dict): The record of the output.
+    """
+    with _OUTPUTS_INDEXES_LOCK:
+        index = dict(read_outputs_index(index_path))
+        index["format"] = 1
+        index["outputs"] = {**index.get("outputs", {}), key: record}
+        with atomic_write(index_path, "w") as file:
+            json.dump(index, file, indent=2)
+
+
+def make_buffers_sidecar_name(file_path: str) -> str:
+    """Return a new, unique, name for the file holding the out-of-band buffers of a pickle file.
+    It is hidden, and doesn't end with the pickle file extension, to not be taken for an output by check_disk.
+    Each save gets a sidecar of it's own, so that the one a pickle file refers to is never overwritten."""
+    file_name = os.path.basename(file_path)
+    return f".{os.path.splitext(file_name)[0]}.{uuid.uuid4().hex}.buffers"
+
+
+def read_pickle5_header(file: BinaryIO) -> "Dict[str, Any] | None":
+    """Read the header of a file written by write_pickle5, leaving the file positioned at the start of the pickle data.
+
+    Args:
+        file (BinaryIO): The file, opened in binary mode, and positioned at it's start.
+
+    Returns:
+        dict | None: The header, or None if the file was not written by write_pickle5
+            (the file is then positioned back at it's start).
+    """
+    if file.read(len(PICKLE5_MAGIC)) != PICKLE5_MAGIC:
+        file.seek(0)
+        return None
+    (header_size,) = struct.unpack("<Q", file.read(8))
+    return json.loads(file.read(header_size))
+
+
+def get_buffers_sidecar_path(file_path: str) -> "str | None":
+    """Return the path of the file holding the out-of-band buffers of a pickle file, as recorded in it's header,
+    or None if the file was not written by write_pickle5, has no out-of-band buffers, or doesn't exist."""
+    try:
+        with open(file_path, "rb") as f:
+            header = read_pickle5_header(f)
+    except FileNotFoundError:
+        return None
+    if header is None or not header.get("sidecar"):
+        return None
+    return os.path.join(os.path.dirname(file_path), header["sidecar"])
+
+
+def write_pickle5(file_path: str, data: Any, out_of_band_threshold: int = 64 * 1024) -> None:
+    """Pickle data to file_path with protocol 5, writing the contiguous buffers larger than out_of_band_threshold
+    bytes (numpy arrays, pandas columns) out-of-band, in an aligned sidecar file, so they can be memory mapped back.
+
+    Args:
+        file_path (str): The path of the pickle file.
+        data (Any): The data to pickle.
+        out_of_band_threshold (int, optional): The size, in bytes, from which buffers are written out-of-band.
+            Defaults to 64 KiB.
+    """
+    buffers: List[pickle.PickleBuffer] = []
+
+    def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+        # returning True keeps the buffer in-band
+        try:
+            raw = buffer.raw()
+        except BufferError:  # not contiguous
+            return True
+        if raw.nbytes < out_of_band_threshold:
+            return True
+        buffers.append(buffer)
+        return False
+
+    payload = pickle.dumps(data, protocol=5, buffer_callback=buffer_callback)
+
+    # the sidecar of the file being replaced, if any, is only removed once the new file is in place,
+    # so that the pickle file on disk always refers to a complete sidecar
+    old_sidecar_path = get_buffers_sidecar_path(file_path)
+    sidecar_name = None
+    layout = []
+    if buffers:
+        sidecar_name = make_buffers_sidecar_name(file_path)
+        with atomic_write(os.path.join(os.path.dirname(file_path), sidecar_name)) as f:
+            for buffer in buffers:
+                padding = -f.tell() % BUFFERS_ALIGNMENT
+                f.write(b"\0" * padding)
+                raw = buffer.raw()
+                layout.append({"offset": f.tell(), "size": raw.nbytes})
+                f.write(raw)
+
+    header = json.dumps({"serializer": "pickle5", "sidecar": sidecar_name, "buffers": layout}).encode()
+    with atomic_write(file_path) as f:
+        f.write(PICKLE5_MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(payload)
+
+    if old_sidecar_path is not None and os.path.exists(old_sidecar_path):
+        os.remove(old_sidecar_path)
+
+
+def read_pickle_file(file_path: str) -> Any:
+    """Load a pickle file, streaming it from disk whatever the way it was written :
+    by Pickle5DiskObject (the out-of-band buffers are then memory mapped, copy on write),
+    or as a plain pickle (including pickles of pandas objects needing pandas compatibility loading).
+
+    Args:
+        file_path (str): The path of the pickle file.
+
+    Raises:
+        ModuleNotFoundError: If the pickle references a module that is not available, other than pandas ones.
+
+    Returns:
+        Any: The unpickled data.
+    """
+    logger = logging.getLogger("pickle.read_pickle_file")
+
+    with open(file_path, "rb") as f:
+        header = read_pickle5_header(f)
+        if header is not None:
+            buffers = []
+            if header["buffers"]:
+                with open(os.path.join(os.path.dirname(file_path), header["sidecar"]), "rb") as sidecar:
+                    mapped = mmap.mmap(sidecar.fileno(), 0, access=mmap.ACCESS_COPY)
+                mapped_view = memoryview(mapped)
+                buffers = [mapped_view[item["offset"] : item["offset"] + item["size"]] for item in header["buffers"]]
+            return pickle.load(f, buffers=buffers)
+
+        try:
+            return pickle.load(f)
+        except ModuleNotFoundError as e:
+            logger.debug("Unable to load using generick pickling")
+            if "pandas" in e.__str__():
+                logger.debug("Trying out pandas read_pickle")
+                f.seek(0)
+                return pd.read_pickle(f)
+            logger.debug(f"Pandas not found in {e.__str__()}. Raising error")
+            raise e
+
 
 class PickleDiskObject(BaseDiskObject):
     collection = ["preprocessing_saves"]  # collection a.k.a subfolders in the session.path
@@ -17,6 +204,12 @@ class PickleDiskObject(BaseDiskObject):
     current_disk_file = None
     update_file_format = True
     is_legacy_format = False
+    in_run_handoff = True
+    # if True, each save records the output in a per pipe index file, that check_disk reads before scanning files
+    use_outputs_index = True
+
+    # informations about the generation of the output, recorded in the outputs index when saving it
+    generation_info: Dict[str, Any] | None = None
 
     def __init__(self, session, step, extra=""):
         """Initialize the StepTask object.
@@ -154,21 +347,102 @@ class PickleDiskObject(BaseDiskObject):
         )
         return filename
 
+    def get_lock_path(self) -> str:
+        """Return the path of the lock file of the output, next to it. It is hidden, and doesn't end with the
+        extension of the outputs, to not be taken for an output by check_disk."""
+        folder, file_name = os.path.split(self.get_full_path())
+        return os.path.join(folder, "." + os.path.splitext(file_name)[0] + ".lock")
+
+    def get_outputs_index_path(self) -> str:
+        """Return the path of the index recording the outputs of the pipe, for the session."""
+        return os.path.join(
+            self.session.path,
+            os.path.sep.join(self.collection),
+            f"{self.file_prefix}.{self.step.pipe_name}.outputs.json",
+        )
+
+    def get_output_size(self, file_path: str) -> int:
+        """Return the size, in bytes, of the output saved at file_path (including it's buffers sidecar if any)."""
+        size = os.path.getsize(file_path)
+        sidecar_path = get_buffers_sidecar_path(file_path)
+        if sidecar_path is not None and os.path.exists(sidecar_path):
+            size += os.path.getsize(sidecar_path)
+        return size
+
+    def record_output(self, file_path: str, write_duration: float) -> None:
+        """Record the output just saved at file_path in the outputs index of the pipe,
+        and in the catalog of the pipeline if it has one.
+
+        Args:
+            file_path (str): The path of the saved output.
+            write_duration (float): The duration of the save, in seconds.
+        """
+        self.record_in_catalog(file_path)
+        if not self.use_outputs_index:
+            return
+        generation_info = self.generation_info or {}
+        record = {
+            "step": self.step.step_name,
+            "pipe_version": self.version if self.version else None,
+            "step_version": self.step.version,
+            "file": os.path.basename(file_path),
+            "arguments_hash": generation_info.get("arguments_hash"),
+            "size": self.get_output_size(file_path),
+            "write_duration": write_duration,
+            "compute_duration": generation_info.get("compute_duration"),
+            "timestamp": time.time(),
+        }
+        try:
+            update_outputs_index(self.get_outputs_index_path(), self.extra, record)
+        except OSError as e:
+            # the index is only a shortcut, check_disk scans the files if it is not up to date
+            logging.getLogger("pickle.record_output").warning(f"Could not update the outputs index : {e}")
+
+    def get_output_record(self) -> Dict[str, Any] | None:
+        """Return the record of the output of the pipe for the session and extra, from the outputs index,
+        or None if there is no record."""
+        return read_outputs_index(self.get_outputs_index_path()).get("outputs", {}).get(self.extra)
+
     def check_disk(self):
         """Check disk for matching files based on specified pattern and expected values.
 
+        The outputs index of the pipe is consulted first : if it records an output of this very step and version
+        for the extra, and that output is still on disk, it is used without matching the files names.
+        Otherwise, the files names are matched as usual.
+
         Returns:
             bool: True if a matching file is found, False otherwise.
         """
         logger = logging.getLogger("pickle.check_disk")
 
         search_path = os.path.join(self.session.path, os.path.sep.join(self.collection))
+        # the directory content is served from memory if it didn't change since the last check
+        directory_files = get_directory_files(search_path, create=True)
+
+        if self.use_outputs_index:
+            record = self.get_output_record()
+            # only an exact match is taken from the index : records of other steps of the pipe may not be the only
+            # outputs on disk (if the disk object doesn't remove them), and partial matches need the files scan
+            if (
+                record is not None
+                and record.get("file") in directory_files
+                and record.get("step") == self.step.step_name
+                and record.get("pipe_version") == (self.version if self.version else None)
+            ):
+                self.current_disk_file = os.path.join(search_path, record["file"])
+                self.disk_version = record["pipe_version"]
+                self.disk_step = record["step"]
+                logger.debug(
+                    f"Found in the outputs index : {self.current_disk_file} with {self.disk_step=} {self.disk_version=}"
+                )
+                return True
+
         pattern = self.make_file_name_pattern()
 
-        os.makedirs(search_path, exist_ok=True)
+        cpattern = re.compile(pattern)
 
         logger.debug(f"Searching at folder : {search_path} with {pattern=}")
-        matching_files = files(search_path, re_pattern=pattern, relative=True, levels=0)
+        matching_files = [file for file in directory_files if cpattern.search(file)]
         logger.debug(f"Found files : {matching_files}")
 
         if not len(matching_files):
@@ -179,7 +453,6 @@ class PickleDiskObject(BaseDiskObject):
             "step_name": self.step.step_name,
             "version": self.version if self.version else None,
         }
-        cpattern = re.compile(pattern)
         match_datas = []
         for index, file in enumerate(matching_files):
             match = cpattern.search(file)
@@ -244,18 +517,34 @@ class PickleDiskObject(BaseDiskObject):
         new_full_path = self.get_full_path()
         logger.debug(f"Saving to path : {new_full_path}")
 
-        if isinstance(data, pd.DataFrame):
-            data.to_pickle(new_full_path)
-        else:
-            with open(new_full_path, "wb") as f:
-                pickle.dump(data, f)
+        start = time.perf_counter()
+        self.write(new_full_path, data)
+        write_duration = time.perf_counter() - start
         if self.current_disk_file is not None and self.current_disk_file != new_full_path and self.remove:
             logger.debug(f"Removing old file from path : {self.current_disk_file}")
+            sidecar_path = get_buffers_sidecar_path(self.current_disk_file)
             try:
                 os.remove(self.current_disk_file)
             except FileNotFoundError:
                 logger.error(f"The file {self.current_disk_file} that should have been removed don't exist anymore")
+            if sidecar_path is not None and os.path.exists(sidecar_path):
+                os.remove(sidecar_path)
         self.current_disk_file = new_full_path
+        self.record_output(new_full_path, write_duration)
+        invalidate_directory_snapshot(os.path.dirname(new_full_path))
+
+    def write(self, file_path: str, data) -> None:
+        """Write data to file_path, as a pickle file.
+
+        Args:
+            file_path (str): The path of the file to write.
+            data: Data to be saved to disk. If data is a pandas DataFrame, it will be saved with to_pickle.
+        """
+        with atomic_write(file_path) as f:
+            if isinstance(data, pd.DataFrame):
+                data.to_pickle(f)
+            else:
+                pickle.dump(data, f)
 
     def load(self):
         """Load data from the current disk file.
@@ -273,17 +562,7 @@ class PickleDiskObject(BaseDiskObject):
                 "Could not find a file to load. Either no file was found on disk, or you forgot to run 'check_disk()'"
             )
 
-        try:
-            with open(self.current_disk_file, "rb") as f:
-                data = pickle.load(f)
-        except ModuleNotFoundError as e:
-            logger.debug("Unable to load using generick pickling")
-            if "pandas" in e.__str__():
-                logger.debug("Trying out pandas read_pickle")
-                data = pd.read_pickle(self.current_disk_file)
-            else:
-                logger.debug(f"Pandas not found in {e.__str__()}. Raising error")
-                raise e
+        data = read_pickle_file(self.current_disk_file)
 
         if self.update_file_format and self.is_legacy_format:
             self.save(data)
@@ -379,6 +658,30 @@ class PicklePipe(BasePipe):
     disk_class = PickleDiskObject
 
 
+class Pickle5DiskObject(PickleDiskObject):
+    """Saves outputs as pickle protocol 5 files, with the large buffers of numpy arrays and pandas objects
+    written out-of-band in a sidecar file, and memory mapped when loading instead of being copied.
+    Files are named like PickleDiskObject ones, and both backends can read each other's files.
+    """
+
+    # buffers smaller than that many bytes are kept in the pickle file itself
+    out_of_band_threshold = 64 * 1024
+
+    def write(self, file_path: str, data) -> None:
+        """Write data to file_path, as a pickle protocol 5 file with out-of-band buffers.
+
+        Args:
+            file_path (str): The path of the file to write.
+            data: Data to be saved to disk.
+        """
+        write_pickle5(file_path, data, out_of_band_threshold=self.out_of_band_threshold)
+
+
+class Pickle5Pipe(BasePipe):
+    step_class = BaseStep
+    disk_class = Pickle5DiskObject
+
+
 def files(
     input_path,
     re_pattern=None,
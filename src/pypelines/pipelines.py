@@ -2,17 +2,25 @@ from logging import getLogger
 import os
 from .tasks import BaseTaskBackend
 
-from typing import Callable, Type, Dict, List, Iterable, Protocol, TYPE_CHECKING
+from typing import Callable, Type, Dict, List, Tuple, Iterable, Protocol, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .pipes import BasePipe
     from .steps import BaseStep
     from .graphs import PipelineGraph
+    from .catalog import OutputCatalog
+
+
+PIPELINES_STORE: Dict[str, "Pipeline"] = {}  # pipelines created in the current process, by pipeline name
 
 
 class Pipeline:
     pipes: Dict[str, "BasePipe"]
+    steps_index: Dict[str, "BaseStep"]
+    requirement_stacks: Dict["BaseStep", Tuple["BaseStep", ...]]
     runner_backend_class = BaseTaskBackend
+    # the catalog in wich the outputs saved are recorded, if any (see set_catalog)
+    catalog: "OutputCatalog | None" = None
 
     def __init__(self, name: str, **runner_args):
         """Initialize the pipeline with the given name and runner arguments.
@@ -25,17 +33,41 @@ class Pipeline:
             pipeline_name (str): The name of the pipeline.
             pipes (dict): Dictionary to store pipeline components.
             resolved (bool): Flag to indicate if the pipeline is resolved.
+            steps_index (dict): Dictionary of the steps, with their relative names as keys. Filled when resolved.
+            requirement_stacks (dict): Dictionary of the compiled requirement stack of each step.
+                Filled when resolved.
             runner_backend: The runner backend object created with the provided arguments.
                 If creation fails, it evaluates to False as a boolean.
         """
         self.pipeline_name = name
         self.pipes = {}
         self.resolved = False
+        self.steps_index = {}
+        self.requirement_stacks = {}
 
         # create a runner backend, if fails, the runner_backend object evaluates to False as a boolean
         # (to be checked and used througout the pipeline wrappers creation)
         self.runner_backend = self.runner_backend_class(self, **runner_args)
 
+        # register the pipeline so that it can be found by name, from workers of process based executors
+        PIPELINES_STORE[name] = self
+
+    def set_catalog(self, catalog: "str | OutputCatalog | None") -> "OutputCatalog | None":
+        """Set the SQLite catalog in wich the outputs saved by the steps of the pipeline are recorded,
+        and that is used to know wich sessions have outputs without scanning their folders.
+
+        Args:
+            catalog (str | OutputCatalog | None): The path of the catalog database, an OutputCatalog,
+                or None to stop using a catalog.
+
+        Returns:
+            OutputCatalog | None: The catalog of the pipeline.
+        """
+        from .catalog import OutputCatalog
+
+        self.catalog = OutputCatalog(catalog) if isinstance(catalog, (str, os.PathLike)) else catalog
+        return self.catalog
+
     def register_pipe(self, pipe_class: Type["BasePipe"]) -> Type["BasePipe"]:
         """Wrapper to instanciate and attache a a class inheriting from BasePipe it to the Pipeline instance.
         The Wraper returns the class without changing it.
@@ -73,6 +105,10 @@ class Pipeline:
         Raises:
             KeyError: If the specified instance name is not found in the pipeline.
         """
+        step = self.steps_index.get(instance_name)
+        if step is not None:
+            return step
+
         pipe_name, step_name = instance_name.split(".")
         try:
             pipe = self.pipes[pipe_name]
@@ -86,12 +122,21 @@ class Pipeline:
         """Scans currentely registered Pipes.
         Ensures that for each Pipe's Step, the items in requires list are Step instances, and not strings.
         If they aren't instanciate them.
+        Then compiles, once, the ordered requirement stack of every step, as well as a name to step index,
+        so that later calls to get_requirement_stack are simple lookups.
         Once ran, sets a flag resolved to True, to avoid needing to reprocess the class's Pipes.
-        This flag is set to False inside register_pipe function, if a new class gets registered.
+        This flag is set to False inside register_pipe and attach_step functions, if a new class gets registered,
+        wich invalidates the compiled requirement stacks, and the wrapper functions (generate, load...) of the steps.
         """
         if self.resolved:
             return
 
+        self.steps_index = {}
+        for pipe in self.pipes.values():
+            for step in pipe.steps.values():
+                self.steps_index[step.relative_name] = step
+                step.clear_wrapped_functions()
+
         for pipe in self.pipes.values():
             for step in pipe.steps.values():
                 instanciated_requires = []
@@ -102,48 +147,47 @@ class Pipeline:
 
                 step.requires = instanciated_requires
 
-        self.resolved = True
+        self.requirement_stacks = {}
+        for step in self.steps_index.values():
+            self.compile_requirement_stack(step)
 
-    def __getattr__(self, name: str) -> "BasePipe":
-        if name in self.pipes:
-            return self.pipes[name]
-        raise AttributeError(f"'Pipeline' object has no attribute '{name}'")
+        self.compile_levels()
 
-    def get_requirement_stack(
-        self, instance: "BaseStep", names: bool = False, max_recursion: int = 100
-    ) -> List["BaseStep"]:
-        """Returns a list containing the ordered Steps that the "instance" Step object requires for being ran.
+        self.resolved = True
+
+    def compile_requirement_stack(
+        self, instance: "BaseStep", max_recursion: int = 100
+    ) -> Tuple["BaseStep", ...]:
+        """Compiles and stores the ordered requirement stack of the "instance" Step object,
+        reusing the stacks of it's requirements if they have already been compiled.
 
         Args:
-            instance (BaseStep): _description_
-            names (bool, optional): _description_. Defaults to False.
-            max_recursion (int, optional): _description_. Defaults to 100.
+            instance (BaseStep): The step to compile the requirement stack for.
+            max_recursion (int, optional): Maximum depth of the requirement tree. Defaults to 100.
 
         Raises:
-            RecursionError: _description_
-            ValueError: _description_
+            RecursionError: If a requirement refers to a step that exists in it's parents hierarchy.
+            ValueError: If the requirement tree is deeper than max_recursion.
 
         Returns:
-            list: _description_
+            tuple: The immutable, ordered, requirement stack of the instance.
         """
-
-        self.resolve()  # ensure requires lists are containing instances and not strings
         parents: List["BaseStep"] = []
-        required_steps = []
 
-        def recurse_requirement_stack(
-            instance: "BaseStep",
-        ):
-            """
-            _summary_
+        def recurse_requirement_stack(instance: "BaseStep") -> Tuple["BaseStep", ...]:
+            """Returns the requirement stack of the instance, compiling it if it isn't known yet.
 
             Args:
-                instance (BaseStep): _description_
+                instance (BaseStep): The step to get the requirement stack for.
 
             Raises:
-                RecursionError: _description_
-                ValueError: _description_
+                RecursionError: If a requirement refers to a step that exists in it's parents hierarchy.
+                ValueError: If the requirement tree is deeper than max_recursion.
             """
+            stack = self.requirement_stacks.get(instance)
+            if stack is not None:
+                return stack
+
             if instance in parents:
                 raise RecursionError(
                     f"Circular import : {parents[-1]} requires {instance} wich exists in parents hierarchy : {parents}"
@@ -156,17 +200,97 @@ class Pipeline:
                     " max_recursion"
                 )
 
+            # a dict is used as an ordered set, so that membership checks don't require to scan a list
+            required_steps: Dict["BaseStep", None] = {}
             for requirement in instance.requires:
-                recurse_requirement_stack(requirement)
-                if requirement not in required_steps:
-                    required_steps.append(requirement)
+                for required_step in recurse_requirement_stack(requirement):
+                    required_steps.setdefault(required_step)
+                required_steps.setdefault(requirement)
 
             parents.pop(-1)
 
-        recurse_requirement_stack(instance)
+            stack = tuple(required_steps)
+            self.requirement_stacks[instance] = stack
+            return stack
+
+        return recurse_requirement_stack(instance)
+
+    def compile_levels(self) -> None:
+        """Computes, in a single pass over the steps in topological order, the global and selfish levels
+        of every step, and stores them as integers in the level and selfish_level attributes of the steps.
+
+        The global level is the length of the longest requirement chain below a step.
+        The selfish level only counts the steps of that chain that belong to the same pipe than the step.
+        """
+        # for each step, the number of steps of each pipe found along the longest chains below (and including) it
+        pipes_levels: Dict["BaseStep", Dict[str, int]] = {}
+
+        for step in self.topological_order():
+            level = 0
+            step_pipes_levels: Dict[str, int] = {}
+            for requirement in step.requires:
+                level = max(level, requirement.level + 1)
+                requirement_pipes_levels = pipes_levels[requirement]
+                for pipe_name, pipe_level in requirement_pipes_levels.items():
+                    step_pipes_levels[pipe_name] = max(step_pipes_levels.get(pipe_name, 0), pipe_level)
+                # the requirement itself counts for one level in it's own pipe
+                step_pipes_levels[requirement.pipe_name] = max(
+                    step_pipes_levels.get(requirement.pipe_name, 0),
+                    requirement_pipes_levels.get(requirement.pipe_name, 0) + 1,
+                )
+
+            pipes_levels[step] = step_pipes_levels
+            step.level = level
+            step.selfish_level = step_pipes_levels.get(step.pipe_name, 0)
+
+    def topological_order(self) -> List["BaseStep"]:
+        """Returns all the steps of the pipeline, ordered so that every step comes after all of it's requirements.
+
+        Returns:
+            list: The steps of the pipeline, in topological order.
+        """
+        ordered_steps: Dict["BaseStep", None] = {}
+        for step in self.steps_index.values():
+            for required_step in self.requirement_stacks[step]:
+                ordered_steps.setdefault(required_step)
+            ordered_steps.setdefault(step)
+        return list(ordered_steps)
+
+    def __getattr__(self, name: str) -> "BasePipe":
+        if name in self.pipes:
+            return self.pipes[name]
+        raise AttributeError(f"'Pipeline' object has no attribute '{name}'")
+
+    def get_requirement_stack(
+        self, instance: "BaseStep", names: bool = False, max_recursion: int = 100
+    ) -> List["BaseStep"]:
+        """Returns a list containing the ordered Steps that the "instance" Step object requires for being ran.
+        The requirement stacks are compiled once when the pipeline gets resolved, so this is a simple lookup.
+
+        Args:
+            instance (BaseStep): The step to get the requirement stack for.
+            names (bool, optional): If True, returns the relative names of the steps instead of the steps.
+                Defaults to False.
+            max_recursion (int, optional): Maximum depth of the requirement tree,
+                used if the stack of instance has not been compiled yet. Defaults to 100.
+
+        Raises:
+            RecursionError: If a requirement refers to a step that exists in it's parents hierarchy.
+            ValueError: If the requirement tree is deeper than max_recursion.
+
+        Returns:
+            list: The ordered steps required by instance. Lowest requirements come first.
+        """
+
+        self.resolve()  # ensure requires lists are containing instances and the requirement stacks are compiled
+        required_steps = self.requirement_stacks.get(instance)
+        if required_steps is None:
+            # instance is not a step registered in this pipeline
+            required_steps = self.compile_requirement_stack(instance, max_recursion=max_recursion)
+
         if names:
-            required_steps = [req.relative_name for req in required_steps]
-        return required_steps
+            return [req.relative_name for req in required_steps]
+        return list(required_steps)
 
     @property
     def graph(self) -> "PipelineGraph":
@@ -149,6 +149,8 @@ class BasePipe(BasePipeType, metaclass=ABCMeta):
             instanciated_step = deepcopy(instanciated_step)
             instanciated_step.pipeline = self.pipeline
             instanciated_step.pipe = self.pipe
+            # the copied wrappers are closures over the original step
+            instanciated_step.clear_wrapped_functions()
             # TODO : eventually scan requirements strings / objects to rebind
             # TODO : them to the local pipeline correspunding objects
 
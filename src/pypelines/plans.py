@@ -0,0 +1,365 @@
+from concurrent.futures import wait
+from contextvars import Context
+from dataclasses import dataclass
+from logging import getLogger
+
+import pandas as pd
+
+from typing import Any, Dict, Hashable, List, Literal, Tuple, TYPE_CHECKING
+
+from .executors import ExecutorType, get_executor
+from .contexts import run_context
+from .pipelines import PIPELINES_STORE
+
+if TYPE_CHECKING:
+    from .steps import BaseStep
+    from .disk import BaseDiskObject
+
+Decision = Literal["refresh", "missing", "too_low", "deprecated", "skip", "load"]
+Action = Literal["compute", "load", "skip"]
+
+
+def get_disk_decision(disk_object: "BaseDiskObject", refresh: bool = False, skip: bool = False) -> Decision:
+    """Return what the generation of a step decides to do, based on the state of it's disk object.
+
+    This is the decision logic of the generation mechanism of the steps, shared with the generation plans.
+
+    Args:
+        disk_object (BaseDiskObject): The disk object of the step, for a session and extra.
+        refresh (bool, optional): The refresh argument of the generation. Defaults to False.
+        skip (bool, optional): The skip argument of the generation. Defaults to False.
+
+    Returns:
+        str: "refresh" if the disk is ignored, "missing" if nothing can be loaded, "too_low" or "deprecated"
+            if the output found requires the requirements to be checked and the step to be computed again,
+            "skip" if the output found is up to date and loading is skipped, or "load" if it is to be loaded.
+    """
+    if refresh:
+        return "refresh"
+    if not disk_object.is_loadable():
+        return "missing"
+    if disk_object.step_level_too_low():
+        return "too_low"
+    if disk_object.version_deprecated():
+        return "deprecated"
+    if skip:
+        return "skip"
+    return "load"
+
+
+def get_requirement_generation_arguments(
+    step: "BaseStep", requirement: "BaseStep", extra: str, refresh_requirements: bool | str | List[str]
+) -> dict:
+    """Return the generation arguments used for a requirement of a step, when the requirements are checked.
+
+    Args:
+        step (BaseStep): The step checking it's requirements.
+        requirement (BaseStep): The requirement.
+        extra (str): The extra the step is generated for. Requirements of the same pipe use it,
+            the ones of other pipes use the default extra of their pipe.
+        refresh_requirements (bool | str | list): The refresh_requirements argument of the generation of the step.
+
+    Returns:
+        dict: The keyword arguments for the generation of the requirement.
+    """
+    if step.pipe.pipe_name == requirement.pipe.pipe_name:
+        _extra = extra
+    else:
+        _extra = requirement.pipe.default_extra
+
+    # by default, we don't refresh the step
+    # however, if refresh_requirements was set to True,
+    # or a list of string that contains a reference to the pipe or pipe.step (relative_name)
+    # that matches the current dependancy step, then we refresh it
+    if refresh_requirements is True:
+        _refresh = True
+    else:
+        if isinstance(refresh_requirements, bool):
+            refresh_requirements = []
+        elif not isinstance(refresh_requirements, list):
+            refresh_requirements = [refresh_requirements]
+        _refresh = requirement.pipe_name in refresh_requirements or requirement.relative_name in refresh_requirements
+
+    # if the step is not refreshed, we skip it so that check_requirements doesn't trigger if
+    # it is found and we don't load the data (process goes faster this way)
+    _skip = not _refresh
+
+    return dict(check_requirements=False, refresh=_refresh, extra=_extra, skip=_skip, in_requirement=True)
+
+
+class PlannedDiskObject:
+    """The state of the disk for a step, session and extra, once some steps of it's pipe have been computed
+    in a generation plan : the output of the last computed step is loadable, and at the current version."""
+
+    def __init__(self, step: "BaseStep", computed_step: "BaseStep"):
+        self.step = step
+        self.computed_step = computed_step
+
+    def is_loadable(self) -> bool:
+        return True
+
+    def version_deprecated(self) -> bool:
+        return False
+
+    def step_level_too_low(self) -> bool:
+        return self.computed_step.get_level(selfish=True) < self.step.get_level(selfish=True)
+
+
+@dataclass
+class PlanEntry:
+    """A step, for a session and extra, and what a generation would do with it."""
+
+    session: pd.Series
+    step: "BaseStep"
+    extra: str
+    action: Action
+    decision: Decision
+    requested: bool
+
+
+def get_session_key(session) -> str:
+    return str(getattr(session, "path", None) or session.name)
+
+
+def run_planned_steps(pipeline_name: str, session, steps: List[Tuple[str, str]]) -> None:
+    """Compute some steps for a session, one after another, ignoring the state of the disk.
+    This is the function submitted to the executors by the generation plans.
+
+    Args:
+        pipeline_name (str): The name of the pipeline the steps belong to.
+        session: The session to compute the steps for.
+        steps (list): The relative names and extras of the steps to compute, requirements first.
+    """
+    pipeline = PIPELINES_STORE[pipeline_name]
+    pipeline.resolve()
+
+    def run():
+        # the steps of the session share a run context, so that they get the outputs of their requirements from it
+        with run_context():
+            for relative_name, extra in steps:
+                pipeline.resolve_instance(relative_name).generate(
+                    session, extra=extra, refresh=True, check_requirements=False
+                )
+
+    Context().run(run)
+
+
+class GenerationPlan:
+    """The steps, sessions and extras that a generation would compute, load or skip, without running any worker.
+
+    Plans are made with the plan method of the steps. Disk objects are created once per step, session and extra,
+    and the outputs that the plan computes are taken into account by the steps checked after them.
+    The steps to compute can then be ran with the execute method. It recomputes them whatever is on disk, without
+    going through their requirement trees again, but their disk objects still check the disk, to know the files
+    that the new outputs replace.
+    """
+
+    def __init__(self, step: "BaseStep"):
+        self.step = step
+        self.entries: Dict[Tuple[str, str, str], PlanEntry] = {}
+
+        self.disk_objects: Dict[Tuple[str, str, str], "BaseDiskObject"] = {}
+        self.computed: Dict[Tuple[str, Hashable, str], "BaseStep"] = {}
+
+    def get_disk_object(self, step: "BaseStep", session, extra: str) -> "BaseDiskObject | PlannedDiskObject":
+        """Return the disk object of a step, for a session and extra, as it would be when it's generation is reached.
+
+        Args:
+            step (BaseStep): The step.
+            session: The session.
+            extra (str): The extra.
+
+        Returns:
+            BaseDiskObject | PlannedDiskObject: The disk object, or it's planned state
+                if a step of the same pipe is computed by the plan before.
+        """
+        computed_step = self.computed.get((step.pipe_name, get_session_key(session), extra))
+        if computed_step is not None:
+            return PlannedDiskObject(step, computed_step)
+
+        key = (step.relative_name, get_session_key(session), extra)
+        disk_object = self.disk_objects.get(key)
+        if disk_object is None:
+            disk_object = self.disk_objects[key] = step.get_disk_object(session, extra)
+        return disk_object
+
+    def add_entry(
+        self, step: "BaseStep", session, extra: str, action: Action, decision: Decision, requested: bool
+    ) -> None:
+        key = (step.relative_name, get_session_key(session), extra)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry.action == "compute" or action != "compute":
+                return
+            # computed entries are kept in the order they are computed in
+            self.entries.pop(key)
+        self.entries[key] = PlanEntry(session, step, extra, action, decision, requested)
+
+        if action == "compute":
+            self.computed[(step.pipe_name, get_session_key(session), extra)] = step
+
+    def add_generation(
+        self,
+        step: "BaseStep",
+        session,
+        extra: str,
+        skip: bool = False,
+        refresh: bool = False,
+        refresh_requirements: bool | str | List[str] = False,
+        check_requirements: bool = False,
+        in_requirement: bool = False,
+    ) -> None:
+        """Add what the generation of a step, for a session, would do to the plan, following the same decisions
+        as the generation mechanism of the steps. Arguments are the ones of the generation."""
+        if refresh and skip:
+            raise ValueError("refresh and skip cannot be set to True simultaneouly.")
+
+        if refresh_requirements:
+            check_requirements = True
+
+        decision = get_disk_decision(self.get_disk_object(step, session, extra), refresh=refresh, skip=skip)
+
+        skip_after_tree = False
+        if decision in ("too_low", "deprecated"):
+            check_requirements = True
+        elif decision == "skip":
+            if not check_requirements:
+                self.add_entry(step, session, extra, "skip", decision, not in_requirement)
+                return
+            skip_after_tree = True
+        elif decision == "load":
+            self.add_entry(step, session, extra, "load", decision, not in_requirement)
+            return
+
+        if check_requirements:
+            for requirement in step.requirement_stack():
+                self.add_generation(
+                    requirement,
+                    session,
+                    **get_requirement_generation_arguments(step, requirement, extra, refresh_requirements),
+                )
+
+        if skip_after_tree:
+            self.add_entry(step, session, extra, "skip", decision, not in_requirement)
+            return
+
+        self.add_entry(step, session, extra, "compute", decision, not in_requirement)
+
+    def get_entries(self, action: Action | None = None) -> List[PlanEntry]:
+        """Return the entries of the plan, in the order a generation would reach them, optionally only the ones
+        with a given action."""
+        return [entry for entry in self.entries.values() if action is None or entry.action == action]
+
+    def get_waves(self) -> List[List[PlanEntry]]:
+        """Group the entries to compute in waves, so that the entries of a wave only depend on entries of the
+        previous waves, and can be ran at the same time. Like in run_requirement_graph, an entry depends on the
+        entries computing it's requirements for the same session, and on the entry computed before it for the same
+        pipe, session and extra (as they share their disk objects).
+
+        Returns:
+            list: The waves, each being a list of entries, in the order they must be ran in.
+        """
+        levels: Dict[Tuple[str, str, str], int] = {}
+        last_of_pipe: Dict[Tuple[str, str, str], int] = {}
+        waves: List[List[PlanEntry]] = []
+
+        for (relative_name, session_key, extra), entry in self.entries.items():
+            if entry.action != "compute":
+                continue
+            requirements = {requirement.relative_name for requirement in entry.step.requires}
+            level = max(
+                [
+                    requirement_level + 1
+                    for (name, key, _), requirement_level in levels.items()
+                    if key == session_key and name in requirements
+                ]
+                + [last_of_pipe.get((entry.step.pipe_name, session_key, extra), -1) + 1]
+            )
+            levels[(relative_name, session_key, extra)] = level
+            last_of_pipe[(entry.step.pipe_name, session_key, extra)] = level
+
+            if level == len(waves):
+                waves.append([])
+            waves[level].append(entry)
+        return waves
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Return the entries of the plan as a DataFrame, with one row per step, session and extra.
+
+        Returns:
+            pd.DataFrame: The entries, with the columns session (index of the session), step (relative name),
+                extra, action, decision and requested (True for the steps asked, False for their requirements).
+        """
+        return pd.DataFrame(
+            [
+                {
+                    "session": entry.session.name,
+                    "step": entry.step.relative_name,
+                    "extra": entry.extra,
+                    "action": entry.action,
+                    "decision": entry.decision,
+                    "requested": entry.requested,
+                }
+                for entry in self.entries.values()
+            ],
+            columns=["session", "step", "extra", "action", "decision", "requested"],
+        )
+
+    def summary(self) -> pd.DataFrame:
+        """Return the number of entries of each step for each action, to size the jobs running the plan.
+
+        Returns:
+            pd.DataFrame: The counts, with one row per step and the columns compute, load and skip.
+        """
+        table = self.to_dataframe()
+        return (
+            pd.crosstab(table["step"], table["action"])
+            .reindex(columns=["compute", "load", "skip"], fill_value=0)
+            .reindex(list(dict.fromkeys(table["step"])))
+        )
+
+    def execute(self, executor: ExecutorType = "threads", max_workers: int | None = None) -> None:
+        """Compute the steps of the plan, with refresh=True and check_requirements=False, so that they are computed
+        whatever their disk objects find, and their requirements are not checked again.
+        Sessions are ran at the same time in the executor, and the steps of a session one after another.
+        Outputs to load or skip are left untouched.
+
+        Args:
+            executor (str | Executor, optional): Either "threads", "processes",
+                or an already instanciated Executor. Defaults to "threads".
+            max_workers (int, optional): Maximum number of workers of the created executor. Defaults to None.
+
+        Raises:
+            Exception: The first exception raised by a session. The other sessions are still ran.
+        """
+        logger = getLogger("plan.execute")
+
+        sessions: Dict[str, Tuple[Any, List[Tuple[str, str]]]] = {}
+        for entry in self.get_entries("compute"):
+            session_key = get_session_key(entry.session)
+            sessions.setdefault(session_key, (entry.session, []))[1].append((entry.step.relative_name, entry.extra))
+
+        pool, owned = get_executor(executor, max_workers)
+        try:
+            futures = [
+                pool.submit(run_planned_steps, self.step.pipeline_name, session, steps)
+                for session, steps in sessions.values()
+            ]
+            wait(futures)
+        finally:
+            if owned:
+                pool.shutdown(wait=True)
+
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            logger.error(f"{len(errors)} of the {len(futures)} sessions of the plan failed")
+            raise errors[0]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        counts = {action: len(self.get_entries(action)) for action in ("compute", "load", "skip")}
+        return f"<GenerationPlan of {self.step.relative_name} : " + ", ".join(
+            f"{count} to {action}" for action, count in counts.items()
+        ) + ">"
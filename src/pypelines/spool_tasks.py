@@ -0,0 +1,437 @@
+from .tasks import BaseStepTaskManager, BaseTaskBackend
+from .pipelines import Pipeline
+from .local_tasks import LocalTaskRecord, run_local_task
+from .disk import atomic_write
+
+from datetime import datetime
+from logging import getLogger
+from pathlib import Path
+from platform import node
+from threading import Event, Thread
+from uuid import uuid4
+import json, os, time
+
+import pandas as pd
+
+from typing import Dict, List, Literal, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .steps import BaseStep
+
+JobState = Literal["queue", "leases", "done", "failed"]
+JOB_STATES: List[JobState] = ["queue", "leases", "done", "failed"]
+JOB_EXTENSION = ".job"
+
+# statuses of the tasks, as set by run_local_task, for wich the job is moved to the failed folder
+FAILED_STATUSES = ("Failed", "Uncatched_Fail", "Lost")
+
+
+class Spool:
+    """A job queue made of files, in a directory that all the nodes running the jobs can access.
+
+    Jobs are JSON files, written atomically in the queue folder. A worker claims a job by renaming it's file to the
+    leases folder, wich only one worker can succeed to do, and updates the modification time of the lease file
+    while it runs the job (heartbeats). The record of the job with it's status is then written in the results
+    folder, and the job file moved to the done or failed folder.
+    Leases not updated for lease_timeout seconds are considered lost (the worker died), and put back in the queue,
+    up to max_attempts times.
+    """
+
+    def __init__(self, path: str | os.PathLike, lease_timeout: float = 120, max_attempts: int = 3):
+        """Initialize the spool, creating it's folders if they don't exist.
+
+        Args:
+            path (str | os.PathLike): The spool directory.
+            lease_timeout (float, optional): Number of seconds without heartbeat after wich a lease is lost.
+                Defaults to 120.
+            max_attempts (int, optional): Number of times a job is claimed before it is considered failed,
+                if it's leases keep being lost. Defaults to 3.
+        """
+        self.path = Path(path)
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        for state in JOB_STATES + ["results"]:
+            (self.path / state).mkdir(parents=True, exist_ok=True)
+
+    def get_job_path(self, job_name: str, state: JobState) -> Path:
+        return self.path / state / job_name
+
+    def get_result_path(self, job_id: str) -> Path:
+        return self.path / "results" / f"{job_id}.json"
+
+    def list_jobs(self, state: JobState) -> List[str]:
+        """Return the names of the job files in a state folder, oldest submitted first.
+        Files being written (hidden temporary files) are ignored."""
+        return sorted(
+            name
+            for name in os.listdir(self.path / state)
+            if name.endswith(JOB_EXTENSION) and not name.startswith(".")
+        )
+
+    def enqueue(self, job: dict) -> str:
+        """Write a job in the queue.
+
+        Args:
+            job (dict): The job record. Must contain an "id" key.
+
+        Returns:
+            str: The name of the job file.
+        """
+        # the time of submission in the name keeps the jobs in the order they were submitted
+        job_name = f"{time.time_ns():020d}.{job['id']}{JOB_EXTENSION}"
+        self.write_job(self.get_job_path(job_name, "queue"), job)
+        return job_name
+
+    @staticmethod
+    def read_job(path: Path) -> dict:
+        with open(path, "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def write_job(path: Path, job: dict) -> None:
+        with atomic_write(str(path), mode="w") as f:
+            json.dump(job, f, default=str)
+
+    def claim(self, job_name: str) -> Path | None:
+        """Try to claim a job of the queue.
+
+        Args:
+            job_name (str): The name of the job file.
+
+        Returns:
+            Path | None: The path of the lease file if the job was claimed, None if another worker claimed it first.
+        """
+        queue_path = self.get_job_path(job_name, "queue")
+        lease_path = self.get_job_path(job_name, "leases")
+        try:
+            # the lease modification time is the last heartbeat, and the rename keeps the one of the job file.
+            # It is touched before the rename, so that the lease is never seen as lost by requeue_lost_leases
+            # if the job waited in the queue for longer than lease_timeout
+            os.utime(queue_path)
+            os.rename(queue_path, lease_path)
+        except FileNotFoundError:
+            return None
+        return lease_path
+
+    def finish(self, lease_path: Path, record: dict, job_name: str | None = None) -> Path | None:
+        """Write the result of a job, and move it's lease to the done or failed folder according to it's status.
+
+        If the lease was lost while the job ran (taken back by requeue_lost_leases), the job stays where
+        requeue_lost_leases put it, and the result written is kept until a new run of the job replaces it.
+
+        Args:
+            lease_path (Path): The path of the lease file of the job.
+            record (dict): The record of the job, with it's final status.
+            job_name (str, optional): The name of the job file. Defaults to None (the name of the lease file).
+
+        Returns:
+            Path | None: The new path of the job file, or None if the lease was lost.
+        """
+        job_name = job_name if job_name is not None else lease_path.name
+        self.write_job(self.get_result_path(record["id"]), record)
+        state = "failed" if record.get("status") in FAILED_STATUSES else "done"
+        job_path = self.get_job_path(job_name, state)
+        try:
+            os.replace(lease_path, job_path)
+        except FileNotFoundError:
+            getLogger("spool").warning(
+                f"The lease of the job {job_name} was lost while it ran. It's result is written, "
+                f"but the job was taken back, and will not be moved to the {state} folder"
+            )
+            return None
+        return job_path
+
+    def requeue_lost_leases(self) -> List[str]:
+        """Put the jobs whose leases were lost back in the queue, or in the failed folder if they were claimed
+        max_attempts times already.
+
+        Returns:
+            list: The names of the jobs whose leases were lost.
+        """
+        lost = []
+        now = time.time()
+        for job_name in self.list_jobs("leases"):
+            lease_path = self.get_job_path(job_name, "leases")
+            try:
+                if now - lease_path.stat().st_mtime < self.lease_timeout:
+                    continue
+                job = self.read_job(lease_path)
+            except FileNotFoundError:
+                continue
+
+            # the lease is taken back with a rename too, so that only one worker handles it
+            stale_path = lease_path.with_name(f".{job_name}.{uuid4().hex}.lost")
+            try:
+                os.rename(lease_path, stale_path)
+            except FileNotFoundError:
+                continue
+
+            lost.append(job_name)
+            if job.get("attempts", 0) >= self.max_attempts:
+                job.update(status="Lost", log=f"The lease of the job was lost {job.get('attempts', 0)} times")
+                self.finish(stale_path, job, job_name)
+                getLogger("spool").error(f"The job {job_name} was lost too many times, and is considered failed")
+            else:
+                os.replace(stale_path, self.get_job_path(job_name, "queue"))
+                getLogger("spool").warning(f"The lease of the job {job_name} was lost. Putting it back in the queue")
+        return lost
+
+
+def session_to_dict(session: pd.Series) -> dict:
+    return {"name": session.name, "data": json.loads(session.to_json(default_handler=str))}
+
+
+def session_from_dict(session_dict: dict) -> pd.Series:
+    return pd.Series(session_dict["data"], name=session_dict["name"])
+
+
+class SpoolWorker:
+    """Runs the jobs of a spool, in the current process. The pipelines of the jobs must be created in the process
+    (imported) before running the worker. Several workers, on any node that can access the spool, can run at the
+    same time."""
+
+    def __init__(
+        self,
+        spool: "Spool | str | os.PathLike",
+        heartbeat_interval: float = 10,
+        poll_interval: float = 1,
+        name: str | None = None,
+    ):
+        """Initialize the worker.
+
+        Args:
+            spool (Spool | str | os.PathLike): The spool, or it's directory.
+            heartbeat_interval (float, optional): Number of seconds between heartbeats of the lease of the job
+                running. Must be well below the lease timeout of the spool. Defaults to 10.
+            poll_interval (float, optional): Number of seconds to wait before looking at the queue again when it is
+                empty. Defaults to 1.
+            name (str, optional): The name of the worker, saved in the records of it's jobs.
+                Defaults to None (node name and process id).
+        """
+        self.spool = spool if isinstance(spool, Spool) else Spool(spool)
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.name = name if name is not None else f"{node() or 'unknown'}:{os.getpid()}"
+        self.stop_event = Event()
+
+    def claim_next(self) -> Path | None:
+        """Claim the oldest job of the queue that no other worker claimed.
+
+        Returns:
+            Path | None: The path of the lease of the claimed job, or None if the queue is empty.
+        """
+        for job_name in self.spool.list_jobs("queue"):
+            lease_path = self.spool.claim(job_name)
+            if lease_path is not None:
+                return lease_path
+        return None
+
+    def heartbeat(self, lease_path: Path, stop: Event) -> None:
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                os.utime(lease_path)
+            except FileNotFoundError:
+                return
+
+    def run_job(self, lease_path: Path) -> dict:
+        """Run a claimed job, and post it's result.
+
+        Args:
+            lease_path (Path): The path of the lease of the job.
+
+        Returns:
+            dict: The record of the job, with it's final status.
+        """
+        job = self.spool.read_job(lease_path)
+        job["attempts"] = job.get("attempts", 0) + 1
+        job["worker"] = self.name
+        self.spool.write_job(lease_path, job)
+
+        stop = Event()
+        heartbeat = Thread(target=self.heartbeat, args=(lease_path, stop), daemon=True)
+        heartbeat.start()
+        try:
+            record = run_local_task(job, session_from_dict(job["session_data"]))
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        self.spool.finish(lease_path, record)
+        return record
+
+    def run(self, max_jobs: int | None = None, stop_when_empty: bool = False) -> int:
+        """Run the jobs of the spool, until stopped.
+
+        Args:
+            max_jobs (int, optional): Number of jobs after wich the worker stops. Defaults to None (no limit).
+            stop_when_empty (bool, optional): Whether to stop once the queue is empty. Defaults to False.
+
+        Returns:
+            int: The number of jobs ran.
+        """
+        logger = getLogger("spool.worker")
+        jobs_ran = 0
+        while not self.stop_event.is_set() and (max_jobs is None or jobs_ran < max_jobs):
+            self.spool.requeue_lost_leases()
+            lease_path = self.claim_next()
+            if lease_path is None:
+                if stop_when_empty:
+                    break
+                self.stop_event.wait(self.poll_interval)
+                continue
+            logger.info(f"Worker {self.name} running the job {lease_path.name}")
+            self.run_job(lease_path)
+            jobs_ran += 1
+        return jobs_ran
+
+    def stop(self) -> None:
+        """Stop the worker once the job running is done."""
+        self.stop_event.set()
+
+
+class SpoolTaskManager(BaseStepTaskManager):
+
+    backend: "SpoolTaskBackend"
+    step: "BaseStep"
+
+    def start(self, session, extra=None, **kwargs) -> "SpoolTaskRecord":
+        """Enqueues a task generating the step for a session, in the spool of the backend.
+
+        Args:
+            session: The session to use for the task.
+            extra: Extra information to pass to the task (default is None).
+            **kwargs: Arguments of the generation. They must be JSON serializable.
+
+        Raises:
+            NotImplementedError: If the pipeline does not have a spool directory.
+
+        Returns:
+            SpoolTaskRecord: The record of the task.
+        """
+        if not self.backend:
+            raise NotImplementedError(
+                "Cannot start a task in a spool as this pipeline doesn't have a spool directory set"
+            )
+        return SpoolTaskRecord.create(self, session, extra, **kwargs)
+
+
+class SpoolTaskRecord(LocalTaskRecord):
+    """The record of a task enqueued in a spool. It's content is updated from the spool with the refresh method,
+    and it's status is "Waiting" while queued, "Started" while a worker runs it, and then the one given by the worker
+    ("Complete", "Warnings", "Errors", "Failed", "Uncatched_Fail" or "Lost")."""
+
+    spool: Spool
+    job_name: str
+
+    def __init__(self, task_infos_dict: dict, spool: Spool, job_name: str, session=None):
+        super().__init__(task_infos_dict, session=session)
+        self.spool = spool
+        self.job_name = job_name
+
+    @property
+    def state(self) -> JobState | None:
+        """Return the folder of the spool the job is in, or None if it is being moved."""
+        for state in JOB_STATES:
+            if self.spool.get_job_path(self.job_name, state).exists():
+                return state
+        return None
+
+    def refresh(self) -> "SpoolTaskRecord":
+        """Update the record from the spool, and return it."""
+        state = self.state
+        if state in ("done", "failed"):
+            self.update(self.spool.read_job(self.spool.get_result_path(self.task_id)))
+        elif state == "leases":
+            self["status"] = "Started"
+        return self
+
+    def done(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def wait(self, timeout: float | None = None, poll_interval: float = 0.2) -> "SpoolTaskRecord":
+        """Wait for the task to be ran by a worker, and return the updated record.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait. Defaults to None (no limit).
+            poll_interval (float, optional): Number of seconds between two checks of the spool. Defaults to 0.2.
+
+        Raises:
+            TimeoutError: If the task is not done after timeout seconds.
+
+        Returns:
+            SpoolTaskRecord: The record.
+        """
+        start = time.monotonic()
+        while not self.done():
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise TimeoutError(f"The task {self.task_id} ({self['name']}) was not done after {timeout} seconds")
+            time.sleep(poll_interval)
+        return self.refresh()
+
+    @staticmethod
+    def create(task_manager: SpoolTaskManager, session, extra=None, **kwargs) -> "SpoolTaskRecord":
+        """Creates a new task record for a step and session, and enqueues it in the spool of the backend.
+
+        Args:
+            task_manager (SpoolTaskManager): The task manager of the step.
+            session: The session to associate with the task.
+            extra (optional): Extra information to pass to the task. Defaults to None.
+            **kwargs: Arguments of the generation.
+
+        Returns:
+            SpoolTaskRecord: The record of the enqueued task.
+        """
+        job = {
+            "id": uuid4().hex,
+            "name": task_manager.step.complete_name,
+            "session": session["path"],
+            "session_data": session_to_dict(session),
+            "status": "Waiting",
+            "log": None,
+            "arguments": kwargs,
+            "extra": extra,
+            "submitted": datetime.now().isoformat(),
+        }
+        spool = task_manager.backend.spool
+        job_name = spool.enqueue(job)
+        record = SpoolTaskRecord(job, spool, job_name, session=session)
+        task_manager.backend.tasks[record.task_id] = record
+        return record
+
+
+class SpoolTaskBackend(BaseTaskBackend):
+    """A task backend enqueuing the tasks as files in a spool directory, ran by SpoolWorker processes on any node
+    that can access it, without broker nor database."""
+
+    spool: Spool
+    task_manager_class = SpoolTaskManager
+
+    def __init__(self, parent: Pipeline, spool_dir: "str | os.PathLike | None" = None, **spool_kwargs):
+        """Initialize the backend.
+
+        Args:
+            parent (Pipeline): The parent Pipeline object.
+            spool_dir (str | os.PathLike, optional): The spool directory, or None if the pipeline cannot start
+                tasks. Defaults to None.
+            **spool_kwargs: Arguments of the Spool (lease_timeout, max_attempts).
+        """
+        super().__init__(parent)
+        self.tasks: Dict[str, SpoolTaskRecord] = {}
+
+        if spool_dir is not None:
+            self.success = True
+            self.spool = Spool(spool_dir, **spool_kwargs)
+
+    def get_tasks(self, status: str | None = None) -> List[SpoolTaskRecord]:
+        """Return the records of the tasks started from this pipeline, refreshed from the spool,
+        optionally only the ones with a given status."""
+        tasks = [task.refresh() for task in list(self.tasks.values())]
+        return [task for task in tasks if status is None or task.status == status]
+
+    def create_worker(self, **kwargs) -> SpoolWorker:
+        """Return a worker running the jobs of the spool of the pipeline. Arguments are the ones of SpoolWorker."""
+        return SpoolWorker(self.spool, **kwargs)
+
+
+class SpoolPipeline(Pipeline):
+    runner_backend_class = SpoolTaskBackend
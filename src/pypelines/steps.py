@@ -2,13 +2,16 @@ from functools import wraps, partial, update_wrapper, cache
 from .loggs import loggedmethod, NAMELENGTH, getLogger, PypelineLogger
 from .arguments import autoload_arguments
 from .utils import to_snake_case
+from .executors import run_requirement_graph, submit_step_generate
+from .contexts import run_context, get_run_context
+from .plans import GenerationPlan, get_disk_decision, get_requirement_generation_arguments
+from .locks import OutputLock
 
-import logging, inspect
+import logging, inspect, hashlib, json, pickle, time
 from pandas import DataFrame
-from dataclasses import dataclass
 
 from types import MethodType
-from typing import Callable, Type, Iterable, Protocol, List, TYPE_CHECKING, Any, Optional
+from typing import Callable, Type, Iterable, Protocol, List, TYPE_CHECKING, Any, Optional, Dict
 
 if TYPE_CHECKING:
     from .pipelines import Pipeline
@@ -72,6 +75,93 @@ def stepmethod(requires=None, version=None, do_dispatch=None, on_save_callbacks=
     return registrate
 
 
+def get_arguments_hash(args: tuple, kwargs: dict) -> "str | None":
+    """Return a short hash of the arguments a worker was called with (other than the session),
+    to identify the outputs generated with the same arguments.
+
+    Arguments that json cannot serialize (objects, dictionnaries with keys that are not strings...) are hashed
+    from their pickle instead. This never raises, as it is computed once the worker ran : arguments that cannot be
+    pickled either get no hash.
+
+    Args:
+        args (tuple): The positional arguments.
+        kwargs (dict): The keyword arguments.
+
+    Returns:
+        str | None: A 16-character hexadecimal hash, or None if the arguments could not be serialized (unknown hash).
+    """
+    try:
+        serialized = json.dumps({"args": list(args), "kwargs": kwargs}, sort_keys=True).encode()
+    except Exception:
+        try:
+            serialized = pickle.dumps((list(args), sorted(kwargs.items())), protocol=4)
+        except Exception:
+            return None
+    return hashlib.sha256(serialized).hexdigest()[:16]
+
+
+class WorkerSpec:
+    """The informations about the signature of a step worker that are needed when generating, loading or saving.
+    They are gathered once when the step is created, to avoid inspecting the worker signature on each call."""
+
+    __slots__ = ("signature", "default_extra", "extra_error", "accepts_refresh", "accepted_kwargs", "has_var_kwargs")
+
+    def __init__(self, worker: Callable, relative_name: str = ""):
+        """Initialize the WorkerSpec by inspecting the signature of the worker.
+
+        Args:
+            worker (Callable): The worker method of the step.
+            relative_name (str, optional): The relative name of the step, used in error messages. Defaults to "".
+
+        Attributes:
+            signature (inspect.Signature): The signature of the worker.
+            default_extra (Any): The default value of the extra parameter of the worker.
+            extra_error (str | None): If the worker has no extra parameter, or no default value for it,
+                the message of the error to raise when the default extra is requested. None otherwise.
+            accepts_refresh (bool): True if the worker has a refresh parameter.
+            accepted_kwargs (frozenset): The names of the parameters that can be given by keyword to the worker.
+            has_var_kwargs (bool): True if the worker accepts any keyword argument (with **kwargs).
+        """
+        self.signature = inspect.signature(worker)
+        parameters = self.signature.parameters
+
+        self.default_extra = None
+        self.extra_error = None
+        extra = parameters.get("extra")
+        if extra is None:
+            self.extra_error = f"Parameter extra not found in function {relative_name}"
+        elif extra.default is extra.empty:
+            self.extra_error = "Parameter extra does not have a default value"
+        else:
+            self.default_extra = extra.default
+
+        self.accepts_refresh = "refresh" in parameters
+        self.accepted_kwargs = frozenset(
+            name
+            for name, parameter in parameters.items()
+            if parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY)
+        )
+        self.has_var_kwargs = any(parameter.kind == parameter.VAR_KEYWORD for parameter in parameters.values())
+
+    def get_default_extra(self):
+        """Return the default value of the extra parameter of the worker.
+
+        Raises:
+            ValueError: If the worker has no extra parameter, or no default value for it.
+        """
+        if self.extra_error is not None:
+            raise ValueError(self.extra_error)
+        return self.default_extra
+
+    def accepts_kwarg(self, name: str) -> bool:
+        """Return True if the worker can be called with a keyword argument named name."""
+        return self.has_var_kwargs or name in self.accepted_kwargs
+
+    def __deepcopy__(self, memo):
+        # the spec is never modified once created, so copies of a step can share it
+        return self
+
+
 class BaseStep:
 
     step_name: str
@@ -83,6 +173,9 @@ class BaseStep:
 
     disk_class: "Type[BaseDiskObject]"
 
+    level: int
+    selfish_level: int
+
     task: "BaseStepTaskManager"
     worker: Callable
     pipe: "BasePipe"
@@ -118,6 +211,9 @@ class BaseStep:
         # save an instanciated access to the step function (undecorated)
         self.find_and_bind_worker(worker)
 
+        # the informations about the worker signature, gathered once
+        self.worker_spec = WorkerSpec(self.worker, f"{self.pipe_name}.{self.step_name}")
+
         # we attach the values of the worker elements to the Step
         # as they are get only (no setter) on worker if it is not None (bound method)
         self.do_dispatch = self.get_attribute_or_default("do_dispatch", True)
@@ -139,7 +235,8 @@ class BaseStep:
         self.callbacks = self.get_attribute_or_default("callbacks", [])
         self.callbacks = [self.callbacks] if not isinstance(self.callbacks, list) else self.callbacks
 
-        # self.make_wrapped_functions()
+        # the load, save, generate and run_callbacks wrappers, built once on first access
+        self.wrapped_functions: Dict[str, Callable] = {}
 
         self.multisession = self.pipe.multisession_class(self)
 
@@ -221,7 +318,7 @@ class BaseStep:
     @property
     def load(self):
         """Load data using the get_load_wrapped method."""
-        return self.get_load_wrapped()
+        return self.get_wrapped_function("load", self.get_load_wrapped)
 
     @property
     def save(self):
@@ -230,16 +327,36 @@ class BaseStep:
         Returns:
             The saved state of the object.
         """
-        return self.get_save_wrapped()
+        return self.get_wrapped_function("save", self.get_save_wrapped)
 
     @property
     def generate(self):
         """Return the result of calling the get_generate_wrapped method."""
-        return self.get_generate_wrapped()
+        return self.get_wrapped_function("generate", self.get_generate_wrapped)
 
     @property
     def run_callbacks(self):
-        return self.get_run_callbacks()
+        return self.get_wrapped_function("run_callbacks", self.get_run_callbacks)
+
+    def get_wrapped_function(self, name: str, builder: Callable[[], Callable]) -> Callable:
+        """Return the wrapper function stored under name, building it with builder on first access.
+        Wrappers are kept until clear_wrapped_functions is called, when the pipeline is resolved again.
+
+        Args:
+            name (str): The name of the wrapper (load, save, generate or run_callbacks).
+            builder (Callable): The method building the wrapper.
+
+        Returns:
+            Callable: The wrapper function.
+        """
+        wrapped_function = self.wrapped_functions.get(name)
+        if wrapped_function is None:
+            wrapped_function = self.wrapped_functions[name] = builder()
+        return wrapped_function
+
+    def clear_wrapped_functions(self) -> None:
+        """Forget the built wrapper functions, so that they are built again on next access."""
+        self.wrapped_functions = {}
 
     def get_save_wrapped(self):
         """Returns a wrapped function that saves data using the disk class.
@@ -268,7 +385,7 @@ class BaseStep:
                 The result of saving the data to disk.
             """
             if extra is None:
-                extra = self.get_default_extra()
+                extra = self.worker_spec.get_default_extra()
             self.pipeline.resolve()
             disk_object = self.get_disk_object(session, extra)
             return disk_object.save(data)
@@ -292,13 +409,15 @@ class BaseStep:
         """
 
         @wraps(self.disk_class.load)
-        def wrapper(session, extra=None, strict=False) -> Any:
+        def wrapper(session, extra=None, strict=False, **load_kwargs) -> Any:
             """Wrapper function to load disk object with session and optional extra parameters.
 
             Args:
                 session: The session to use for loading the disk object.
                 extra (optional): Extra parameters to be passed for loading the disk object. Defaults to None.
                 strict (bool, optional): Flag to indicate strict loading. Defaults to False.
+                **load_kwargs: Keyword arguments supported by the load method of the disk class
+                    (for example columns and filters for ParquetDiskObject).
 
             Returns:
                 The loaded disk object.
@@ -308,16 +427,25 @@ class BaseStep:
             """
             # print("extra in load wrapper : ", extra)
             if isinstance(session, DataFrame):
-                return self.multisession.load(sessions=session, extras=extra)
+                return self.multisession.load(sessions=session, extras=extra, **load_kwargs)
 
             if extra is None:
-                extra = self.get_default_extra()
+                extra = self.worker_spec.get_default_extra()
             # print("extra in load wrapper after None : ", extra)
             self.pipeline.resolve()
+
+            # outputs generated during the current generate call are used without reading them from the disk
+            # (partial loads are read from the disk, that can skip the unrequested data)
+            context = get_run_context()
+            if context is not None and not load_kwargs:
+                result = context.get(self, session, extra, default=None)
+                if result is not None:
+                    return result
+
             disk_object = self.get_disk_object(session, extra)
             if not disk_object.is_matching():
                 raise ValueError(disk_object.get_status_message())
-            return disk_object.load()
+            return disk_object.load(**load_kwargs)
 
         if self.do_dispatch:
             return self.pipe.dispatcher(wrapper, "loader")
@@ -325,22 +453,35 @@ class BaseStep:
 
     def get_generate_wrapped(self):
         """Return the wrapped generation mechanism with optional dispatching.
+        If called with a DataFrame of sessions instead of a single session, the generation is
+        handled by the multisession accessor of the step.
 
         Returns:
             The wrapped generation mechanism with optional dispatching.
         """
         if self.do_dispatch:
-            return autoload_arguments(
+            generate = autoload_arguments(
                 self.pipe.dispatcher(loggedmethod(self.generation_mechanism), "generator"),
                 self,
             )
-        return autoload_arguments(loggedmethod(self.generation_mechanism), self)
+        else:
+            generate = autoload_arguments(loggedmethod(self.generation_mechanism), self)
+
+        @wraps(generate)
+        def wrapper(session, *args, **kwargs):
+            if isinstance(session, DataFrame):
+                return self.multisession.generate(session, *args, **kwargs)
+            # the outputs of the requirements generated during this call are kept until it returns
+            with run_context():
+                return generate(session, *args, **kwargs)
+
+        return wrapper
 
     def get_run_callbacks(self):
         def wrapper(session, extra=None, show_plots=True):
 
             if extra is None:
-                extra = self.get_default_extra()
+                extra = self.worker_spec.get_default_extra()
 
             logger = logging.getLogger("callback_runner")
             for callback_data in self.callbacks:
@@ -368,7 +509,7 @@ class BaseStep:
         return wrapper
 
     def get_level(self, selfish=False) -> int:
-        """Get the level of the step.
+        """Get the level of the step. Levels are computed once for all steps when the pipeline gets resolved.
 
         Args:
             selfish (bool): Whether to calculate the level selfishly. Defaults to False.
@@ -377,7 +518,7 @@ class BaseStep:
             int: The level of the step.
         """
         self.pipeline.resolve()
-        return StepLevel(self).resolve_level(selfish=selfish)
+        return self.selfish_level if selfish else self.level
 
     def is_required(self):
         # TODO implement this (False if the step is not present in any other step' requirement stack, else True)
@@ -394,9 +535,57 @@ class BaseStep:
             Disk: A disk object created using the provided session and extra parameters.
         """
         if extra is None:
-            extra = self.get_default_extra()
+            extra = self.worker_spec.get_default_extra()
+        # outputs of the pipe being saved in the background must be on disk before checking it
+        context = get_run_context()
+        if context is not None and context.write_behind:
+            context.wait_for_saves(self, session, extra)
         return self.disk_class(session, self, extra)
 
+    def plan(
+        self,
+        session,
+        extra=None,
+        extras=None,
+        skip=False,
+        refresh=False,
+        refresh_requirements=False,
+        check_requirements=False,
+    ) -> GenerationPlan:
+        """Return what generate would compute, load or skip for this step and it's requirements,
+        without running any worker.
+
+        Args:
+            session: The session, or a DataFrame of sessions, to plan the generation for.
+            extra (optional): The extra of the generation, for all sessions. Defaults to None (default extra).
+            extras (list, optional): The extra of each session, if session is a DataFrame. Defaults to None.
+            skip, refresh, refresh_requirements, check_requirements: The arguments of the generation to plan.
+                See the generate method of the step.
+
+        Returns:
+            GenerationPlan: The plan. It's execute method computes the planned steps.
+        """
+        self.pipeline.resolve()
+        if isinstance(session, DataFrame):
+            sessions = [session for _, session in session.iterrows()]
+            extras = self.multisession.get_extras(session, extras=extras, extra=extra)
+        else:
+            sessions = [session]
+            extras = [extra]
+
+        plan = GenerationPlan(self)
+        for session, extra in zip(sessions, extras):
+            plan.add_generation(
+                self,
+                session,
+                self.worker_spec.get_default_extra() if extra is None else extra,
+                skip=skip,
+                refresh=refresh,
+                refresh_requirements=refresh_requirements,
+                check_requirements=check_requirements,
+            )
+        return plan
+
     @property
     def generation_mechanism(self):
         """Generates a wrapper function for the given worker function with additional functionality such as skipping,
@@ -428,6 +617,9 @@ class BaseStep:
             refresh_requirements=False,
             check_requirements=False,
             save_output=True,
+            executor=None,
+            max_workers=None,
+            write_behind=False,
             **kwargs,
         ):
             """
@@ -452,13 +644,26 @@ class BaseStep:
             save_output=True,
                 if False, we don't save the output to file after calculation. If there is not calculation
                 (file exists and refresh is False), this has no effect. If True, we save the file after calculation.
+            executor=None,
+                if None, the requirements are checked one after another. If "threads" or "processes"
+                (or an instanciated concurrent.futures Executor), the independent requirements are checked
+                at the same time. This has no effect if the requirements are not checked.
+            max_workers=None,
+                maximum number of workers of the executor created if executor is "threads" or "processes".
+            write_behind=False,
+                if True, the outputs of this step and of it's requirements are saved by background threads,
+                while the following steps compute. All saves are done when the call returns.
             """
 
             if extra is None:
-                extra = self.get_default_extra()
+                extra = self.worker_spec.get_default_extra()
 
             self.pipeline.resolve()
 
+            context = get_run_context()
+            if write_behind and context is not None:
+                context.enable_write_behind()
+
             in_requirement = kwargs.pop(
                 "in_requirement", False
             )  # a flag to know if we are in requirement run or toplevel
@@ -487,59 +692,56 @@ class BaseStep:
             # this is a flag to skip after checking the requirement tree if skip is True and data is loadable
             skip_after_tree = False
 
-            if not refresh:
-                if disk_object.is_loadable():
-                    if disk_object.step_level_too_low():
-                        logger.load(
-                            "File(s) have been found but with a step too low in the requirement stack. Reloading the"
-                            " generation tree"
-                        )
-                        check_requirements = True
-
-                    elif disk_object.version_deprecated():
-                        logger.load(
-                            "File(s) have been found but with an old version identifier. Reloading the generation tree"
-                        )
-                        check_requirements = True
-
-                    elif skip:
-                        logger.load(
-                            f"File exists for {self.relative_name}{'.' + extra if extra else ''}."
-                            " Loading and processing will be skipped"
-                        )
-                        if not check_requirements:
-                            return None
-
-                        # if we should skip but check_requirements is True, we just postpone the skip to after
-                        # triggering the requirement tree
-                        # Note that or refresh_requirements != False means it does not trigger skip_after_tree in the
-                        # case refresh_requirements is not False.
-                        # This is to avoid the strange behaviour that with skip false, it wouldn't run requirements,
-                        # and with skip true, it would.
-                        # It would otherwise be counter intuitive given the fact that skip=True seem to imply we tend
-                        # to avoid more steps while setting it to true than to false
-                        skip_after_tree = True
-
-                    # if not step_level_too_low, nor version_deprecated, nor skip, we load the is_loadable disk object
-                    else:
-                        logger.load("Found data. Trying to load it")
-
-                        try:
-                            result = disk_object.load()
-                        except IOError as e:
-                            raise IOError(
-                                f"The DiskObject responsible for loading {self.relative_name}"
-                                " has `is_loadable() == True`"
-                                " but the loading procedure failed. Double check and test your DiskObject check_disk"
-                                " and load implementation. Check the original error above."
-                            ) from e
-
-                        logger.load(f"Loaded {self.relative_name}{'.' + extra if extra else ''} sucessfully.")
-                        return result
-                else:
-                    logger.load(
-                        f"Could not find or load {self.relative_name}{'.' + extra if extra else ''} saved file."
-                    )
+            decision = get_disk_decision(disk_object, refresh=refresh, skip=skip)
+
+            if decision == "too_low":
+                logger.load(
+                    "File(s) have been found but with a step too low in the requirement stack. Reloading the"
+                    " generation tree"
+                )
+                check_requirements = True
+
+            elif decision == "deprecated":
+                logger.load("File(s) have been found but with an old version identifier. Reloading the generation tree")
+                check_requirements = True
+
+            elif decision == "skip":
+                logger.load(
+                    f"File exists for {self.relative_name}{'.' + extra if extra else ''}."
+                    " Loading and processing will be skipped"
+                )
+                if not check_requirements:
+                    return None
+
+                # if we should skip but check_requirements is True, we just postpone the skip to after
+                # triggering the requirement tree
+                # Note that or refresh_requirements != False means it does not trigger skip_after_tree in the
+                # case refresh_requirements is not False.
+                # This is to avoid the strange behaviour that with skip false, it wouldn't run requirements,
+                # and with skip true, it would.
+                # It would otherwise be counter intuitive given the fact that skip=True seem to imply we tend
+                # to avoid more steps while setting it to true than to false
+                skip_after_tree = True
+
+            # if not step_level_too_low, nor version_deprecated, nor skip, we load the is_loadable disk object
+            elif decision == "load":
+                logger.load("Found data. Trying to load it")
+
+                try:
+                    result = disk_object.load()
+                except IOError as e:
+                    raise IOError(
+                        f"The DiskObject responsible for loading {self.relative_name}"
+                        " has `is_loadable() == True`"
+                        " but the loading procedure failed. Double check and test your DiskObject check_disk"
+                        " and load implementation. Check the original error above."
+                    ) from e
+
+                logger.load(f"Loaded {self.relative_name}{'.' + extra if extra else ''} sucessfully.")
+                return result
+
+            elif decision == "missing":
+                logger.load(f"Could not find or load {self.relative_name}{'.' + extra if extra else ''} saved file.")
             else:
                 logger.load("`refresh` was set to True, ignoring the state of disk files and running the function.")
 
@@ -549,50 +751,22 @@ class BaseStep:
                 # forcing generation with refresh true on all the steps along the way.
                 logger.info("Checking the requirements")
 
-                # decide if we will refresh every required step, if refresh_requirements was set to True
-                if refresh_requirements == True:
-                    always_refresh = True
-                else:
-                    always_refresh = False
-
-                # Make sure refresh_requirements is a list so that we can check if steps match elements in it with 'in'
-                if not isinstance(refresh_requirements, list):
-                    if isinstance(refresh_requirements, bool):
-                        refresh_requirements = []
-                    else:
-                        refresh_requirements = [refresh_requirements]
-
-                for step in self.requirement_stack():
-                    if self.pipe.pipe_name == step.pipe.pipe_name:
-                        _extra = extra
-                    else:
-                        _extra = step.pipe.default_extra
-
-                    # by default, we don't refresh the step
-                    # however, if refresh_requirements was set to True,
-                    # or a list of string that contains a reference to the pipe or pipe.step (relative_name)
-                    # that matches the current dependancy step, then we refresh it
-                    _refresh = (
-                        True
-                        if (
-                            always_refresh
-                            or step.pipe_name in refresh_requirements
-                            or step.relative_name in refresh_requirements
-                        )
-                        else False
-                    )
+                def get_requirement_arguments(step: "BaseStep") -> dict:
+                    return get_requirement_generation_arguments(self, step, extra, refresh_requirements)
 
-                    # if the step is not refreshed, we skip it so that check_requirements doesn't trigger if
-                    # it is found and we don't load the data (process goes faster this way)
-                    _skip = not _refresh
-
-                    step.generate(
-                        session,
-                        check_requirements=False,
-                        refresh=_refresh,
-                        extra=_extra,
-                        skip=_skip,
-                        in_requirement=True,
+                if executor is None:
+                    for step in self.requirement_stack():
+                        step.generate(session, **get_requirement_arguments(step))
+                else:
+                    # independent requirements are generated at the same time, as soon as their own
+                    # requirements are available. Results are not needed here, so they are not returned.
+                    run_requirement_graph(
+                        self.requirement_stack(),
+                        lambda pool, step: submit_step_generate(
+                            pool, step, session, return_result=False, **get_requirement_arguments(step)
+                        ),
+                        executor=executor,
+                        max_workers=max_workers,
                     )
 
             if skip_after_tree:
@@ -604,24 +778,54 @@ class BaseStep:
                 logger.header(
                     f"Performing the computation to generate {self.relative_name}{'.' + extra if extra else ''}"
                 )
-            kwargs.update({"extra": extra})
-            if self.is_refresh_in_kwargs():
-                kwargs.update({"refresh": refresh})
-            result = self.pipe.pre_run_wrapper(self.worker(session, *args, **kwargs))
-
-            if save_output:
-                logger.save(f"Saving the generated {self.relative_name}{'.' + extra if extra else ''} output.")
-                disk_object.save(result)
-                self.run_callbacks(session, extra=extra, show_plots=False)
+            # concurrent generations of the same output, from other processes or nodes, wait for this one to be saved
+            lock = OutputLock(disk_object.get_lock_path() if save_output else None)
+            lock.acquire()
+            if lock.enabled:
+                # the output may have been generated by another process since the disk was checked, before the
+                # requirements ran, whether we had to wait for the lock or got it once that process released it
+                disk_object = self.get_disk_object(session, extra)
+                if not refresh and disk_object.is_matching():
+                    lock.release()
+                    logger.load(
+                        f"{self.relative_name}{'.' + extra if extra else ''} was generated by another process"
+                        " since the disk was checked. Using it instead of computing it again"
+                    )
+                    return None if skip else disk_object.load()
+
+            try:
+                kwargs.update({"extra": extra})
+                if self.worker_spec.accepts_refresh:
+                    kwargs.update({"refresh": refresh})
+                start = time.perf_counter()
+                result = self.pipe.pre_run_wrapper(self.worker(session, *args, **kwargs))
+                disk_object.generation_info = {
+                    "compute_duration": time.perf_counter() - start,
+                    "arguments_hash": get_arguments_hash(args, kwargs),
+                }
+
+                if save_output:
+                    logger.save(f"Saving the generated {self.relative_name}{'.' + extra if extra else ''} output.")
+                    # callbacks need the output to be on disk, so steps having some are saved right away
+                    if context is not None and context.write_behind and not self.callbacks:
+                        # the lock is kept until the output is on disk
+                        lock.release_when_done(context.submit_save(self, session, extra, disk_object.save, result))
+                    else:
+                        disk_object.save(result)
+                    if context is not None and self.disk_class.in_run_handoff:
+                        context.store(self, session, extra, result)
+                    self.run_callbacks(session, extra=extra, show_plots=False)
+            finally:
+                lock.release()
 
             return result
 
-        original_signature = inspect.signature(self.worker)
+        original_signature = self.worker_spec.signature
         original_params = list(original_signature.parameters.values())
 
         kwarg_position = len(original_params)
 
-        if any([p.kind == p.VAR_KEYWORD for p in original_params]):
+        if self.worker_spec.has_var_kwargs:
             kwarg_position = kwarg_position - 1
 
         # Create new parameters for the generation arguments and add them to the list,
@@ -633,6 +837,9 @@ class BaseStep:
             "refresh_requirements": False,
             "check_requirements": False,
             "save_output": True,
+            "executor": None,
+            "max_workers": None,
+            "write_behind": False,
         }.items():
             if original_signature.parameters.get(param) is None:
                 new_params.append(inspect.Parameter(param, inspect.Parameter.KEYWORD_ONLY, default=default_value))
@@ -702,6 +909,20 @@ class BaseStep:
                     if tested with real data, and results are already loadable but you don't want to erase it by setting
                     refresh = True.
                     Defaults to True.
+                executor (str, Executor, optional) : If "threads" or "processes", the requirement tree check stage
+                    runs the independent requirements at the same time, using a pool of threads or processes.
+                    A requirement is started as soon as all it's own requirements are available, so the duration of
+                    the stage is close to the one of the longest requirement chain instead of the sum of all steps.
+                    An already instanciated concurrent.futures Executor can also be supplied.
+                    If None, requirements are checked one after another.
+                    Defaults to None.
+                max_workers (int, optional) : The maximum number of threads or processes used if executor is
+                    "threads" or "processes". Defaults to None (the concurrent.futures default).
+                write_behind (bool, optional) : If True, the outputs of the step and of the requirements generated
+                    are saved to disk by background threads, while the following steps compute.
+                    Steps loading an output wait for it's save to be done, and so does the call before returning.
+                    Steps with callbacks are always saved before running them.
+                    Defaults to False.
         """
         for line_no, line in enumerate(lines):
             if not inserted_chapter and ("Raises" in line or "Returns" in line or line_no >= lines_count - 1):
@@ -712,13 +933,7 @@ class BaseStep:
 
     def get_default_extra(self):
         """Get default value of a function's parameter"""
-        sig = inspect.signature(self.worker)
-        param = sig.parameters.get("extra")
-        if param is None:
-            raise ValueError(f"Parameter extra not found in function {self.relative_name}")
-        if param.default is param.empty:
-            raise ValueError("Parameter extra does not have a default value")
-        return param.default
+        return self.worker_spec.get_default_extra()
 
     def is_refresh_in_kwargs(self):
         """Check if the 'refresh' parameter is present in the keyword arguments of the function.
@@ -726,11 +941,7 @@ class BaseStep:
         Returns:
             bool: True if the 'refresh' parameter is present, False otherwise.
         """
-        sig = inspect.signature(self.worker)
-        param = sig.parameters.get("refresh")
-        if param is None:
-            return False
-        return True
+        return self.worker_spec.accepts_refresh
 
     def load_requirement(self, pipe_name, session, extra=None, **kwargs) -> Any:
         """Load the specified requirement step for the given pipe name.
@@ -814,106 +1025,3 @@ class BaseStep:
 
     def __hash__(self) -> int:
         return hash(self.complete_name)
-
-
-@dataclass
-class StepLevel:
-    """A class used to represent the level of a Step.
-    This class helps track and manage step dependencies in a pipeline.
-
-    Attributes:
-        requires (list[StepLevel]): A list of step requirements.
-        pipe_name (str): The name of the pipeline this step is a part of.
-        step_name (str): The name of the step.
-
-    Methods :
-        instanciate(requirements: list): converts a list of requirements into instances of `StepLevel`.
-        resolve_level(selfish=bool, uppermost=None): calculates and returns the level of a step.
-    """
-
-    def __init__(self, step):
-        """Constructs all necessary attributes for the StepLevel object.
-
-        Args:
-            step (Step): A Step instance having attributes `pipe_name`, `step_name`, and `requires`.
-        """
-        self.requires = self.instanciate(step.requires)
-        self.pipe_name = step.pipe_name
-        self.step_name = step.step_name
-
-    def instanciate(self, requirements):
-        """
-        Converts each item in the passed list to an instance of `StepLevel`.
-
-        Args:
-            requirements (list): A list of step requirements.
-
-        Returns:
-            list: A list of StepLevel instances representing step requirements.
-        """
-        new_req = []
-        for req in requirements:
-            req = StepLevel(req)
-            new_req.append(req)
-        return new_req
-
-    def resolve_level(self, selfish: bool = False, uppermost=None) -> int:
-        """Calculates and returns the "level" of the step.
-
-        If `selfish` is True, only the requirements that are the same pipe as the `uppermost`
-        will be considered, others won't increment the level values. If `selfish` is False,
-        all requirements contribute to the step level.
-
-        Args:
-            selfish (bool, optional): A flag to specify if the StepLevel should count
-                just the level of requirements that are also on the same pipe. Defaults to False.
-            uppermost (StepLevel, optional): The uppermost level in the pipeline, defaults to self.
-
-        Returns:
-            int: The computed level of the step.
-        """
-
-        # if selfish is True, we only count the requirements that are the same pipe as the uppermost call
-
-        if uppermost is None:
-            uppermost = self
-
-        if uppermost == self:
-            add = 0
-
-        else:
-            if selfish and uppermost.pipe_name != self.pipe_name:
-                # if we are in selfish mode
-                # but we are not currentely in the same step as or a step that has the same pipe as the uppermost
-                # step on wich resolve_level is called, we don't increment level values
-                add = 0
-
-            else:
-                # otherwise, we add one at the end of the requirement stack for that step
-                add = 1
-
-        levels = []
-        for req in self.requires:
-            levels.append(req.resolve_level(selfish, uppermost))
-
-        # we cannot calculate max of an empty list, so we add one 0 here in case there is no requirements
-        if len(levels) == 0:
-            levels = [0]
-
-        return max(levels) + add
-
-    def __eq__(self, value):
-        """Checks if this step is equal to the provided value based on `pipe_name` and `step_name`.
-
-        Args:
-            value (StepLevel): Another StepLevel instance to compare with.
-
-        Returns:
-            bool: True if both pipe_name and step_name are equal, False otherwise.
-        """
-        try:
-            if self.pipe_name == value.pipe_name and self.step_name == value.step_name:
-                return True
-            return False
-        except AttributeError:
-            return False
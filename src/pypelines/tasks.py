@@ -1,7 +1,10 @@
 from functools import wraps
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, Iterator
 from contextlib import contextmanager
-import builtins
+from concurrent.futures import ThreadPoolExecutor
+import builtins, time
+
+import pandas as pd
 
 if TYPE_CHECKING:
     from .pipelines import Pipeline
@@ -36,6 +39,112 @@ class BaseStepTaskManager:
         if not self.backend:
             raise NotImplementedError
 
+    def start_batch(self, sessions: pd.DataFrame, extras=None, extra=None, **kwargs) -> "TaskBatch":
+        """Start a task for each session of a DataFrame, and return a handle on all of them.
+
+        Backends that can submit many tasks at once more efficiently than one by one override this method.
+
+        Args:
+            sessions (pd.DataFrame): The sessions to start tasks for.
+            extras (list, optional): The extra of each session. Defaults to None.
+            extra (optional): The extra of all the sessions. Cannot be used with extras. Defaults to None.
+            **kwargs: Arbitrary keyword arguments, passed to start.
+
+        Returns:
+            TaskBatch: The handle on the started tasks.
+        """
+        extras = self.step.multisession.get_extras(sessions, extras=extras, extra=extra)
+        return TaskBatch(
+            [self.start(session, extra=extra, **kwargs) for (_, session), extra in zip(sessions.iterrows(), extras)]
+        )
+
+
+class TaskBatch:
+    """A handle on the records of tasks started together (with start_batch), to follow their status as a whole.
+    Records are the dictionnaries returned by the start method of the task managers, with an "id" and a "status" key,
+    and are updated with their refresh method, if they have one."""
+
+    # status of the tasks that are not done yet
+    pending_statuses = ("Waiting", "Started")
+
+    def __init__(self, records: list, max_workers: int | None = 16):
+        """Initialize the batch.
+
+        Args:
+            records (list): The records of the tasks.
+            max_workers (int | None, optional): The number of threads refreshing the records at the same time.
+                Defaults to 16.
+        """
+        self.records = list(records)
+        self.max_workers = max_workers
+
+    def refresh(self) -> "TaskBatch":
+        """Update all the records of the batch, and return the batch.
+        Records whose class has a refresh_many method are refreshed together by it (ex: with a single query to their
+        database). The others are refreshed one by one, by a pool of threads."""
+        records_by_type: Dict[type, list] = {}
+        for record in self.records:
+            if hasattr(record, "refresh"):
+                records_by_type.setdefault(type(record), []).append(record)
+
+        for record_type, records in records_by_type.items():
+            refresh_many = getattr(record_type, "refresh_many", None)
+            if refresh_many is not None:
+                refresh_many(records)
+                continue
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(lambda record: record.refresh(), records))
+        return self
+
+    def statuses(self) -> pd.Series:
+        """Return the status of each task, as last refreshed, indexed by task id."""
+        return pd.Series(
+            [record.get("status") for record in self.records],
+            index=[record.get("id") for record in self.records],
+            name="status",
+            dtype=object,
+        )
+
+    def status_counts(self) -> Dict[str, int]:
+        """Return the number of tasks having each status, as last refreshed."""
+        return self.statuses().value_counts().to_dict()
+
+    def done(self) -> bool:
+        """Refresh the records, and return True if all the tasks are done (whether they succeeded or not)."""
+        return not self.refresh().statuses().isin(self.pending_statuses).any()
+
+    def wait(self, timeout: float | None = None, poll_interval: float = 5) -> "TaskBatch":
+        """Wait for all the tasks of the batch to be done.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait. Defaults to None (no limit).
+            poll_interval (float, optional): Number of seconds between two refreshes of the records. Defaults to 5.
+
+        Raises:
+            TimeoutError: If some tasks are not done after timeout seconds.
+
+        Returns:
+            TaskBatch: The batch.
+        """
+        start = time.monotonic()
+        while not self.done():
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise TimeoutError(f"Tasks of the batch were not done after {timeout} seconds : {self.status_counts()}")
+            time.sleep(poll_interval)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.records)
+
+    def __getitem__(self, index: int):
+        return self.records[index]
+
+    def __repr__(self) -> str:
+        return f"<TaskBatch of {len(self)} tasks : {self.status_counts()}>"
+
 
 class BaseTaskBackend:
 
@@ -14,6 +14,7 @@ from pypelines import Pipeline, stepmethod, BaseStep, BasePipe
 from pypelines.pickle_backend import PicklePipe, PickleDiskObject
 
 from pathlib import Path
+import json, os
 
 
 @pytest.fixture
@@ -188,3 +189,1088 @@ def test_pypeline_requirement_stack(request, pipeline_fixture_name: str, session
 
     # now, requires has been resolved and contains instanciated step objects
     assert pipeline.complex_pipe.another_name.requires == [pipeline.complex_pipe.my_step_name]
+
+
+def test_requirement_stack_compiled_on_resolve():
+    pipeline = examples.example_pipeline
+    pipeline.resolve()
+
+    step = pipeline.local_features.templates_new_locations
+    assert step in pipeline.requirement_stacks
+    assert pipeline.get_requirement_stack(step, names=True) == [
+        "treated_videos.compress",
+        "background_features.scale_spaces",
+        "local_features.template_matches",
+        "background_features.enhanced_background",
+        "background_features.blobs",
+    ]
+    # the returned list is a copy, modifying it does not alter the compiled stack
+    step.requirement_stack().clear()
+    assert len(step.requirement_stack()) == 5
+
+
+def test_requirement_stack_invalidated_on_register(pipeline_method_based):
+    pipeline = pipeline_method_based
+    assert pipeline.get_requirement_stack(pipeline.complex_pipe.another_name, names=True) == [
+        "complex_pipe.my_step_name"
+    ]
+
+    @pipeline.register_pipe
+    class late_pipe(PicklePipe):
+        @stepmethod(requires="complex_pipe.another_name")
+        def late_step(self, session, extra=""):
+            return None
+
+    assert not pipeline.resolved
+    assert pipeline.get_requirement_stack(pipeline.late_pipe.late_step, names=True) == [
+        "complex_pipe.my_step_name",
+        "complex_pipe.another_name",
+    ]
+    assert pipeline.resolve_instance("late_pipe.late_step") is pipeline.late_pipe.late_step
+
+
+def test_circular_requirements_raise():
+    pipeline = Pipeline("test_circular")
+
+    @pipeline.register_pipe
+    class circular_pipe(PicklePipe):
+        @stepmethod(requires="circular_pipe.second")
+        def first(self, session, extra=""):
+            return None
+
+        @stepmethod(requires="circular_pipe.first")
+        def second(self, session, extra=""):
+            return None
+
+    with pytest.raises(RecursionError):
+        pipeline.resolve()
+
+
+def test_step_levels():
+    pipeline = examples.example_pipeline
+    pipeline.resolve()
+
+    templates_new_locations = pipeline.local_features.templates_new_locations
+    # compress -> enhanced_background -> blobs -> templates_new_locations
+    assert templates_new_locations.get_level() == 3
+    # only template_matches belongs to the local_features pipe in the requirement chain
+    assert templates_new_locations.get_level(selfish=True) == 1
+    assert pipeline.local_features.template_matches < templates_new_locations
+    assert pipeline.modified_videos.draw_godzilla.get_level() == 5
+    assert [step.step_name for step in pipeline.background_features.ordered_steps("highest")][0] == "blobs"
+
+
+@pytest.fixture
+def pipeline_parallel_requirements():
+    test_pipeline = Pipeline("test_parallel_requirements")
+    # when set, both independent requirements must be running at the same time to pass the barrier
+    test_pipeline.barrier = None
+
+    def wait_barrier(pipeline):
+        if pipeline.barrier is not None:
+            pipeline.barrier.wait()
+
+    @test_pipeline.register_pipe
+    class base_pipe(PicklePipe):
+        @stepmethod()
+        def base(self, session, extra=""):
+            return 1
+
+    @test_pipeline.register_pipe
+    class left_pipe(PicklePipe):
+        @stepmethod(requires="base_pipe.base")
+        def left(self, session, extra=""):
+            wait_barrier(self.pipeline)
+            return self.load_requirement("base_pipe", session) + 1
+
+    @test_pipeline.register_pipe
+    class right_pipe(PicklePipe):
+        @stepmethod(requires="base_pipe.base")
+        def right(self, session, extra=""):
+            wait_barrier(self.pipeline)
+            return self.load_requirement("base_pipe", session) + 2
+
+    @test_pipeline.register_pipe
+    class top_pipe(PicklePipe):
+        @stepmethod(requires=["left_pipe.left", "right_pipe.right"])
+        def top(self, session, extra=""):
+            return self.load_requirement("left_pipe", session) + self.load_requirement("right_pipe", session)
+
+    return test_pipeline
+
+
+def test_generate_requirements_with_threads(pipeline_parallel_requirements, session):
+    import threading
+
+    pipeline = pipeline_parallel_requirements
+    top = pipeline.top_pipe.top
+
+    assert top.generate(session, check_requirements=True, executor="threads") == 5
+
+    # the independent requirements can only pass the barrier if they run at the same time
+    pipeline.barrier = threading.Barrier(2, timeout=10)
+    assert top.generate(session, refresh=True, refresh_requirements=True, executor="threads", max_workers=4) == 5
+
+    pipeline.barrier = threading.Barrier(2, timeout=0.2)
+    with pytest.raises(threading.BrokenBarrierError):
+        top.generate(session, refresh=True, refresh_requirements=True)
+
+
+def test_generate_requirements_with_processes(pipeline_parallel_requirements, session):
+    pipeline = pipeline_parallel_requirements
+
+    result = pipeline.top_pipe.top.generate(session, check_requirements=True, executor="processes", max_workers=2)
+    assert result == 5
+    assert pipeline.left_pipe.left.load(session) == 2
+    assert pipeline.right_pipe.right.load(session) == 3
+
+
+@pytest.fixture
+def sessions(session_root_path):
+    import pandas as pd
+
+    sessions_list = []
+    for number, subject in enumerate(["mouse_a", "mouse_b", "failing_mouse"]):
+        test_session = Session(
+            subject=subject, date="2024-10-05", number=number, auto_path=True, path=session_root_path
+        )
+        test_session["u_alias"] = test_session.alias
+        sessions_list.append(test_session)
+    return pd.DataFrame(sessions_list)
+
+
+@pytest.fixture
+def pipeline_multisession():
+    test_pipeline = Pipeline("test_multisession")
+
+    @test_pipeline.register_pipe
+    class subject_pipe(PicklePipe):
+        @stepmethod()
+        def subject_name(self, session, extra=""):
+            if session.subject.startswith("failing"):
+                raise ValueError("This session fails")
+            return session.subject.upper()
+
+    return test_pipeline
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_multisession_iter_generate(pipeline_multisession, sessions, workers):
+    step = pipeline_multisession.subject_pipe.subject_name
+
+    results = {session.name: result for session, result in step.multisession.iter_generate(sessions, workers=workers)}
+    assert sorted(results.values()) == ["MOUSE_A", "MOUSE_B"]
+    assert list(step.multisession.failures.index) == [sessions.index[2]]
+    assert "This session fails" in step.multisession.failures.iloc[0]["error"]
+
+
+def test_multisession_generate_with_workers(pipeline_multisession, sessions):
+    step = pipeline_multisession.subject_pipe.subject_name
+
+    # single sessions failures don't stop the generation with workers, but raise without
+    with pytest.raises(ValueError):
+        step.generate(sessions)
+
+    results = step.generate(sessions, workers=2)
+    assert results == {sessions.iloc[0].u_alias: "MOUSE_A", sessions.iloc[1].u_alias: "MOUSE_B"}
+    assert len(step.multisession.failures) == 1
+    assert step.load(sessions.iloc[:2]) == results
+
+
+def test_check_disk_served_from_directory_snapshot(pipeline_method_based, session, monkeypatch):
+    import os
+    from pypelines import disk
+
+    step = pipeline_method_based.my_pipe.my_step
+    step.generate(session)
+
+    disk_object = step.get_disk_object(session)
+    assert disk_object.is_loadable()
+    collection_path = os.path.dirname(disk_object.current_disk_file)
+
+    # make the directory look like it has not been modified recently, so that the snapshot is trusted
+    old_time = os.stat(collection_path).st_mtime - 60
+    os.utime(collection_path, (old_time, old_time))
+    disk.clear_directory_snapshots()
+    step.get_disk_object(session)
+
+    scans = []
+    original_scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or original_scandir(path))
+
+    assert step.get_disk_object(session).is_loadable()
+    assert step.load(session) == "a_good_result"
+    assert scans == []
+
+    # a change of the directory content invalidates the snapshot
+    os.remove(disk_object.current_disk_file)
+    assert not step.get_disk_object(session).is_loadable()
+    assert len(scans) == 1
+
+
+def test_lru_cache_store_budget_and_quotas():
+    import numpy as np
+    from pypelines.caches import LRUCacheStore, estimate_size
+
+    array = np.zeros(1000, dtype=np.float64)
+    assert estimate_size(array) >= 8000
+    assert estimate_size({"a": array, "b": array}) < 2 * estimate_size(array)
+
+    store = LRUCacheStore(max_bytes=3 * estimate_size(array) + 100, quotas={"small_pipe": estimate_size(array) + 100})
+    for key in ["a", "b", "c"]:
+        store.set(key, np.zeros(1000), group="big_pipe")
+    assert store.get("a") is not None  # a becomes the most recently used
+    store.set("d", np.zeros(1000), group="big_pipe")
+    assert store.get("b") is None
+    assert store.get("a") is not None
+
+    store.set("e", np.zeros(1000), group="small_pipe")
+    store.set("f", np.zeros(1000), group="small_pipe")
+    assert store.get("e") is None and store.get("f") is not None
+
+    stats = store.stats()
+    assert stats["evictions"] == 3
+    assert stats["bytes"] <= store.max_bytes
+    assert stats["hits"] == 3 and stats["misses"] == 2
+
+
+def test_cached_disk_object_uses_cache_store(session):
+    from pypelines.disk import CachedDiskObject
+
+    test_pipeline = Pipeline("test_cached")
+
+    @test_pipeline.register_pipe
+    class cached_pipe(BasePipe):
+        disk_class = CachedDiskObject
+
+        @stepmethod()
+        def cached_step(self, session, extra=""):
+            return [1, 2, 3]
+
+    step = test_pipeline.cached_pipe.cached_step
+    store = CachedDiskObject.cache_store
+    hits = store.stats()["hits"]
+
+    assert step.generate(session) == [1, 2, 3]
+    assert step.load(session) == [1, 2, 3]
+    assert store.stats()["hits"] == hits + 1
+
+    step.get_disk_object(session).clear_cache()
+    with pytest.raises(ValueError):
+        step.load(session)
+
+
+def test_arguments_file_cache(session, monkeypatch):
+    from pypelines import arguments
+
+    arguments.clear_arguments_cache()
+    test_pipeline = Pipeline("test_arguments_cache")
+
+    @test_pipeline.register_pipe
+    class configured_pipe(BasePipe):
+        @stepmethod()
+        def configured_step(self, session, extra="", value=0):
+            return value
+
+    step = test_pipeline.configured_pipe.configured_step
+    path = Path(arguments.get_session_arguments_path(session, test_pipeline))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"functions": {"configured_pipe.configured_step": {"value": 1}}}))
+
+    parsings = []
+    read_json_file = arguments.read_json_file
+    monkeypatch.setattr(arguments, "read_json_file", lambda file: parsings.append(file) or read_json_file(file))
+
+    try:
+        for _ in range(3):
+            step_arguments = arguments.get_step_arguments(session, step)
+            assert step_arguments == {"value": 1}
+            step_arguments["value"] = 5  # the returned arguments are a copy of the cached ones
+        assert len(parsings) == 1
+
+        # the file is checked on every read, so an edit is seen immediately
+        path.write_text(json.dumps({"functions": {"configured_pipe.configured_step": {"value": 22}}}))
+        assert arguments.get_step_arguments(session, step) == {"value": 22}
+        assert len(parsings) == 2
+    finally:
+        path.unlink()
+        arguments.clear_arguments_cache()
+
+
+def test_step_wrappers_built_once(pipeline_method_based):
+    step = pipeline_method_based.my_pipe.my_step
+    generate = step.generate
+    assert step.generate is generate
+    assert step.load is step.load
+
+    @pipeline_method_based.register_pipe
+    class OtherPipe(BasePipe):
+        @stepmethod()
+        def other_step(self, session, extra=""):
+            return 1
+
+    pipeline_method_based.resolve()
+    assert step.generate is not generate
+
+
+def test_worker_spec(pipeline_method_based, session, monkeypatch):
+    import inspect
+
+    step = pipeline_method_based.complex_pipe.my_step_name
+    spec = step.worker_spec
+    assert spec.get_default_extra() == ""
+    assert not spec.accepts_refresh
+    assert spec.accepts_kwarg("extra") and not spec.accepts_kwarg("refresh")
+
+    def no_inspection(*args, **kwargs):
+        raise AssertionError("inspect.signature should not be called once the step is created")
+
+    monkeypatch.setattr(inspect, "signature", no_inspection)
+    assert step.get_default_extra() == ""
+    assert step.get_disk_object(session).extra == ""
+
+
+def test_requirements_handed_off_in_run(pipeline_method_based, session, monkeypatch):
+    from pypelines.contexts import get_run_context
+
+    loaded_files = []
+    load = PickleDiskObject.load
+
+    def recording_load(self):
+        loaded_files.append(self.current_disk_file)
+        return load(self)
+
+    monkeypatch.setattr(PickleDiskObject, "load", recording_load)
+
+    step = pipeline_method_based.complex_pipe.another_name
+    assert step.generate(session, check_requirements=True) == 54
+    # the required step output, generated in the same call, was not read back from the disk
+    assert loaded_files == []
+    assert get_run_context() is None
+
+    assert pipeline_method_based.complex_pipe.another_name.load(session) == 54
+    assert len(loaded_files) == 1
+
+
+def test_parquet_backend_partial_load(session):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+    from pypelines.parquet_backend import ParquetPipe
+
+    test_pipeline = Pipeline("test_parquet")
+
+    @test_pipeline.register_pipe
+    class trials_df(ParquetPipe):
+        @stepmethod()
+        def initial(self, session, extra=""):
+            return pd.DataFrame(
+                {"side": ["left", "right"] * 5, "duration": range(10), "reward": [0.5] * 10},
+                index=pd.Index(range(10), name="trial#"),
+            )
+
+    step = test_pipeline.trials_df.initial
+    full = step.generate(session)
+
+    partial = step.load(session, columns=["duration"], filters=[("side", "==", "left")])
+    assert list(partial.columns) == ["duration"]
+    assert partial.index.name == "trial#"
+    assert list(partial["duration"]) == list(full.loc[full["side"] == "left", "duration"])
+    pd.testing.assert_frame_equal(step.load(session), full)
+
+    with pytest.raises(TypeError):
+        step.save(session, {"not": "a dataframe"})
+
+
+def test_delta_backend_saves_only_new_columns(session):
+    import pandas as pd
+    from pypelines.delta_backend import DeltaPipe
+
+    test_pipeline = Pipeline("test_delta")
+
+    @test_pipeline.register_pipe
+    class trials_df(DeltaPipe):
+        @stepmethod()
+        def initial(self, session, extra=""):
+            return pd.DataFrame({"duration": range(10)}, index=pd.Index(range(10), name="trial#"))
+
+        @stepmethod(requires="trials_df.initial")
+        def with_reward(self, session, extra=""):
+            data = self.load_requirement("trials_df", session, extra=extra)
+            data["reward"] = data["duration"] * 2
+            return data
+
+        @stepmethod(requires="trials_df.with_reward")
+        def filtered(self, session, extra=""):
+            data = self.load_requirement("trials_df", session, extra=extra)
+            return data[data["reward"] > 4]
+
+    pipe = test_pipeline.trials_df
+    result = pipe.with_reward.generate(session, check_requirements=True)
+
+    disk_object = pipe.with_reward.get_disk_object(session)
+    manifest = disk_object.read_manifest()
+    assert [entry["kind"] for entry in manifest["entries"]] == ["full", "dataframe"]
+    folder = os.path.dirname(disk_object.current_disk_file)
+    initial_part, reward_part = [os.path.join(folder, entry["file"]) for entry in manifest["entries"]]
+    with open(reward_part, "rb") as file:
+        assert list(pd.read_pickle(file).columns) == ["reward"]
+
+    # a new save writes a new part, and removes the one it replaces once the manifest no longer lists it
+    pipe.with_reward.generate(session, refresh=True)
+    entries = pipe.with_reward.get_disk_object(session).read_manifest()["entries"]
+    assert entries[0]["file"] == os.path.basename(initial_part)
+    assert entries[1]["file"] != os.path.basename(reward_part)
+    assert not os.path.exists(reward_part)
+
+    pd.testing.assert_frame_equal(pipe.with_reward.load(session), result)
+    assert list(pipe.initial.load(session).columns) == ["duration"]
+
+    # rows removed : the output is saved as a full snapshot, and the previous parts are removed
+    filtered = pipe.filtered.generate(session)
+    manifest = pipe.filtered.get_disk_object(session).read_manifest()
+    assert [entry["kind"] for entry in manifest["entries"]] == ["full"]
+    assert not os.path.exists(initial_part)
+    pd.testing.assert_frame_equal(pipe.filtered.load(session), filtered)
+
+
+def test_numpy_backend_memory_maps_arrays(session):
+    import numpy as np
+    from pypelines.numpy_backend import NumpyPipe
+
+    test_pipeline = Pipeline("test_numpy")
+
+    @test_pipeline.register_pipe
+    class traces(NumpyPipe):
+        @stepmethod()
+        def raw(self, session, extra=""):
+            return {"signal": np.arange(12.0).reshape(3, 4), "rate": 30, "labels": np.array(["a", None], dtype=object)}
+
+        @stepmethod(requires="traces.raw")
+        def mean(self, session, extra=""):
+            return self.load_requirement("traces", session, extra=extra)["signal"].mean(axis=1)
+
+    raw = test_pipeline.traces.raw.generate(session)
+    loaded = test_pipeline.traces.raw.load(session)
+    assert list(loaded.keys()) == ["signal", "rate", "labels"]
+    assert isinstance(loaded["signal"], np.memmap)
+    np.testing.assert_array_equal(loaded["signal"], raw["signal"])
+    assert loaded["rate"] == 30
+
+    assert not isinstance(test_pipeline.traces.raw.load(session, mmap_mode=None)["signal"], np.memmap)
+
+    disk_object = test_pipeline.traces.raw.get_disk_object(session)
+    folder = disk_object.get_arrays_folder(disk_object.current_disk_file)
+    # a new save writes a new arrays folder, and removes the previous one once the sidecar refers to the new one
+    test_pipeline.traces.raw.generate(session, refresh=True)
+    assert disk_object.get_arrays_folder(disk_object.current_disk_file) != folder
+    assert not os.path.exists(folder)
+    folder = disk_object.get_arrays_folder(disk_object.current_disk_file)
+
+    test_pipeline.traces.mean.generate(session)
+    np.testing.assert_array_equal(test_pipeline.traces.mean.load(session), [1.5, 5.5, 9.5])
+    assert not os.path.exists(folder)
+
+
+def test_pickle5_backend_out_of_band_buffers(session):
+    import numpy as np
+    import pandas as pd
+    from pypelines.pickle_backend import Pickle5Pipe, get_buffers_sidecar_path, PICKLE5_MAGIC
+
+    test_pipeline = Pipeline("test_pickle5")
+
+    @test_pipeline.register_pipe
+    class stacks(Pickle5Pipe):
+        @stepmethod()
+        def frames(self, session, extra=""):
+            return {"frames": np.arange(100_000, dtype=np.float64), "table": pd.DataFrame({"a": range(50_000)})}
+
+    step = test_pipeline.stacks.frames
+    data = step.generate(session)
+
+    disk_object = step.get_disk_object(session)
+    with open(disk_object.current_disk_file, "rb") as file:
+        assert file.read(len(PICKLE5_MAGIC)) == PICKLE5_MAGIC
+    assert os.path.getsize(get_buffers_sidecar_path(disk_object.current_disk_file)) >= 800_000
+    # the buffers sidecar is not taken for an output when matching files names
+    output_file = disk_object.current_disk_file
+    disk_object.use_outputs_index = False
+    assert disk_object.check_disk() and disk_object.current_disk_file == output_file
+
+    loaded = step.load(session)
+    np.testing.assert_array_equal(loaded["frames"], data["frames"])
+    pd.testing.assert_frame_equal(loaded["table"], data["table"])
+    loaded["frames"][0] = -1  # memory mapped buffers are copy on write
+    np.testing.assert_array_equal(step.load(session)["frames"], data["frames"])
+
+    # each save writes a new sidecar before replacing the pickle file, and the previous sidecar is removed afterwards
+    first_sidecar = get_buffers_sidecar_path(output_file)
+    step.generate(session, refresh=True)
+    second_sidecar = get_buffers_sidecar_path(output_file)
+    assert second_sidecar != first_sidecar
+    assert not os.path.exists(first_sidecar) and os.path.exists(second_sidecar)
+    np.testing.assert_array_equal(step.load(session)["frames"], data["frames"])
+
+
+def test_atomic_write_leaves_nothing_on_failure(session_root_path):
+    from pypelines.disk import atomic_write
+
+    path = session_root_path / "atomic.pipe.step.pickle"
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as file:
+            file.write(b"partial")
+            raise RuntimeError("killed while writing")
+    assert list(session_root_path.iterdir()) == []
+
+    with atomic_write(str(path)) as file:
+        file.write(b"complete")
+    assert [item.name for item in session_root_path.iterdir()] == [path.name]
+    assert path.read_bytes() == b"complete"
+
+
+def test_generate_write_behind(pipeline_method_based, session, monkeypatch):
+    import threading
+
+    saving_threads = []
+    write = PickleDiskObject.write
+
+    def recording_write(self, file_path, data):
+        saving_threads.append(threading.current_thread().name)
+        write(self, file_path, data)
+
+    monkeypatch.setattr(PickleDiskObject, "write", recording_write)
+
+    step = pipeline_method_based.complex_pipe.another_name
+    assert step.generate(session, check_requirements=True, write_behind=True) == 54
+    assert len(saving_threads) == 2
+    assert all(name.startswith("pypelines_save") for name in saving_threads)
+    assert step.load(session) == 54
+
+    saving_threads.clear()
+    step.generate(session, refresh=True)
+    assert saving_threads == [threading.current_thread().name]
+
+
+def test_outputs_index_used_by_check_disk(pipeline_method_based, session, monkeypatch):
+    step = pipeline_method_based.complex_pipe.another_name
+    step.generate(session, check_requirements=True)
+
+    disk_object = step.get_disk_object(session)
+    record = disk_object.get_output_record()
+    assert record["step"] == "another_name"
+    assert record["file"] == os.path.basename(disk_object.current_disk_file)
+    assert record["size"] == os.path.getsize(disk_object.current_disk_file)
+    assert record["compute_duration"] is not None and record["arguments_hash"] is not None
+
+    # file names are not matched anymore once an output is recorded
+    def no_matching(self):
+        raise AssertionError("file names should not be matched")
+
+    monkeypatch.setattr(PickleDiskObject, "make_file_name_pattern", no_matching)
+    assert step.get_disk_object(session).is_matching()
+
+
+def test_arguments_hash_never_fails_generation(session):
+    from pypelines.steps import get_arguments_hash
+
+    pipeline = Pipeline("test_arguments_hash")
+
+    @pipeline.register_pipe
+    class hashed_pipe(PicklePipe):
+        @stepmethod()
+        def mapped(self, session, extra="", mapping=None):
+            return len(mapping)
+
+    step = pipeline.hashed_pipe.mapped
+    assert step.generate(session, mapping={(0, 1): "x", "a": 2}) == 2
+    assert step.load(session) == 2
+    assert step.get_disk_object(session).get_output_record()["arguments_hash"] is not None
+
+    assert get_arguments_hash((), {"mapping": {(0, 1): "x"}}) == get_arguments_hash((), {"mapping": {(0, 1): "x"}})
+    assert get_arguments_hash((), {"function": lambda: None}) is None
+
+
+def test_outputs_index_only_serves_its_own_step(session):
+    pipeline = Pipeline("test_outputs_index_steps")
+
+    class KeepingDiskObject(PickleDiskObject):
+        remove = False
+
+    @pipeline.register_pipe
+    class keeping_pipe(BasePipe):
+        disk_class = KeepingDiskObject
+
+        @stepmethod()
+        def s1(self, session, extra=""):
+            return "s1"
+
+        @stepmethod(requires="keeping_pipe.s1")
+        def s2(self, session, extra=""):
+            return "s2"
+
+    pipeline.keeping_pipe.s1.generate(session)
+    pipeline.keeping_pipe.s2.generate(session)
+    assert pipeline.keeping_pipe.s2.get_disk_object(session).get_output_record()["step"] == "s2"
+    assert pipeline.keeping_pipe.s1.load(session) == "s1"
+    assert pipeline.keeping_pipe.s2.load(session) == "s2"
+
+
+def test_output_catalog(pipeline_multisession, sessions, session_root_path):
+    from pypelines import extend_pandas
+
+    extend_pandas()
+    catalog = pipeline_multisession.set_catalog(str(session_root_path / "catalog.sqlite"))
+    step = pipeline_multisession.subject_pipe.subject_name
+    try:
+        step.generate(sessions.iloc[:2])
+
+        outputs = catalog.query(pipeline="test_multisession", step="subject_name", version=step.pipe.version)
+        assert sorted(outputs["session"]) == sorted(sessions.iloc[:2]["u_alias"])
+        assert (outputs["size"] > 0).all()
+
+        exists = sessions.pypeline(pipeline_multisession).output_exists("subject_pipe.subject_name")
+        assert list(exists) == [True, True, False]
+
+        # outputs removed or added without the pipeline are taken into account after reconciling
+        os.remove(outputs["path"].iloc[0])
+        assert catalog.reconcile(pipeline_multisession, sessions) == 1
+        assert len(catalog.query(sessions=sessions)) == 1
+
+        # the catalog is trusted, unless the sessions it has no entry for are asked to be checked on the disk
+        pipeline_multisession.set_catalog(None)
+        step.generate(sessions.iloc[:2])
+        pipeline_multisession.set_catalog(catalog)
+        assert len(catalog.query(sessions=sessions)) == 1
+        accessor = sessions.pypeline(pipeline_multisession)
+        assert accessor.output_exists("subject_pipe.subject_name").sum() == 1
+        exists = accessor.output_exists("subject_pipe.subject_name", check_missing_on_disk=True)
+        assert list(exists) == [True, True, False]
+    finally:
+        pipeline_multisession.set_catalog(None)
+        catalog.close()
+
+
+def test_status_matrix(pipeline_method_based, sessions):
+    from pypelines import extend_pandas
+
+    extend_pandas()
+    pipeline_method_based.complex_pipe.my_step_name.generate(sessions.iloc[0])
+    pipeline_method_based.complex_pipe.another_name.generate(sessions.iloc[1], check_requirements=True)
+
+    status = sessions.pypeline(pipeline_method_based).status()
+    assert list(status.columns) == ["my_pipe.my_step", "complex_pipe.my_step_name", "complex_pipe.another_name"]
+    assert list(status["complex_pipe.another_name"]) == ["too_low", "matching", "missing"]
+    assert list(status["complex_pipe.my_step_name"]) == ["matching", "matching", "missing"]
+    assert (status["my_pipe.my_step"] == "missing").all()
+
+    assert list(sessions.pypeline(pipeline_method_based).status(steps=["complex_pipe"]).columns) == [
+        "complex_pipe.my_step_name",
+        "complex_pipe.another_name",
+    ]
+
+
+def test_generation_plan(pipeline_method_based, sessions):
+    step = pipeline_method_based.complex_pipe.another_name
+    pipeline_method_based.complex_pipe.my_step_name.generate(sessions.iloc[0])
+    step.generate(sessions.iloc[1], check_requirements=True)
+
+    plan = step.plan(sessions, check_requirements=True)
+    table = plan.to_dataframe().set_index(["session", "step"])
+    assert table.loc[(sessions.index[0], "complex_pipe.my_step_name"), "action"] == "skip"
+    assert table.loc[(sessions.index[0], "complex_pipe.another_name"), "decision"] == "too_low"
+    assert table.loc[(sessions.index[1], "complex_pipe.another_name"), "action"] == "load"
+    assert (sessions.index[1], "complex_pipe.my_step_name") not in table.index
+    assert list(plan.summary().loc["complex_pipe.another_name"]) == [2, 1, 0]
+    assert list(plan.summary().loc["complex_pipe.my_step_name"]) == [1, 0, 1]
+
+    refreshed = step.plan(sessions.iloc[1], refresh=True, refresh_requirements=True).to_dataframe()
+    assert list(refreshed["step"]) == ["complex_pipe.my_step_name", "complex_pipe.another_name"]
+    assert list(refreshed["action"]) == ["compute", "compute"]
+
+    # steps checked after a planned computation see the pipe file it would save, instead of the disk
+    assert not step.get_disk_object(sessions.iloc[2]).is_loadable()
+    assert plan.get_disk_object(step, sessions.iloc[2], "").is_loadable()
+
+    plan.execute(max_workers=2)
+    status = sessions.pypeline(pipeline_method_based).status(steps=["complex_pipe"])
+    assert (status == "matching").all().all()
+    assert step.load(sessions.iloc[2]) == 54
+
+
+def test_local_pool_task_backend(session):
+    from pypelines.local_tasks import LocalPipeline, LocalTaskRecord
+
+    pipeline = LocalPipeline("test_local_tasks", max_workers=2)
+
+    @pipeline.register_pipe
+    class local_pipe(PicklePipe):
+        @stepmethod()
+        def first(self, session, extra=""):
+            return 5
+
+        @stepmethod(requires="local_pipe.first")
+        def second(self, session, extra="", factor=1):
+            if factor < 0:
+                raise ValueError("negative factor")
+            return self.load_requirement("local_pipe", session, extra=extra) * factor
+
+    try:
+        record = pipeline.local_pipe.second.task.start(session, factor=3)
+        assert isinstance(record, LocalTaskRecord)
+        assert record.wait(timeout=60).status == "Complete"
+        assert record["duration"] > 0
+        assert os.path.isfile(record["log"])
+        assert pipeline.local_pipe.second.load(session) == 15
+
+        failed = pipeline.local_pipe.second.task.start(session, refresh=True, factor=-1).wait(timeout=60)
+        assert failed.status == "Failed"
+        assert "negative factor" in Path(failed["log"]).read_text()
+        assert pipeline.runner_backend.get_tasks(status="Failed") == [failed]
+    finally:
+        pipeline.runner_backend.shutdown()
+
+
+def test_spool_task_backend(sessions, tmp_path):
+    import multiprocessing
+    from pypelines.spool_tasks import SpoolPipeline, SpoolWorker
+
+    pipeline = SpoolPipeline("test_spool_tasks", spool_dir=tmp_path / "spool", lease_timeout=60)
+
+    @pipeline.register_pipe
+    class spool_pipe(PicklePipe):
+        @stepmethod()
+        def first(self, session, extra=""):
+            return session.subject
+
+        @stepmethod(requires="spool_pipe.first")
+        def second(self, session, extra="", suffix=""):
+            if session.subject.startswith("failing"):
+                raise ValueError("failing subject")
+            return self.load_requirement("spool_pipe", session, extra=extra) + suffix
+
+    records = [pipeline.spool_pipe.second.task.start(session, suffix="_done") for _, session in sessions.iterrows()]
+    assert [record.refresh().status for record in records] == ["Waiting"] * 3
+
+    def run_worker():
+        SpoolWorker(tmp_path / "spool", poll_interval=0.1).run(stop_when_empty=True)
+
+    workers = [multiprocessing.get_context("fork").Process(target=run_worker) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+
+    assert [record.wait(timeout=10).status for record in records] == ["Complete", "Complete", "Failed"]
+    assert all(record["attempts"] == 1 for record in records)
+    assert pipeline.spool_pipe.second.load(sessions.iloc[1]) == "mouse_b_done"
+    assert pipeline.runner_backend.get_tasks(status="Failed") == [records[2]]
+    assert len(pipeline.runner_backend.spool.list_jobs("failed")) == 1
+
+    # a job whose worker stopped sending heartbeats is put back in the queue
+    spool = pipeline.runner_backend.spool
+    record = pipeline.spool_pipe.first.task.start(sessions.iloc[0])
+    # a job that waited in the queue for longer than the lease timeout is not seen as lost once claimed
+    os.utime(spool.get_job_path(record.job_name, "queue"), (0, 0))
+    lease_path = SpoolWorker(spool).claim_next()
+    assert spool.requeue_lost_leases() == []
+    os.utime(lease_path, (0, 0))
+    assert spool.requeue_lost_leases() == [record.job_name]
+    assert record.refresh().state == "queue"
+    # the worker that lost the lease finishing the job afterwards doesn't crash, nor takes the job back
+    assert spool.finish(lease_path, {**record, "status": "Complete"}) is None
+    assert record.refresh().state == "queue"
+
+
+def test_output_lock_deduplicates_generations(session, tmp_path):
+    import multiprocessing, time
+
+    pipeline = Pipeline("test_output_locks")
+    calls_path = tmp_path / "calls.txt"
+
+    @pipeline.register_pipe
+    class locked_pipe(PicklePipe):
+        @stepmethod()
+        def slow(self, session, extra=""):
+            with open(calls_path, "a") as f:
+                f.write("called\n")
+            time.sleep(1)
+            return 12
+
+    step = pipeline.locked_pipe.slow
+    lock_path = step.get_disk_object(session).get_lock_path()
+    assert os.path.basename(lock_path).startswith(".") and not lock_path.endswith(".pickle")
+
+    def generate():
+        assert step.generate(session) == 12
+
+    processes = [multiprocessing.get_context("fork").Process(target=generate) for _ in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+
+    assert [process.exitcode for process in processes] == [0, 0]
+    assert calls_path.read_text().count("called") == 1
+    assert step.load(session) == 12
+
+
+def test_output_lock_rechecks_disk_after_requirements(session):
+    pipeline = Pipeline("test_output_lock_recheck")
+    calls = []
+
+    @pipeline.register_pipe
+    class requirement_pipe(PicklePipe):
+        @stepmethod()
+        def slow_requirement(self, session, extra=""):
+            # another process saves the output of the step while the requirements of this one run
+            pipeline.target_pipe.target.save(session, "from another process")
+            return 1
+
+    @pipeline.register_pipe
+    class target_pipe(PicklePipe):
+        @stepmethod(requires="requirement_pipe.slow_requirement")
+        def target(self, session, extra=""):
+            calls.append("target")
+            return "computed"
+
+    assert pipeline.target_pipe.target.generate(session, check_requirements=True) == "from another process"
+    assert calls == []
+
+
+def test_generation_plan_waves(session):
+    pipeline = Pipeline("test_plan_waves")
+
+    @pipeline.register_pipe
+    class root_pipe(PicklePipe):
+        @stepmethod()
+        def root(self, session, extra=""):
+            return 1
+
+    @pipeline.register_pipe
+    class left_pipe(PicklePipe):
+        @stepmethod(requires="root_pipe.root")
+        def left(self, session, extra=""):
+            return 2
+
+    @pipeline.register_pipe
+    class right_pipe(PicklePipe):
+        @stepmethod(requires="root_pipe.root")
+        def right(self, session, extra=""):
+            return 3
+
+        @stepmethod(requires=["left_pipe.left", "right_pipe.right"])
+        def merge(self, session, extra=""):
+            return 4
+
+    waves = pipeline.right_pipe.merge.plan(session, check_requirements=True).get_waves()
+    assert [sorted(entry.step.relative_name for entry in wave) for wave in waves] == [
+        ["root_pipe.root"],
+        ["left_pipe.left", "right_pipe.right"],
+        ["right_pipe.merge"],
+    ]
+
+    pipeline.left_pipe.left.generate(session, check_requirements=True)
+    waves = pipeline.right_pipe.merge.plan(session, check_requirements=True).get_waves()
+    assert [[entry.step.relative_name for entry in wave] for wave in waves] == [
+        ["right_pipe.right"],
+        ["right_pipe.merge"],
+    ]
+
+
+def test_start_tasks_batch(sessions):
+    from pypelines.local_tasks import LocalPipeline
+    from pypelines.tasks import TaskBatch
+
+    pipeline = LocalPipeline("test_tasks_batch", max_workers=3)
+
+    @pipeline.register_pipe
+    class batch_pipe(PicklePipe):
+        @stepmethod()
+        def subject(self, session, extra=""):
+            if session.subject.startswith("failing"):
+                raise ValueError("failing subject")
+            return session.subject
+
+    try:
+        batch = pipeline.batch_pipe.subject.multisession.start_tasks(sessions)
+        assert isinstance(batch, TaskBatch) and len(batch) == 3
+        assert batch.wait(timeout=60, poll_interval=0.1).status_counts() == {"Complete": 2, "Failed": 1}
+        assert list(batch.statuses()) == ["Complete", "Complete", "Failed"]
+        assert [record.session.name for record in batch] == list(sessions.index)
+    finally:
+        pipeline.runner_backend.shutdown()
+
+
+@pytest.fixture
+def celery_mocks(monkeypatch):
+    """A fake celery module and application, and a fake ONE connector, recording what the celery tasks backend
+    sends to them."""
+    import sys, types, threading, time, uuid
+    from contextlib import contextmanager
+    from datetime import datetime
+    from pypelines import celery_tasks
+
+    class FakeAlyx:
+        def __init__(self):
+            self.tasks = {}
+            self.calls = []
+            self.lock = threading.Lock()
+            self.running = self.max_running = 0
+
+        def rest(self, resource, action, data=None, id=None, **filters):
+            with self.lock:
+                self.calls.append(action)
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            try:
+                if action == "create":
+                    time.sleep(0.05)  # lets concurrent requests overlap
+                    task = {**data, "id": uuid.uuid4().hex, "datetime": datetime.now().isoformat()}
+                    self.tasks[task["id"]] = task
+                    return dict(task)
+                if action == "read":
+                    return dict(self.tasks[id])
+                if action == "list":
+                    since = filters["django"].split(",")[1]
+                    return [
+                        dict(task)
+                        for task in self.tasks.values()
+                        if task["name"] == filters["name"] and task["datetime"] >= since
+                    ]
+                raise NotImplementedError(action)
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+    class Canvas:
+        def __init__(self, kind, tasks):
+            self.kind, self.tasks = kind, list(tasks)
+
+        def apply_async(self):
+            app.sent.append(self)
+            return self
+
+    class Signature:
+        def __init__(self, name, args, kwargs):
+            self.kind, self.name, self.args, self.kwargs = "signature", name, args, kwargs
+
+    class FakeTask:
+        def __init__(self, name):
+            self.name = name
+
+        def si(self, *args, **kwargs):
+            return Signature(self.name, args, kwargs)
+
+        def apply_async(self, args, kwargs, producer=None):
+            app.published.append((self.name, args, kwargs, producer))
+
+    class FakeApp:
+        main = "test_app"
+
+        def __init__(self):
+            self.tasks, self.sent, self.published, self.producers = {}, [], [], []
+
+        def register_task(self, task_class):
+            self.tasks[task_class.name] = FakeTask(task_class.name)
+
+        @contextmanager
+        def producer_or_acquire(self):
+            producer = object()
+            self.producers.append(producer)
+            yield producer
+
+    celery = types.ModuleType("celery")
+    celery.Task = type("Task", (), {})
+    celery.chain = lambda *tasks: Canvas("chain", tasks)
+    celery.group = lambda tasks: Canvas("group", tasks)
+    monkeypatch.setitem(sys.modules, "celery", celery)
+
+    app, alyx = FakeApp(), FakeAlyx()
+    monkeypatch.setattr(celery_tasks, "get_one_connector", lambda: types.SimpleNamespace(alyx=alyx))
+    return types.SimpleNamespace(app=app, alyx=alyx)
+
+
+def test_celery_fan_out_canvas(celery_mocks, session):
+    from pypelines.celery_tasks import CeleryPipeline
+
+    pipeline = CeleryPipeline("test_celery_fan_out", app=celery_mocks.app)
+
+    @pipeline.register_pipe
+    class pipe_a(PicklePipe):
+        @stepmethod()
+        def s1(self, session, extra=""):
+            return 1
+
+    @pipeline.register_pipe
+    class pipe_b(PicklePipe):
+        @stepmethod(requires="pipe_a.s1")
+        def s2(self, session, extra=""):
+            return 2
+
+    @pipeline.register_pipe
+    class pipe_c(PicklePipe):
+        @stepmethod(requires="pipe_a.s1")
+        def s3(self, session, extra=""):
+            return 3
+
+    @pipeline.register_pipe
+    class pipe_d(PicklePipe):
+        @stepmethod(requires=["pipe_b.s2", "pipe_c.s3"])
+        def s4(self, session, extra=""):
+            return 4
+
+    pipeline.pipe_a.s1.generate(session)
+    record = pipeline.pipe_d.s4.task.start(session, fan_out=True)
+
+    # the requirement already on disk is left out, the independent ones are grouped, and the step comes after them
+    (canvas,) = celery_mocks.app.sent
+    assert canvas.kind == "chain"
+    first, second = canvas.tasks
+    assert first.kind == "group"
+    assert sorted(signature.name for signature in first.tasks) == [
+        "test_celery_fan_out.pipe_b.s2",
+        "test_celery_fan_out.pipe_c.s3",
+    ]
+    assert second.kind == "signature" and second.name == "test_celery_fan_out.pipe_d.s4"
+    assert sorted(task["name"] for task in celery_mocks.alyx.tasks.values()) == [
+        "test_celery_fan_out.pipe_b.s2",
+        "test_celery_fan_out.pipe_c.s3",
+        "test_celery_fan_out.pipe_d.s4",
+    ]
+
+    assert record["name"] == "test_celery_fan_out.pipe_d.s4" and second.args == (record.task_id,)
+    assert {subtask.task_id for subtask in record.subtasks} == {signature.args[0] for signature in first.tasks}
+    assert all(task.response is canvas for task in record.subtasks + [record])
+    # planned tasks are computed without checking the disk nor the requirements again
+    assert record["arguments"]["refresh"] and not record["arguments"]["check_requirements"]
+
+
+def test_celery_start_batch(celery_mocks, sessions):
+    from pypelines.celery_tasks import CeleryPipeline
+
+    pipeline = CeleryPipeline("test_celery_batch", app=celery_mocks.app)
+
+    @pipeline.register_pipe
+    class batch_pipe(PicklePipe):
+        @stepmethod()
+        def batched(self, session, extra=""):
+            return session.subject
+
+    extras = ["first", "second", "third"]
+    batch = pipeline.batch_pipe.batched.task.start_batch(sessions, extras=extras)
+    alyx, app = celery_mocks.alyx, celery_mocks.app
+
+    # the tasks are created in alyx with concurrent requests, and published through a single producer
+    assert alyx.calls == ["create"] * 3 and alyx.max_running > 1
+    (producer,) = app.producers
+    assert len(app.published) == 3 and all(published[3] is producer for published in app.published)
+    # each task is published with the extra of it's session
+    published_extras = {alyx.tasks[args[0]]["session"]: kwargs["extra"] for _, args, kwargs, _ in app.published}
+    assert published_extras == dict(zip(sessions.index, extras))
+    assert [record.session.name for record in batch] == list(sessions.index)
+
+    # the statuses are polled with a single query for the whole batch
+    alyx.calls.clear()
+    for task in alyx.tasks.values():
+        task["status"] = "Complete"
+    assert batch.refresh().status_counts() == {"Complete": 3}
+    assert alyx.calls == ["list"]